@@ -1,3 +1,3 @@
-from .tooling import AgentTool, ToolContext, ToolRegistry, ToolResult
+from .tooling import AgentTool, ToolCachePolicy, ToolContext, ToolRegistry, ToolResult
 
-__all__ = ["AgentTool", "ToolContext", "ToolRegistry", "ToolResult"]
+__all__ = ["AgentTool", "ToolCachePolicy", "ToolContext", "ToolRegistry", "ToolResult"]
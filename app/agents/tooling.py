@@ -1,10 +1,22 @@
+import asyncio
+import hashlib
+import json
+import time
 from collections.abc import Awaitable, Callable
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from typing import Any, Literal
 
+from cashews import cache
+
+from app.utils import logger
+from app.utils.metrics import span
+
 ToolStatus = Literal["ok", "error"]
 ToolHandler = Callable[["ToolContext", dict[str, Any]], Awaitable["ToolResult"]]
 
+TOOL_CACHE_KEY = "agent_tool:{name}:{digest}"
+TOOL_CACHE_TAG_KEY = "agent_tool_tag:{tag}"
+
 
 @dataclass(slots=True)
 class ToolContext:
@@ -14,6 +26,14 @@ class ToolContext:
     text: str
     channel_id: int | None
     state: dict[str, Any] = field(default_factory=dict)
+    # time.monotonic() by which the whole run must finish; None means unbounded.
+    deadline: float | None = None
+
+    def remaining(self) -> float | None:
+        """Seconds left before the run deadline, for handlers that wait on their own."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
 
 
 @dataclass(slots=True)
@@ -24,6 +44,25 @@ class ToolResult:
     message: str = ""
 
 
+@dataclass(slots=True, frozen=True)
+class ToolCachePolicy:
+    """How long a read-only tool's results may be reused, and what invalidates them.
+
+    Entries are keyed by tool name, the caller (provider, user, channel) and the
+    ``key_fields`` of the arguments (all arguments when None). ``tags`` are templates
+    formatted with ``provider`` and ``user_id``; a write tool listing the same tag in
+    ``AgentTool.invalidates`` makes every entry carrying it stale. ``generation_keys``
+    name counters bumped outside the registry (e.g. by the indexer) that do the same.
+    """
+
+    ttl: float
+    key_fields: tuple[str, ...] | None = None
+    tags: tuple[str, ...] = ()
+    generation_keys: tuple[str, ...] = ()
+    # Observations with these prefixes (e.g. transient errors) are never stored.
+    skip_prefixes: tuple[str, ...] = ()
+
+
 @dataclass(slots=True)
 class AgentTool:
     name: str
@@ -31,14 +70,36 @@ class AgentTool:
     usage: str
     input_schema: dict[str, Any]
     handler: ToolHandler
+    # Seconds before the call is abandoned; None falls back to the registry default.
+    timeout: float | None = None
+    cache: ToolCachePolicy | None = None
+    # Tag templates whose cached results a successful call makes stale.
+    invalidates: tuple[str, ...] = ()
+    # Maximum concurrent calls across all runs; tools sharing a concurrency_group
+    # (e.g. everything that commits to the same git repo) share one limit.
+    concurrency: int | None = None
+    concurrency_group: str = ""
+    # False for tools whose side effects cannot be undone halfway (a note written to
+    # disk, then a chain of git commands): the timeout only covers waiting for a
+    # concurrency slot, and once started the call always runs to completion.
+    cancellable: bool = True
+    # No side effects on stores or run state: several read-only calls from one planner
+    # step run concurrently, while every other call runs on its own, in order.
+    read_only: bool = False
 
 
 class ToolRegistry:
-    def __init__(self) -> None:
+    def __init__(self, default_timeout: float | None = None, cache_enabled: bool = True) -> None:
         self._tools: dict[str, AgentTool] = {}
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self.default_timeout = default_timeout
+        self.cache_enabled = cache_enabled
 
     def register(self, tool: AgentTool) -> None:
         self._tools[tool.name] = tool
+        if tool.concurrency is not None:
+            group = tool.concurrency_group or tool.name
+            self._semaphores.setdefault(group, asyncio.Semaphore(tool.concurrency))
 
     def get(self, name: str) -> AgentTool | None:
         return self._tools.get(name)
@@ -49,8 +110,120 @@ class ToolRegistry:
     def names(self) -> set[str]:
         return set(self._tools.keys())
 
+    def function_specs(self) -> list[dict[str, Any]]:
+        """Tools in the OpenAI function-calling format accepted by LiteLLM."""
+        return [
+            {
+                "type": "function",
+                "function": {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "parameters": tool.input_schema,
+                },
+            }
+            for tool in self._tools.values()
+        ]
+
+    @staticmethod
+    def _tags(templates: tuple[str, ...], ctx: ToolContext) -> list[str]:
+        return [
+            template.format(provider=ctx.provider, user_id=ctx.user_id) for template in templates
+        ]
+
+    async def _cache_key(
+        self, name: str, policy: ToolCachePolicy, ctx: ToolContext, args: dict[str, Any]
+    ) -> str:
+        tags = self._tags(policy.tags, ctx)
+        # Tag generations are part of the key, so invalidating a tag orphans its entries.
+        generation_keys = [TOOL_CACHE_TAG_KEY.format(tag=tag) for tag in tags]
+        generation_keys.extend(policy.generation_keys)
+        generations = await cache.get_many(*generation_keys) if generation_keys else ()
+        fields = policy.key_fields
+        keyed = {f: args.get(f) for f in fields} if fields is not None else args
+        raw = json.dumps(
+            [ctx.provider, ctx.user_id, ctx.channel_id, keyed, [g or 0 for g in generations]],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        digest = hashlib.sha256(raw.encode()).hexdigest()[:32]
+        return TOOL_CACHE_KEY.format(name=name, digest=digest)
+
+    async def invalidate(self, templates: tuple[str, ...], ctx: ToolContext) -> None:
+        for tag in self._tags(templates, ctx):
+            await cache.incr(TOOL_CACHE_TAG_KEY.format(tag=tag))
+
+    async def _invoke(self, tool: AgentTool, ctx: ToolContext, args: dict[str, Any]) -> ToolResult:
+        semaphore = self._semaphores.get(tool.concurrency_group or tool.name)
+        if semaphore is None:
+            return await tool.handler(ctx, args)
+        # Time spent queueing for a slot counts against the tool's timeout.
+        async with semaphore:
+            return await tool.handler(ctx, args)
+
+    async def _invoke_to_completion(
+        self, tool: AgentTool, ctx: ToolContext, args: dict[str, Any], timeout: float | None
+    ) -> ToolResult:
+        semaphore = self._semaphores.get(tool.concurrency_group or tool.name)
+        if semaphore is not None:
+            await asyncio.wait_for(semaphore.acquire(), timeout=timeout)
+        task = asyncio.create_task(tool.handler(ctx, args))
+        if semaphore is not None:
+            # Released when the handler (and any worker thread it awaits) is done, even
+            # if the caller is cancelled meanwhile.
+            task.add_done_callback(lambda _: semaphore.release())
+        return await asyncio.shield(task)
+
     async def execute(self, name: str, ctx: ToolContext, args: dict[str, Any]) -> ToolResult:
         tool = self.get(name)
         if tool is None:
             return ToolResult(status="error", observation="unknown_action")
-        return await tool.handler(ctx, args)
+        timeout = tool.timeout if tool.timeout is not None else self.default_timeout
+        remaining = ctx.remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                return ToolResult(status="error", observation="run_deadline_exceeded")
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        policy = tool.cache if self.cache_enabled else None
+        with span("tool", name) as current:
+            key = ""
+            if policy is not None:
+                try:
+                    key = await self._cache_key(name, policy, ctx, args)
+                    cached = await cache.get(key)
+                except Exception as e:
+                    logger.warning(f"Tool cache lookup failed for {name}: {e}")
+                    cached = None
+                if cached is not None:
+                    current.attributes.update(status=cached["status"], cache_hits=1)
+                    return ToolResult(**cached)
+                current.attributes["cache_misses"] = 1
+
+            try:
+                if tool.cancellable:
+                    # On timeout the handler is cancelled at its next await.
+                    result = await asyncio.wait_for(self._invoke(tool, ctx, args), timeout=timeout)
+                else:
+                    result = await self._invoke_to_completion(tool, ctx, args, timeout)
+            except TimeoutError:
+                left = ctx.remaining()
+                expired = left is not None and left <= 0
+                result = ToolResult(
+                    status="error",
+                    observation="run_deadline_exceeded" if expired else "tool_timeout",
+                )
+            current.attributes["status"] = result.status
+
+            if result.status == "ok":
+                try:
+                    if (
+                        policy is not None
+                        and key
+                        and not result.observation.startswith(policy.skip_prefixes)
+                    ):
+                        await cache.set(key, asdict(result), expire=policy.ttl)
+                    if self.cache_enabled and tool.invalidates:
+                        await self.invalidate(tool.invalidates, ctx)
+                except Exception as e:
+                    logger.warning(f"Tool cache update failed for {name}: {e}")
+            return result
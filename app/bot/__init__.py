@@ -50,7 +50,7 @@ async def stop_bot() -> None:
     if not settings.im_enabled:
         return
 
-    stop_reminder_checker()
+    await stop_reminder_checker()
     for stop in CHANNEL_STOPPERS.values():
         await stop()
 
@@ -2,18 +2,28 @@ from app.runtime import get_app_container
 from app.utils import logger
 
 from .message_service import BotMessageService, IncomingMessage
+from .streaming import StreamingReply
 
 
 async def handle_discord_message(message) -> None:
     async def reply(content: str) -> None:
         await message.channel.send(content)
 
+    async def open_stream(placeholder: str) -> StreamingReply:
+        sent = await message.channel.send(placeholder)
+
+        async def edit(content: str) -> None:
+            await sent.edit(content=content)
+
+        return StreamingReply.for_provider("discord", edit)
+
     incoming = IncomingMessage(
         provider="discord",
         user_id=str(message.author.id),
         text=message.content,
         reply=reply,
         channel_id=message.channel.id if message.channel else None,
+        open_stream=open_stream,
     )
 
     try:
@@ -3,6 +3,7 @@ from app.runtime import get_app_container
 from app.utils import logger
 
 from .message_service import BotMessageService, IncomingMessage
+from .streaming import StreamingReply
 
 
 async def handle_feishu_message(message: FeishuIncomingMessage) -> None:
@@ -16,11 +17,29 @@ async def handle_feishu_message(message: FeishuIncomingMessage) -> None:
         if not sent:
             await bot.send_text_to_user(message.user_open_id, content)
 
+    async def open_stream(placeholder: str) -> StreamingReply | None:
+        bot = get_feishu_bot()
+        if not bot:
+            return None
+
+        message_id = await bot.create_text_in_chat(message.chat_id, placeholder)
+        if not message_id:
+            message_id = await bot.create_text_to_user(message.user_open_id, placeholder)
+        if not message_id:
+            return None
+
+        async def edit(content: str) -> None:
+            if not await bot.update_text_message(message_id, content):
+                raise RuntimeError(f"Feishu message update failed: {message_id}")
+
+        return StreamingReply.for_provider("feishu", edit)
+
     incoming = IncomingMessage(
         provider="feishu",
         user_id=message.user_open_id,
         text=message.text,
         reply=reply,
+        open_stream=open_stream,
     )
 
     try:
@@ -3,10 +3,16 @@ from dataclasses import dataclass
 
 from app.config import settings
 from app.note import NoteService
-from app.services.cognitive_agent_service import CognitiveAgentService
+from app.services.cognitive_agent_service import AgentOutcome, CognitiveAgentService
 from app.services.llm_service import LLMService
 from app.utils import logger
 
+from .reply_renderer import FeishuReplyRenderer
+from .streaming import THINKING_PLACEHOLDER, StreamingReply
+
+AGENT_FAILURE_REPLY = "处理消息失败，请稍后再试。"
+NO_RESPONSE_REPLY = "我还没想好怎么处理这条输入，请换个说法试试。"
+
 
 @dataclass
 class IncomingMessage:
@@ -15,6 +21,9 @@ class IncomingMessage:
     text: str
     reply: Callable[[str], Awaitable[None]]
     channel_id: int | None = None
+    # Sends a placeholder and returns a handle that edits it in place; None if the
+    # channel cannot edit sent messages (the reply then falls back to `reply`).
+    open_stream: Callable[[str], Awaitable[StreamingReply | None]] | None = None
 
 
 class BotMessageService:
@@ -24,6 +33,7 @@ class BotMessageService:
         llm_service: LLMService | None = None,
     ) -> None:
         self.llm_service = llm_service or LLMService()
+        self.feishu_renderer = FeishuReplyRenderer(self.llm_service)
         if agent_service is not None:
             self.agent_service = agent_service
         else:
@@ -36,44 +46,71 @@ class BotMessageService:
 
         logger.info(f"[{message.provider}] {message.user_id}: {text}")
 
-        agent_outcome = await self.agent_service.run(
-            user_id=message.user_id,
-            provider=message.provider,
-            text=text,
-            channel_id=message.channel_id,
-        )
-        if agent_outcome.success and agent_outcome.response:
-            await self._reply(message, agent_outcome.response, user_text=text)
+        stream = None
+        if settings.bot_stream_replies and settings.agent_enabled and message.open_stream:
+            try:
+                stream = await message.open_stream(THINKING_PLACEHOLDER)
+            except Exception as e:
+                logger.warning(f"[{message.provider}] Streaming placeholder failed: {e}")
 
-    async def _reply(self, message: IncomingMessage, text: str, *, user_text: str = "") -> None:
+        try:
+            agent_outcome = await self.agent_service.run(
+                user_id=message.user_id,
+                provider=message.provider,
+                text=text,
+                channel_id=message.channel_id,
+            )
+        except Exception as e:
+            if stream is None:
+                raise
+            logger.error(f"[{message.provider}] Agent run failed: {e}")
+            # The placeholder has to be replaced, but without leaking exception text.
+            if not await stream.finish(AGENT_FAILURE_REPLY):
+                await message.reply(AGENT_FAILURE_REPLY)
+            return
+
+        if stream is not None:
+            await self._stream_reply(message, stream, agent_outcome, user_text=text)
+        elif agent_outcome.success and agent_outcome.response:
+            await self._reply(
+                message,
+                agent_outcome.response,
+                user_text=text,
+                templated=agent_outcome.templated,
+            )
+
+    async def _stream_reply(
+        self,
+        message: IncomingMessage,
+        stream: StreamingReply,
+        outcome: AgentOutcome,
+        *,
+        user_text: str,
+    ) -> None:
+        content = outcome.response.strip() if outcome.success else ""
+        if not content:
+            shown = await stream.finish(NO_RESPONSE_REPLY)
+        elif message.provider != "feishu":
+            shown = await stream.finish(content)
+        else:
+            shown = await self.feishu_renderer.stream(
+                stream, user_text, content, templated=outcome.templated
+            )
+        if not shown:
+            # The final edit failed; the placeholder or a partial answer is still showing.
+            await message.reply(stream.text.strip() or NO_RESPONSE_REPLY)
+
+    async def _reply(
+        self,
+        message: IncomingMessage,
+        text: str,
+        *,
+        user_text: str = "",
+        templated: bool = False,
+    ) -> None:
         content = text.strip()
         if not content:
             return
         if message.provider == "feishu":
-            content = await self._render_feishu_reply(user_text=user_text, draft_reply=content)
+            content = await self.feishu_renderer.render(user_text, content, templated=templated)
         await message.reply(content)
-
-    async def _render_feishu_reply(self, user_text: str, draft_reply: str) -> str:
-        system_prompt = (
-            "你是一个中文助手。请基于给定事实草稿生成最终回复。"
-            "要求：1) 只能使用草稿中的事实，不得新增事实；"
-            "2) 语气自然简洁；3) 保留时间、数字、列表项；"
-            "4) 不要输出额外说明；5) 仅输出纯文本，禁止 markdown（如 **、#、-、```）。"
-        )
-        user_prompt = (
-            f"用户原话：{user_text or '（无）'}\n事实草稿：{draft_reply}\n请输出最终回复："
-        )
-        try:
-            return (
-                await self.llm_service.chat_with_system(
-                    system_prompt=system_prompt,
-                    user_message=user_prompt,
-                    temperature=0.3,
-                    model=settings.intent_model.strip() or settings.llm_model,
-                    base_url=settings.intent_base_url or settings.llm_base_url or None,
-                    api_key=settings.intent_api_key or settings.llm_api_key or None,
-                )
-            ).strip()
-        except Exception as e:
-            logger.warning(f"Feishu reply LLM fallback: {e}")
-            return draft_reply
@@ -0,0 +1,125 @@
+import hashlib
+import re
+from collections import Counter
+
+from cashews import cache
+
+from app.config import settings
+from app.services.llm_service import LLMService
+from app.utils import logger
+
+from .streaming import StreamingReply
+
+# How a Feishu reply was produced: a deterministic template, a cached rewrite, a fresh
+# LLM rewrite, or the raw draft after a failed rewrite.
+RENDER_PATHS = ("template", "cache", "llm", "fallback")
+
+_render_counts: Counter[str] = Counter()
+
+_LINE_MARKUP = re.compile(r"^[ \t]{0,3}(?:#{1,6}[ \t]+|>[ \t]?)", re.MULTILINE)
+_BULLET = re.compile(r"^([ \t]*)[-*+][ \t]+", re.MULTILINE)
+_INLINE_MARKUP = re.compile(r"\*\*|__|`{1,3}")
+
+
+def get_render_stats() -> dict[str, int]:
+    return {path: _render_counts[path] for path in RENDER_PATHS}
+
+
+def _record(path: str) -> None:
+    _render_counts[path] += 1
+    logger.debug(f"Feishu reply rendered via {path}: {get_render_stats()}")
+
+
+def render_plain_text(draft: str) -> str:
+    """Deterministic plain-text rendering: Feishu text messages do not render markdown."""
+    text = _LINE_MARKUP.sub("", draft)
+    text = _BULLET.sub(r"\1• ", text)
+    return _INLINE_MARKUP.sub("", text).strip()
+
+
+class FeishuReplyRenderer:
+    def __init__(self, llm_service: LLMService) -> None:
+        self.llm_service = llm_service
+
+    @staticmethod
+    def _cache_key(draft: str) -> str:
+        return f"feishu_reply:{hashlib.md5(draft.encode()).hexdigest()}"
+
+    @staticmethod
+    def _messages(user_text: str, draft_reply: str) -> list[dict[str, str]]:
+        system_prompt = (
+            "你是一个中文助手。请基于给定事实草稿生成最终回复。"
+            "要求：1) 只能使用草稿中的事实，不得新增事实；"
+            "2) 语气自然简洁；3) 保留时间、数字、列表项；"
+            "4) 不要输出额外说明；5) 仅输出纯文本，禁止 markdown（如 **、#、-、```）。"
+        )
+        user_prompt = (
+            f"用户原话：{user_text or '（无）'}\n事实草稿：{draft_reply}\n请输出最终回复："
+        )
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+
+    @staticmethod
+    def _options() -> dict[str, object]:
+        return {
+            "temperature": 0.3,
+            "model": settings.intent_model.strip() or settings.llm_model,
+            "base_url": settings.intent_base_url or settings.llm_base_url or None,
+            "api_key": settings.intent_api_key or settings.llm_api_key or None,
+        }
+
+    async def _shortcut(self, draft: str, templated: bool) -> str | None:
+        if templated:
+            _record("template")
+            return render_plain_text(draft)
+        if settings.bot_reply_cache_ttl > 0:
+            cached = await cache.get(self._cache_key(draft))
+            if cached:
+                _record("cache")
+                return str(cached)
+        return None
+
+    async def _remember(self, draft: str, rendered: str) -> None:
+        _record("llm")
+        if settings.bot_reply_cache_ttl > 0 and rendered:
+            await cache.set(self._cache_key(draft), rendered, expire=settings.bot_reply_cache_ttl)
+
+    async def render(self, user_text: str, draft: str, *, templated: bool = False) -> str:
+        shortcut = await self._shortcut(draft, templated)
+        if shortcut is not None:
+            return shortcut
+
+        try:
+            rendered = (
+                await self.llm_service.chat(self._messages(user_text, draft), **self._options())
+            ).strip()
+        except Exception as e:
+            logger.warning(f"Feishu reply LLM fallback: {e}")
+            _record("fallback")
+            return draft
+
+        await self._remember(draft, rendered)
+        return rendered or draft
+
+    async def stream(
+        self, reply: StreamingReply, user_text: str, draft: str, *, templated: bool = False
+    ) -> bool:
+        shortcut = await self._shortcut(draft, templated)
+        if shortcut is not None:
+            return await reply.finish(shortcut)
+
+        try:
+            async for token in self.llm_service.chat_stream(
+                self._messages(user_text, draft), **self._options()
+            ):
+                await reply.push(token)
+        except Exception as e:
+            logger.warning(f"Feishu streaming reply fallback: {e}")
+            _record("fallback")
+            return await reply.finish(draft)
+
+        rendered = reply.text.strip()
+        await self._remember(draft, rendered)
+        return await reply.finish(rendered or draft)
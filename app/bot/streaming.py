@@ -0,0 +1,91 @@
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from app.config import settings
+from app.utils import logger
+
+THINKING_PLACEHOLDER = "思考中…"
+STREAMING_SUFFIX = " …"
+
+# provider -> (max edits per message, max characters per message). Feishu only allows a
+# sent text message to be updated a limited number of times; Discord caps content size.
+PROVIDER_EDIT_LIMITS: dict[str, tuple[int | None, int | None]] = {
+    "discord": (None, 2000),
+    "feishu": (18, None),
+}
+
+
+class StreamingReply:
+    """An already-sent message that is edited in place as text arrives.
+
+    Intermediate edits are throttled to one per ``min_interval`` seconds and capped at
+    ``max_edits - 1`` so the final edit is always available.
+    """
+
+    def __init__(
+        self,
+        edit: Callable[[str], Awaitable[Any]],
+        *,
+        min_interval: float,
+        max_edits: int | None = None,
+        max_chars: int | None = None,
+        initial: str = THINKING_PLACEHOLDER,
+    ) -> None:
+        self._edit = edit
+        self._min_interval = min_interval
+        self._max_edits = max_edits
+        self._max_chars = max_chars
+        self._text = ""
+        self._shown = initial
+        self._edits = 0
+        self._last_edit_at = time.monotonic()
+        self.finished = False
+
+    @classmethod
+    def for_provider(cls, provider: str, edit: Callable[[str], Awaitable[Any]]) -> "StreamingReply":
+        max_edits, max_chars = PROVIDER_EDIT_LIMITS.get(provider, (None, None))
+        return cls(
+            edit,
+            min_interval=settings.bot_stream_edit_interval,
+            max_edits=max_edits,
+            max_chars=max_chars,
+        )
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def _clip(self, text: str) -> str:
+        if self._max_chars is not None and len(text) > self._max_chars:
+            return text[: self._max_chars - 1] + "…"
+        return text
+
+    async def _apply(self, text: str) -> bool:
+        text = self._clip(text)
+        if text == self._shown:
+            return True
+        try:
+            await self._edit(text)
+        except Exception as e:
+            logger.warning(f"Streaming reply edit failed: {e}")
+            return False
+        self._shown = text
+        self._edits += 1
+        self._last_edit_at = time.monotonic()
+        return True
+
+    async def push(self, chunk: str) -> None:
+        self._text += chunk
+        if self._max_edits is not None and self._edits >= self._max_edits - 1:
+            return
+        if time.monotonic() - self._last_edit_at < self._min_interval:
+            return
+        await self._apply(self._text + STREAMING_SUFFIX)
+
+    async def finish(self, text: str | None = None) -> bool:
+        """Shows the final text; False if the edit failed and the message is stale."""
+        if text is not None:
+            self._text = text
+        self.finished = True
+        return await self._apply(self._text.strip() or self._shown)
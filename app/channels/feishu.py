@@ -16,11 +16,15 @@ try:
     from lark_oapi.api.im.v1 import (
         CreateMessageRequest,
         CreateMessageRequestBody,
+        UpdateMessageRequest,
+        UpdateMessageRequestBody,
     )
 except ModuleNotFoundError:  # pragma: no cover - optional dependency in runtime environment
     lark = None
     CreateMessageRequest = None
     CreateMessageRequestBody = None
+    UpdateMessageRequest = None
+    UpdateMessageRequestBody = None
 
 
 @dataclass
@@ -367,11 +371,23 @@ class FeishuBot:
                 return True
         return await self.send_text_to_user(user_open_id, text)
 
+    async def create_text_in_chat(self, chat_id: str, text: str) -> str | None:
+        return await asyncio.to_thread(self._create_text_sync, "chat_id", chat_id, text)
+
+    async def create_text_to_user(self, open_id: str, text: str) -> str | None:
+        return await asyncio.to_thread(self._create_text_sync, "open_id", open_id, text)
+
+    async def update_text_message(self, message_id: str, text: str) -> bool:
+        return await asyncio.to_thread(self._update_text_sync, message_id, text)
+
     def _send_text_sync(self, receive_id_type: str, receive_id: str, text: str) -> bool:
+        return self._create_text_sync(receive_id_type, receive_id, text) is not None
+
+    def _create_text_sync(self, receive_id_type: str, receive_id: str, text: str) -> str | None:
         if not receive_id:
-            return False
+            return None
         if not CreateMessageRequest or not CreateMessageRequestBody:
-            return False
+            return None
         self._ensure_no_proxy_for_feishu()
 
         content = json.dumps({"text": text}, ensure_ascii=False)
@@ -389,12 +405,36 @@ class FeishuBot:
         )
         response = self._client.im.v1.message.create(request)
         if response.success():
-            return True
+            return str(getattr(response.data, "message_id", "") or "") or None
 
         logger.error(
             f"Failed to send Feishu message: code={response.code}, msg={response.msg}, "
             f"log_id={response.get_log_id()}"
         )
+        return None
+
+    def _update_text_sync(self, message_id: str, text: str) -> bool:
+        if not message_id or not UpdateMessageRequest or not UpdateMessageRequestBody:
+            return False
+        self._ensure_no_proxy_for_feishu()
+
+        content = json.dumps({"text": text}, ensure_ascii=False)
+        request = (
+            UpdateMessageRequest.builder()
+            .message_id(message_id)
+            .request_body(
+                UpdateMessageRequestBody.builder().msg_type("text").content(content).build()
+            )
+            .build()
+        )
+        response = self._client.im.v1.message.update(request)
+        if response.success():
+            return True
+
+        logger.warning(
+            f"Failed to update Feishu message: code={response.code}, msg={response.msg}, "
+            f"log_id={response.get_log_id()}"
+        )
         return False
 
 
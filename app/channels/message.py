@@ -2,6 +2,14 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Any
 
+from app.utils.metrics import REGISTRY
+
+IM_SEND_SECONDS = REGISTRY.histogram(
+    "cognitive_im_send_seconds",
+    "Time to deliver an outbound IM message",
+    ("provider", "via", "result"),
+)
+
 
 class MessageType(str, Enum):
     TEXT = "text"
@@ -22,3 +30,10 @@ class IMSendResult:
     success: bool
     message_id: str | None = None
     error: str | None = None
+
+
+def observe_im_send(provider: str, via: str, success: bool, seconds: float) -> None:
+    """Records one outbound send; ``via`` is "bot", "webhook" or "reminder"."""
+    IM_SEND_SECONDS.observe(
+        seconds, provider=provider, via=via, result="success" if success else "failure"
+    )
@@ -1,7 +1,9 @@
+import time
 from dataclasses import dataclass
 
 from app.channels.discord import get_discord_bot
 from app.channels.feishu import get_feishu_bot
+from app.channels.message import observe_im_send
 from app.config import settings
 from app.enums import IMProvider
 from app.models import Reminder
@@ -22,6 +24,13 @@ def get_default_provider() -> IMProvider:
 
 
 async def send_text_to_user(provider: IMProvider, user_id: str, content: str) -> ChannelSendResult:
+    start = time.perf_counter()
+    result = await _send_text_to_user(provider, user_id, content)
+    observe_im_send(provider.value, "bot", result.success, time.perf_counter() - start)
+    return result
+
+
+async def _send_text_to_user(provider: IMProvider, user_id: str, content: str) -> ChannelSendResult:
     if provider == IMProvider.DISCORD:
         bot = get_discord_bot()
         if not bot or not bot.connected:
@@ -56,6 +65,13 @@ async def send_reminder(reminder: Reminder, is_advance: bool = False) -> bool:
     except ValueError:
         provider = get_default_provider()
 
+    start = time.perf_counter()
+    success = await _send_reminder(provider, reminder, is_advance)
+    observe_im_send(provider.value, "reminder", success, time.perf_counter() - start)
+    return success
+
+
+async def _send_reminder(provider: IMProvider, reminder: Reminder, is_advance: bool) -> bool:
     if provider == IMProvider.FEISHU:
         bot = get_feishu_bot()
         if not bot:
@@ -1,5 +1,7 @@
+import time
+
 from app.channels.adapters import DingTalkAdapter, DiscordAdapter, FeishuAdapter, WeComAdapter
-from app.channels.message import IMMessage, IMSendResult
+from app.channels.message import IMMessage, IMSendResult, observe_im_send
 from app.config import IMConfig
 from app.enums import IMProvider
 
@@ -52,10 +54,17 @@ class IMManager:
     def get_available_providers(self) -> list[IMProvider]:
         return [p for p, cfg in self._configs.items() if cfg.enabled]
 
+    @staticmethod
+    async def _send(adapter: IMAdapter, message: IMMessage) -> IMSendResult:
+        start = time.perf_counter()
+        result = await adapter.send(message)
+        observe_im_send(adapter.name, "webhook", result.success, time.perf_counter() - start)
+        return result
+
     async def send_to_all(self, message: IMMessage) -> list[IMSendResult]:
         results = []
         for adapter in self.get_all_adapters():
-            result = await adapter.send(message)
+            result = await self._send(adapter, message)
             results.append(result)
         return results
 
@@ -63,4 +72,4 @@ class IMManager:
         adapter = self.get_adapter(provider)
         if not adapter:
             return IMSendResult(success=False, error=f"IM provider {provider.value} not configured")
-        return await adapter.send(message)
+        return await self._send(adapter, message)
@@ -6,7 +6,7 @@ from pydantic import TypeAdapter, ValidationError, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from app.constants import CACHE_DEFAULT_TTL, CACHE_PROMPT_TTL, DEFAULT_EMBEDDING_DIMENSION
-from app.enums import Environment, IMProvider
+from app.enums import Environment, IMProvider, PlannerMode
 
 
 class IMConfig:
@@ -84,6 +84,7 @@ class Settings(BaseSettings):
     note_system: str = "logseq"
     note_path: str = "storage/logseq"
     note_git_enabled: bool = True
+    note_git_timeout: float = 20.0
 
     llm_model: str = "openai/gpt-4o-mini"
     llm_api_key: str = ""
@@ -93,6 +94,33 @@ class Settings(BaseSettings):
     agent_max_steps: int = 4
     agent_planner_max_tokens: int | None = None
     agent_trace_enabled: bool = True
+    agent_trace_buffer_size: int = 4096
+    agent_trace_batch_size: int = 256
+    agent_trace_flush_interval: float = 1.0
+    agent_trace_compress: bool = False
+    agent_trace_index_enabled: bool = True
+    agent_trace_index_path: str = "storage/agent_traces/index.db"
+    agent_fast_path_enabled: bool = True
+    agent_tool_timeout: float = 30.0
+    agent_run_timeout: float = 60.0
+    agent_tool_cache_enabled: bool = True
+    agent_prompt_cache: bool = True
+    agent_planner_mode: PlannerMode = PlannerMode.AUTO
+    agent_session_ttl: int = 604800
+    agent_session_local_max_entries: int = 1024
+    agent_session_local_ttl: float = 5.0
+    agent_scratchpad_step_tokens: int = 400
+    web_search_endpoint: str = "https://zh.wikipedia.org/w/api.php"
+    web_search_cache_ttl: int = 3600
+    web_search_cache_max_entries: int = 512
+    http_client_timeout: float = 10.0
+    http_client_http2: bool = True
+    http_client_max_connections: int = 20
+    http_client_max_keepalive: int = 10
+    http_client_keepalive_expiry: float = 30.0
+    bot_stream_replies: bool = True
+    bot_stream_edit_interval: float = 1.0
+    bot_reply_cache_ttl: int = 86400
     intent_enabled: bool = True
     intent_model: str = ""
     intent_base_url: str = ""
@@ -100,13 +128,28 @@ class Settings(BaseSettings):
     intent_max_tokens: int | None = None
     intent_confidence_threshold: float = 0.55
     memory_judge_max_tokens: int | None = None
+    memory_overfetch_factor: int = 3
+    memory_overfetch_max: int = 4096
+    rag_max_context_tokens: int = 2800
+    rag_context_cache_ttl: int = 120
+    answer_cache_ttl: int = 3600
+    answer_cache_similarity: float = 0.95
+    answer_cache_max_entries: int = 2048
     embedding_model: str = "openai/text-embedding-3-small"
     embedding_dimension: int = DEFAULT_EMBEDDING_DIMENSION
 
     vector_index_path: str = "storage/vectors/index.faiss"
     memory_vector_index_path: str = "storage/vectors/memory.index"
+    keyword_index_path: str = "storage/vectors/keyword.db"
+    retrieval_rrf_k: int = 60
     cn_holidays: list[str] = []
     cn_makeup_workdays: list[str] = []
+    reminder_horizon_hours: int = 24
+    reminder_sync_interval: float = 300.0
+    reminder_send_retry_delay: float = 30.0
+    reminder_dispatch_workers: int = 32
+    reminder_provider_concurrency: int = 8
+    reminder_flush_interval: float = 0.2
 
     api_key: str = ""
     api_key_header: str = "X-API-Key"
@@ -1,3 +1,6 @@
+from collections.abc import AsyncIterator
+
+import httpx
 from dishka import Provider, Scope, provide
 
 from app.bot.message_service import BotMessageService
@@ -12,8 +15,11 @@ from app.repositories import (
     PromptTemplateRepository,
 )
 from app.services import (
+    AgentReplayer,
+    AgentTraceStore,
     CaptureService,
     EmbeddingService,
+    KeywordIndex,
     KnowledgeItemService,
     LLMService,
     MemoryEmbedder,
@@ -25,11 +31,18 @@ from app.services import (
     PromptService,
     PromptTemplateService,
     RetrievalService,
+    SearchProvider,
+    SemanticAnswerCache,
+    SessionStore,
     StructuringService,
     VectorStore,
+    WebSearchService,
+    WikipediaSearchProvider,
 )
 from app.services.cognitive_agent_service import CognitiveAgentService
 from app.services.intent_graph_service import IntentGraphService
+from app.services.trace_store import get_trace_store
+from app.utils.http import create_http_client
 
 
 class AppProvider(Provider):
@@ -54,8 +67,10 @@ class AppProvider(Provider):
         return PromptTemplateRepository()
 
     @provide(scope=Scope.APP)
-    def knowledge_item_service(self, repo: KnowledgeItemRepository) -> KnowledgeItemService:
-        return KnowledgeItemService(repo)
+    def knowledge_item_service(
+        self, repo: KnowledgeItemRepository, keyword_index: KeywordIndex
+    ) -> KnowledgeItemService:
+        return KnowledgeItemService(repo, keyword_index)
 
     @provide(scope=Scope.APP)
     def capture_service(self, knowledge_service: KnowledgeItemService) -> CaptureService:
@@ -86,13 +101,53 @@ class AppProvider(Provider):
     def intent_graph_service(self, llm_service: LLMService) -> IntentGraphService:
         return IntentGraphService(llm_service=llm_service)
 
+    @provide(scope=Scope.APP)
+    async def http_client(self) -> AsyncIterator[httpx.AsyncClient]:
+        client = create_http_client()
+        yield client
+        await client.aclose()
+
+    @provide(scope=Scope.APP)
+    def search_provider(self, client: httpx.AsyncClient) -> SearchProvider:
+        return WikipediaSearchProvider(client)
+
+    @provide(scope=Scope.APP)
+    def web_search_service(self, provider: SearchProvider) -> WebSearchService:
+        return WebSearchService(provider)
+
     @provide(scope=Scope.APP)
     def cognitive_agent_service(
         self,
         note_service: NoteService,
         llm_service: LLMService,
+        session_store: SessionStore,
+        web_search: WebSearchService,
     ) -> CognitiveAgentService:
-        return CognitiveAgentService(note_service=note_service, llm_service=llm_service)
+        return CognitiveAgentService(
+            note_service=note_service,
+            llm_service=llm_service,
+            session_store=session_store,
+            web_search=web_search,
+        )
+
+    @provide(scope=Scope.APP)
+    def session_store(self) -> SessionStore:
+        return SessionStore()
+
+    @provide(scope=Scope.APP)
+    def agent_trace_store(self) -> AgentTraceStore:
+        return get_trace_store()
+
+    @provide(scope=Scope.APP)
+    def agent_replayer(
+        self,
+        llm_service: LLMService,
+        trace_store: AgentTraceStore,
+        web_search: WebSearchService,
+    ) -> AgentReplayer:
+        return AgentReplayer(
+            llm_service=llm_service, trace_store=trace_store, web_search=web_search
+        )
 
     @provide(scope=Scope.APP)
     def bot_message_service(
@@ -115,6 +170,14 @@ class AppProvider(Provider):
     def vector_store(self) -> VectorStore:
         return VectorStore()
 
+    @provide(scope=Scope.APP)
+    def keyword_index(self) -> KeywordIndex:
+        return KeywordIndex()
+
+    @provide(scope=Scope.APP)
+    def answer_cache(self) -> SemanticAnswerCache:
+        return SemanticAnswerCache()
+
     @provide(scope=Scope.APP)
     def memory_store(self) -> MemoryFAISSStore:
         return MemoryFAISSStore()
@@ -175,6 +238,8 @@ class AppProvider(Provider):
         vector_store: VectorStore,
         prompt_service: PromptService,
         memory_orchestrator: MemoryOrchestrator,
+        keyword_index: KeywordIndex,
+        answer_cache: SemanticAnswerCache,
     ) -> RetrievalService:
         return RetrievalService(
             llm_service,
@@ -183,4 +248,6 @@ class AppProvider(Provider):
             vector_store,
             prompt_service,
             memory_orchestrator,
+            keyword_index,
+            answer_cache,
         )
@@ -1,3 +1,4 @@
+from .engine import InstrumentedSQLiteEngine
 from .exceptions import (
     AppError,
     AppException,
@@ -45,6 +46,7 @@ __all__ = [
     "StorageException",
     "ValidationError",
     "ValidationException",
+    "InstrumentedSQLiteEngine",
     "BaseModel",
     "BaseRepository",
     "CursorPage",
@@ -0,0 +1,35 @@
+import time
+from typing import Any
+
+from piccolo.engine.sqlite import SQLiteEngine
+from piccolo.querystring import QueryString
+
+from app.utils.metrics import REGISTRY
+
+SQLITE_QUERY_SECONDS = REGISTRY.histogram(
+    "cognitive_sqlite_query_seconds",
+    "SQLite query duration by statement type and table",
+    ("query_type", "table"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+class InstrumentedSQLiteEngine(SQLiteEngine):
+    """SQLite engine that records the duration of every query it runs."""
+
+    async def run_querystring(self, querystring: QueryString, in_pool: bool = False) -> Any:
+        start = time.perf_counter()
+        try:
+            return await super().run_querystring(querystring, in_pool=in_pool)
+        finally:
+            table = querystring.table._meta.tablename if querystring.table else ""
+            SQLITE_QUERY_SECONDS.observe(
+                time.perf_counter() - start, query_type=querystring.query_type, table=table
+            )
+
+    async def run_ddl(self, ddl: str, in_pool: bool = False) -> Any:
+        start = time.perf_counter()
+        try:
+            return await super().run_ddl(ddl, in_pool=in_pool)
+        finally:
+            SQLITE_QUERY_SECONDS.observe(time.perf_counter() - start, query_type="ddl", table="")
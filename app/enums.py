@@ -1,4 +1,4 @@
-from enum import Enum
+from enum import Enum, StrEnum
 
 
 class Environment(str, Enum):
@@ -16,6 +16,12 @@ class IMProvider(str, Enum):
     SLACK = "slack"
 
 
+class PlannerMode(StrEnum):
+    AUTO = "auto"
+    TOOLS = "tools"
+    JSON = "json"
+
+
 class SortField(str, Enum):
     CREATED_AT = "created_at"
     UPDATED_AT = "updated_at"
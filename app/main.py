@@ -13,7 +13,8 @@ from app.enums import ErrorCode
 from app.middleware import APIKeyMiddleware, IMSignatureMiddleware, RequestTrackingMiddleware
 from app.routes.v1 import v1_router
 from app.runtime import set_app_container
-from app.services import PromptService, PromptTemplateService
+from app.services import PromptService, PromptTemplateService, RetrievalService
+from app.services.agent_trace import get_trace_writer
 from app.utils.logging import logger
 
 
@@ -87,13 +88,25 @@ async def seed_prompts() -> None:
             logger.info(f"Seeded {template_count} default prompt templates")
 
 
+async def backfill_keyword_index() -> None:
+    async with _container() as request_container:
+        service = await request_container.get(RetrievalService)
+        try:
+            await service.backfill_keyword_index()
+        except Exception as e:
+            logger.warning(f"Keyword index backfill failed: {e}")
+
+
 async def on_startup() -> None:
     await seed_prompts()
+    await backfill_keyword_index()
     await start_bot()
 
 
 async def on_shutdown() -> None:
     await stop_bot()
+    await get_trace_writer().close()
+    await _container.close()
 
 
 app = Litestar(
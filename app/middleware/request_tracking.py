@@ -6,6 +6,13 @@ from litestar.middleware import AbstractMiddleware
 from litestar.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.utils.logging import get_logger, set_request_id
+from app.utils.metrics import REGISTRY
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "cognitive_http_request_seconds",
+    "HTTP request duration by route template and status",
+    ("method", "route", "status"),
+)
 
 
 class RequestTrackingMiddleware(AbstractMiddleware):
@@ -44,5 +51,14 @@ class RequestTrackingMiddleware(AbstractMiddleware):
             self.logger.info(f"<-- {method} {path} {status_code} {duration_ms:.2f}ms")
         except Exception as e:
             duration_ms = (time.perf_counter() - start_time) * 1000
+            status_code = 500
             self.logger.error(f"<-- {method} {path} 500 {duration_ms:.2f}ms - {e}")
             raise
+        finally:
+            # Label by route template rather than raw path to keep cardinality bounded.
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start_time,
+                method=method,
+                route=scope.get("path_template") or "unmatched",
+                status=str(status_code),
+            )
@@ -19,10 +19,16 @@ class GitResult:
 
 
 class LogseqAdapter(NoteAdapter):
-    def __init__(self, base_path: str | Path = "storage/logseq", auto_git: bool = True) -> None:
+    def __init__(
+        self,
+        base_path: str | Path = "storage/logseq",
+        auto_git: bool = True,
+        git_timeout: float | None = None,
+    ) -> None:
         self.base_path = Path(base_path)
         self.journals_path = self.base_path / "journals"
         self.auto_git = auto_git
+        self.git_timeout = git_timeout
         self._ensure_directories()
 
     def _ensure_directories(self) -> None:
@@ -35,11 +41,16 @@ class LogseqAdapter(NoteAdapter):
             cwd=str(self.base_path),
             capture_output=True,
             text=True,
+            timeout=self.git_timeout,
         )
 
     async def _git(self, *args: str) -> GitResult:
         try:
             result = await asyncio.to_thread(self._run_git_command, *args)
+        except subprocess.TimeoutExpired:
+            # subprocess.run kills the child, so a hung push or pull never outlives this.
+            logger.warning(f"Git {args[0]} timed out after {self.git_timeout}s")
+            return GitResult(ok=False, reason="timeout")
         except Exception as e:
             return GitResult(ok=False, stderr=str(e), reason="exec_error")
 
@@ -9,11 +9,13 @@ def get_note_adapter() -> NoteAdapter:
         return LogseqAdapter(
             base_path=settings.note_path,
             auto_git=settings.note_git_enabled,
+            git_timeout=settings.note_git_timeout,
         )
     else:
         return LogseqAdapter(
             base_path=settings.note_path,
             auto_git=settings.note_git_enabled,
+            git_timeout=settings.note_git_timeout,
         )
 
 
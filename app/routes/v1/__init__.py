@@ -1,8 +1,10 @@
 from litestar import Router
 
+from .agent import AgentController
 from .health import HealthController
 from .im import IMController
 from .items import ItemsController
+from .metrics import MetricsController
 from .prompts import PromptsController
 from .retrieval import RetrievalController
 from .webhook import WebhookController
@@ -16,5 +18,7 @@ v1_router = Router(
         IMController,
         RetrievalController,
         PromptsController,
+        AgentController,
+        MetricsController,
     ],
 )
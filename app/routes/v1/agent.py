@@ -0,0 +1,81 @@
+import asyncio
+
+from dishka import FromDishka
+from dishka.integrations.litestar import inject
+from litestar import Controller, get, post
+from litestar.params import Parameter
+
+from app.core import NotFoundError
+from app.schemas import AgentReplayResponse, AgentTraceDetail, AgentTraceRun
+from app.services import AgentReplayer, AgentTraceStore
+
+
+class AgentController(Controller):
+    path = "/agent"
+    tags = ["智能体"]
+
+    @get(
+        path="/traces",
+        summary="查询智能体运行轨迹",
+        description=(
+            "按开始时间倒序列出智能体运行，支持按用户与工具调用筛选。"
+            "before 传入上一页最后一条的 started_at 即可翻页。"
+        ),
+    )
+    @inject
+    async def list_traces(
+        self,
+        trace_store: FromDishka[AgentTraceStore],
+        user_id: str | None = None,
+        action: str | None = None,
+        before: str | None = None,
+        limit: int = Parameter(default=50, ge=1, le=200),
+    ) -> list[AgentTraceRun]:
+        runs = await asyncio.to_thread(trace_store.list_runs, user_id, action, before, limit)
+        return [AgentTraceRun(**run) for run in runs]
+
+    @get(
+        path="/traces/{run_id:str}",
+        summary="获取单次运行轨迹",
+        description="返回运行摘要及全部轨迹事件，用于排查与回放诊断。",
+    )
+    @inject
+    async def get_trace(
+        self,
+        run_id: str,
+        trace_store: FromDishka[AgentTraceStore],
+    ) -> AgentTraceDetail:
+        run = await asyncio.to_thread(trace_store.get_run, run_id)
+        if run is None:
+            raise NotFoundError("Agent run", run_id)
+        events = await asyncio.to_thread(trace_store.get_events, run_id)
+        return AgentTraceDetail(run=AgentTraceRun(**run), events=events)
+
+    @post(
+        path="/traces/{run_id:str}/replay",
+        summary="回放运行",
+        description=(
+            "以原运行记录的工具结果替代真实工具，重新执行规划器，"
+            "对比决策序列与规划耗时。回放不会写入轨迹，也不会产生任何副作用。"
+        ),
+    )
+    @inject
+    async def replay_trace(
+        self,
+        run_id: str,
+        replayer: FromDishka[AgentReplayer],
+    ) -> AgentReplayResponse:
+        report = await replayer.replay(run_id)
+        if report is None:
+            raise NotFoundError("Agent run", run_id)
+        return AgentReplayResponse(
+            run_id=report.run_id,
+            replay_run_id=report.replay_run_id,
+            decisions_match=report.decisions_match,
+            recorded_actions=report.recorded_actions,
+            replayed_actions=report.replayed_actions,
+            recorded_planner_ms=report.recorded_planner_ms,
+            replayed_planner_ms=report.replayed_planner_ms,
+            recorded_response=report.recorded_response,
+            replayed_response=report.replayed_response,
+        )
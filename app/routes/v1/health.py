@@ -3,6 +3,7 @@ from typing import Any
 
 from litestar import Controller, get
 
+from app.bot.reply_renderer import get_render_stats
 from app.channels.registry import CHANNEL_STATUS_GETTERS
 from app.constants import API_VERSION
 from app.utils import utc_time
@@ -47,6 +48,8 @@ class HealthController(Controller):
 
             dependencies[f"{provider}_bot"] = payload
 
+        dependencies["feishu_reply_render"] = get_render_stats()
+
         if not health_flags or all(health_flags):
             status = "healthy"
         elif any(health_flags):
@@ -0,0 +1,52 @@
+from litestar import Controller, MediaType, Response, get
+
+from app.schemas import CacheLookups, LatencySummaryResponse, SpanLatency, TokenUsage
+from app.utils.metrics import REGISTRY, latency_summary
+
+# Litestar appends the charset for text media types.
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+class MetricsController(Controller):
+    path = "/metrics"
+    tags = ["系统"]
+
+    @get(
+        summary="Prometheus 指标",
+        description=(
+            "以 Prometheus 文本格式导出全部指标：HTTP 路由耗时、LLM 调用（按模型与节点）、"
+            "embedding 缓存命中、FAISS 检索耗时与向量数、SQLite 查询耗时、提醒检查延迟、"
+            "IM 发送成功率与耗时。"
+        ),
+        media_type=MediaType.TEXT,
+    )
+    async def prometheus(self) -> Response[str]:
+        return Response(content=REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    @get(
+        path="/latency",
+        summary="耗时与 token 统计",
+        description=(
+            "返回智能体各节点、工具调用、LLM 与 embedding 调用的 P50/P95/P99 耗时，"
+            "以及按模型与节点累计的 token 用量和缓存命中次数。分位数基于每类最近 2048 次调用。"
+        ),
+    )
+    async def latency(self) -> LatencySummaryResponse:
+        summary = latency_summary()
+        return LatencySummaryResponse(
+            spans=[
+                SpanLatency(
+                    kind=row["kind"],
+                    name=row["name"],
+                    node=row["node"],
+                    count=row["count"],
+                    mean_ms=round(row["sum"] / row["count"] * 1000, 3) if row["count"] else 0.0,
+                    p50_ms=round(row["p50"] * 1000, 3),
+                    p95_ms=round(row["p95"] * 1000, 3),
+                    p99_ms=round(row["p99"] * 1000, 3),
+                )
+                for row in summary["spans"]
+            ],
+            tokens=[TokenUsage(**row) for row in summary["tokens"]],
+            cache=[CacheLookups(**row) for row in summary["cache"]],
+        )
@@ -1,19 +1,29 @@
+from collections.abc import AsyncIterator
+from typing import Any
 from uuid import UUID
 
 from dishka import FromDishka
 from dishka.integrations.litestar import inject
 from litestar import Controller, post
+from litestar.response import ServerSentEvent
+from litestar.response.sse import ServerSentEventMessage
+from litestar.serialization import encode_json
 
+from app.models import KnowledgeItem
 from app.schemas import (
     IndexResponse,
     KnowledgeItemResponse,
+    RAGMemoryHit,
     RAGRequest,
     RAGResponse,
+    RAGSourceScore,
     RebuildIndexResponse,
     SearchRequest,
     SearchResult,
 )
 from app.services import RetrievalService
+from app.services.retrieval_service import RAGResult
+from app.utils import logger
 
 
 class RetrievalController(Controller):
@@ -23,7 +33,10 @@ class RetrievalController(Controller):
     @post(
         path="/search",
         summary="语义搜索",
-        description="基于向量相似度搜索知识库，返回与查询最相关的知识项。距离值越小表示相似度越高。",
+        description=(
+            "基于向量相似度搜索知识库，返回与查询最相关的知识项。距离值越小表示相似度越高。"
+            "mode=hybrid 时并行执行向量检索与全文检索（BM25），按倒数排名融合。"
+        ),
     )
     @inject
     async def search(
@@ -31,24 +44,23 @@ class RetrievalController(Controller):
         data: SearchRequest,
         retrieval_service: FromDishka[RetrievalService],
     ) -> list[SearchResult]:
-        results = await retrieval_service.search_similar(data.query, data.top_k)
+        results = await retrieval_service.search(data.query, data.top_k, mode=data.mode)
+        items = await retrieval_service.knowledge_service.get_by_ids(
+            [result["item_id"] for result in results]
+        )
+        by_id = {item.id: item for item in items}
 
         search_results = []
         for result in results:
-            item = await retrieval_service.knowledge_service.get_by_id(result["item_id"])
+            # The indexes can briefly outlive a deleted item; skip what no longer resolves.
+            item = by_id.get(result["item_id"])
+            if item is None:
+                continue
             search_results.append(
                 SearchResult(
-                    item=KnowledgeItemResponse(
-                        uuid=item.uuid,
-                        raw_text=item.raw_text,
-                        structured_text=item.structured_text,
-                        source=item.source,
-                        tags=item.tags or [],
-                        links=item.links or [],
-                        created_at=item.created_at.isoformat() if item.created_at else "",
-                        updated_at=item.updated_at.isoformat() if item.updated_at else "",
-                    ),
-                    distance=result["distance"],
+                    item=self._item_response(item),
+                    distance=result.get("distance"),
+                    score=result.get("score", result.get("bm25")),
                 )
             )
 
@@ -65,25 +77,79 @@ class RetrievalController(Controller):
         data: RAGRequest,
         retrieval_service: FromDishka[RetrievalService],
     ) -> RAGResponse:
-        answer = await retrieval_service.rag_query(data.query, data.top_k, user_id=data.user_id)
+        result = await retrieval_service.rag_query(
+            data.query, data.top_k, user_id=data.user_id, mode=data.mode
+        )
 
-        items = await retrieval_service.search_and_retrieve(data.query, data.top_k)
+        return self._rag_response(data.query, result)
 
-        sources = [
-            KnowledgeItemResponse(
-                uuid=item.uuid,
-                raw_text=item.raw_text,
-                structured_text=item.structured_text,
-                source=item.source,
-                tags=item.tags or [],
-                links=item.links or [],
-                created_at=item.created_at.isoformat() if item.created_at else "",
-                updated_at=item.updated_at.isoformat() if item.updated_at else "",
+    @post(
+        path="/rag/stream",
+        summary="RAG 流式问答",
+        description=(
+            "与 /rag 相同的检索增强生成，以 Server-Sent Events 返回："
+            "先发送 sources 事件（引用来源与记忆），再逐段发送 token 事件，最后发送 done 事件。"
+            "中途出错时以 error 事件结束，不发送 done，已发送的 token 应视为不完整。"
+            "长期记忆写回在流结束后进行。"
+        ),
+    )
+    @inject
+    async def rag_stream(
+        self,
+        data: RAGRequest,
+        retrieval_service: FromDishka[RetrievalService],
+    ) -> ServerSentEvent:
+        async def events() -> AsyncIterator[ServerSentEventMessage]:
+            try:
+                async for event, payload in retrieval_service.rag_stream(
+                    data.query, data.top_k, user_id=data.user_id, mode=data.mode
+                ):
+                    if event == "token":
+                        body: Any = {"text": payload}
+                    else:
+                        body = self._rag_response(data.query, payload)
+                    yield ServerSentEventMessage(event=event, data=encode_json(body).decode())
+            except Exception as e:
+                # The response has already started; an explicit event is the only way
+                # to tell the client the answer is truncated.
+                logger.error(f"RAG stream failed: {e}")
+                body = {"message": "回答生成失败，请稍后重试。"}
+                yield ServerSentEventMessage(event="error", data=encode_json(body).decode())
+
+        return ServerSentEvent(events())
+
+    @staticmethod
+    def _item_response(item: KnowledgeItem) -> KnowledgeItemResponse:
+        return KnowledgeItemResponse(
+            uuid=item.uuid,
+            raw_text=item.raw_text,
+            structured_text=item.structured_text,
+            source=item.source,
+            tags=item.tags or [],
+            links=item.links or [],
+            created_at=item.created_at.isoformat() if item.created_at else "",
+            updated_at=item.updated_at.isoformat() if item.updated_at else "",
+        )
+
+    @classmethod
+    def _rag_response(cls, query: str, result: RAGResult) -> RAGResponse:
+        source_scores = [
+            RAGSourceScore(
+                uuid=str(item.uuid),
+                distance=result.scores.get(item.id, {}).get("distance"),
+                score=result.scores.get(item.id, {}).get("score"),
             )
-            for item in items
+            for item in result.knowledge_items
         ]
-
-        return RAGResponse(query=data.query, answer=answer, sources=sources)
+        return RAGResponse(
+            query=query,
+            answer=result.answer,
+            sources=[cls._item_response(item) for item in result.knowledge_items],
+            source_scores=source_scores,
+            memory_hits=[RAGMemoryHit(**hit) for hit in result.memory_hits],
+            timings=result.timings,
+            cache=result.cache,
+        )
 
     @post(
         path="/index/{item_uuid:uuid}",
@@ -1,3 +1,4 @@
+from .agent import AgentReplayResponse, AgentTraceDetail, AgentTraceRun
 from .common import CursorPaginationResponse
 from .im import (
     IMNotifyResponse,
@@ -9,6 +10,7 @@ from .im import (
     WebhookRequest,
     WebhookResponse,
 )
+from .metrics import CacheLookups, LatencySummaryResponse, SpanLatency, TokenUsage
 from .prompt import (
     PromptCreateRequest,
     PromptDeleteResponse,
@@ -17,8 +19,10 @@ from .prompt import (
 )
 from .retrieval import (
     IndexResponse,
+    RAGMemoryHit,
     RAGRequest,
     RAGResponse,
+    RAGSourceScore,
     RebuildIndexResponse,
     SearchRequest,
     SearchResult,
@@ -32,6 +36,9 @@ from .webhook import (
 )
 
 __all__ = [
+    "AgentReplayResponse",
+    "AgentTraceDetail",
+    "AgentTraceRun",
     "CursorPaginationResponse",
     "IMNotifyResponse",
     "IMProviderInfo",
@@ -41,13 +48,19 @@ __all__ = [
     "SetUserChannelResponse",
     "WebhookRequest",
     "WebhookResponse",
+    "CacheLookups",
+    "LatencySummaryResponse",
+    "SpanLatency",
+    "TokenUsage",
     "PromptCreateRequest",
     "PromptDeleteResponse",
     "PromptResponse",
     "PromptUpdateRequest",
     "IndexResponse",
+    "RAGMemoryHit",
     "RAGRequest",
     "RAGResponse",
+    "RAGSourceScore",
     "RebuildIndexResponse",
     "SearchRequest",
     "SearchResult",
@@ -0,0 +1,40 @@
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class AgentTraceRun:
+    run_id: str = field(metadata={"description": "运行 ID"})
+    user_id: str | None = field(metadata={"description": "用户 ID"})
+    provider: str | None = field(metadata={"description": "消息来源渠道"})
+    text: str | None = field(metadata={"description": "用户输入"})
+    started_at: str | None = field(metadata={"description": "开始时间 (ISO 8601)"})
+    ended_at: str | None = field(metadata={"description": "结束时间 (ISO 8601)，未结束为 null"})
+    latency_ms: float | None = field(metadata={"description": "整体耗时（毫秒）"})
+    steps: int | None = field(metadata={"description": "执行步数"})
+    done: bool = field(metadata={"description": "是否正常结束"})
+    fast_path: str | None = field(metadata={"description": "命中的快速路由规则，未命中为 null"})
+    prompt_tokens: int | None = field(metadata={"description": "规划器输入 token 总数"})
+    completion_tokens: int | None = field(metadata={"description": "规划器输出 token 总数"})
+    response: str | None = field(metadata={"description": "最终回复"})
+
+
+@dataclass
+class AgentTraceDetail:
+    run: AgentTraceRun = field(metadata={"description": "运行摘要"})
+    events: list[dict[str, Any]] = field(
+        metadata={"description": "按时间顺序的轨迹事件（run_start / plan_call / tool_call …）"}
+    )
+
+
+@dataclass
+class AgentReplayResponse:
+    run_id: str = field(metadata={"description": "被回放的运行 ID"})
+    replay_run_id: str = field(metadata={"description": "回放产生的运行 ID（不写入轨迹）"})
+    decisions_match: bool = field(metadata={"description": "回放的工具调用序列是否与原运行一致"})
+    recorded_actions: list[str] = field(metadata={"description": "原运行的工具调用序列"})
+    replayed_actions: list[str] = field(metadata={"description": "回放的工具调用序列"})
+    recorded_planner_ms: list[float] = field(metadata={"description": "原运行每步规划耗时（毫秒）"})
+    replayed_planner_ms: list[float] = field(metadata={"description": "回放每步规划耗时（毫秒）"})
+    recorded_response: str = field(metadata={"description": "原运行的最终回复"})
+    replayed_response: str = field(metadata={"description": "回放的最终回复"})
@@ -0,0 +1,39 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class SpanLatency:
+    kind: str = field(
+        metadata={"description": "类型：agent_node / tool / llm / llm_stream / embedding"}
+    )
+    name: str = field(metadata={"description": "节点名、工具名或模型名"})
+    node: str = field(metadata={"description": "所属智能体节点，非智能体调用为空"})
+    count: int = field(metadata={"description": "调用次数"})
+    mean_ms: float = field(metadata={"description": "平均耗时（毫秒）"})
+    p50_ms: float = field(metadata={"description": "近期调用 P50 耗时（毫秒）"})
+    p95_ms: float = field(metadata={"description": "近期调用 P95 耗时（毫秒）"})
+    p99_ms: float = field(metadata={"description": "近期调用 P99 耗时（毫秒）"})
+
+
+@dataclass
+class TokenUsage:
+    kind: str = field(metadata={"description": "类型"})
+    name: str = field(metadata={"description": "模型名"})
+    node: str = field(metadata={"description": "所属智能体节点"})
+    type: str = field(metadata={"description": "prompt / completion / cached"})
+    value: int = field(metadata={"description": "累计 token 数"})
+
+
+@dataclass
+class CacheLookups:
+    kind: str = field(metadata={"description": "类型"})
+    name: str = field(metadata={"description": "模型名"})
+    result: str = field(metadata={"description": "hit / miss"})
+    value: int = field(metadata={"description": "累计次数"})
+
+
+@dataclass
+class LatencySummaryResponse:
+    spans: list[SpanLatency] = field(metadata={"description": "各节点、工具与模型调用的耗时分布"})
+    tokens: list[TokenUsage] = field(metadata={"description": "按模型与节点累计的 token 用量"})
+    cache: list[CacheLookups] = field(metadata={"description": "缓存命中统计（如 embedding 缓存）"})
@@ -1,4 +1,5 @@
 from dataclasses import dataclass, field
+from typing import Literal
 
 from .webhook import KnowledgeItemResponse
 
@@ -18,12 +19,25 @@ class SearchRequest:
             "examples": [5, 10],
         },
     )
+    mode: Literal["vector", "keyword", "hybrid"] = field(
+        default="vector",
+        metadata={
+            "description": "检索模式：vector（向量）/ keyword（全文）/ hybrid（向量 + 全文 RRF 融合）",
+            "examples": ["vector", "hybrid"],
+        },
+    )
 
 
 @dataclass
 class SearchResult:
     item: KnowledgeItemResponse = field(metadata={"description": "知识项详情"})
-    distance: float = field(metadata={"description": "向量距离（越小越相似）"})
+    distance: float | None = field(
+        metadata={"description": "向量距离（越小越相似），仅全文命中时为 null"}
+    )
+    score: float | None = field(
+        default=None,
+        metadata={"description": "相关性得分（越大越相关），keyword 为 BM25，hybrid 为 RRF"},
+    )
 
 
 @dataclass
@@ -48,6 +62,33 @@ class RAGRequest:
             "examples": ["default", "u_123"],
         },
     )
+    mode: Literal["vector", "keyword", "hybrid"] = field(
+        default="vector",
+        metadata={
+            "description": "知识库检索模式：vector / keyword / hybrid",
+            "examples": ["vector", "hybrid"],
+        },
+    )
+
+
+@dataclass
+class RAGSourceScore:
+    uuid: str = field(metadata={"description": "知识项 UUID"})
+    distance: float | None = field(
+        default=None, metadata={"description": "向量距离（越小越相似），仅全文命中时为 null"}
+    )
+    score: float | None = field(
+        default=None, metadata={"description": "相关性得分，keyword 为 BM25，hybrid 为 RRF"}
+    )
+
+
+@dataclass
+class RAGMemoryHit:
+    memory_id: int = field(metadata={"description": "记忆 ID"})
+    memory_type: str = field(metadata={"description": "记忆类型"})
+    content: str = field(metadata={"description": "记忆摘要或正文"})
+    similarity: float = field(metadata={"description": "向量相似度"})
+    score: float = field(metadata={"description": "综合相似度、重要性与时间衰减的最终得分"})
 
 
 @dataclass
@@ -55,6 +96,23 @@ class RAGResponse:
     query: str = field(metadata={"description": "原始问题"})
     answer: str = field(metadata={"description": "LLM 生成的回答"})
     sources: list[KnowledgeItemResponse] = field(metadata={"description": "引用的知识项列表"})
+    source_scores: list[RAGSourceScore] = field(
+        default_factory=list, metadata={"description": "引用知识项的检索得分，与 sources 一一对应"}
+    )
+    memory_hits: list[RAGMemoryHit] = field(
+        default_factory=list, metadata={"description": "进入上下文的长期记忆"}
+    )
+    timings: dict[str, float] = field(
+        default_factory=dict,
+        metadata={
+            "description": "各阶段耗时（毫秒）",
+            "examples": [{"embed_ms": 120.5, "retrieve_ms": 8.2, "total_ms": 1630.0}],
+        },
+    )
+    cache: str | None = field(
+        default=None,
+        metadata={"description": "命中的缓存：answer（语义答案缓存）/ context（上下文缓存）"},
+    )
 
 
 @dataclass
@@ -1,6 +1,9 @@
+from .agent_replay import AgentReplayer
+from .answer_cache import SemanticAnswerCache
 from .capture_service import CaptureService
 from .cognitive_agent_service import AgentOutcome, CognitiveAgentService
 from .embedding_service import EmbeddingService
+from .keyword_index import KeywordIndex
 from .knowledge_item_service import KnowledgeItemService
 from .llm_service import LLMService
 from .memory import (
@@ -15,14 +18,26 @@ from .prompt_service import PromptService
 from .prompt_template_service import PromptTemplateService
 from .reminder_service import ReminderService
 from .retrieval_service import RetrievalService
+from .session_store import SessionStore
 from .structuring_service import StructuringService
+from .trace_store import AgentTraceStore
 from .vector_store import VectorStore
+from .web_search import (
+    SearchHit,
+    SearchProvider,
+    StaticSearchProvider,
+    WebSearchService,
+    WikipediaSearchProvider,
+)
 
 __all__ = [
+    "AgentReplayer",
+    "AgentTraceStore",
     "CaptureService",
     "AgentOutcome",
     "CognitiveAgentService",
     "EmbeddingService",
+    "KeywordIndex",
     "KnowledgeItemService",
     "LLMService",
     "MemoryEmbedder",
@@ -35,6 +50,13 @@ __all__ = [
     "PromptTemplateService",
     "ReminderService",
     "RetrievalService",
+    "SearchHit",
+    "SearchProvider",
+    "SemanticAnswerCache",
+    "SessionStore",
+    "StaticSearchProvider",
     "StructuringService",
     "VectorStore",
+    "WebSearchService",
+    "WikipediaSearchProvider",
 ]
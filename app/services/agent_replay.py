@@ -0,0 +1,156 @@
+import asyncio
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.agents import ToolContext, ToolResult
+from app.core import ValidationError
+from app.utils import logger
+
+from .agent_trace import TraceWriter
+from .cognitive_agent_service import CognitiveAgentService
+from .llm_service import LLMService
+from .session_store import SessionStore
+from .trace_store import AgentTraceStore
+from .web_search import WebSearchService
+
+# Observation returned when the replayed planner calls a tool more often than the
+# recorded run did.
+MISSING_OBSERVATION = "replay_missing_observation"
+
+
+@dataclass(slots=True)
+class ReplayReport:
+    run_id: str
+    recorded_actions: list[str]
+    replayed_actions: list[str]
+    recorded_planner_ms: list[float]
+    replayed_planner_ms: list[float]
+    recorded_response: str
+    replayed_response: str
+    replay_run_id: str = ""
+    replayed_events: list[dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def decisions_match(self) -> bool:
+        return self.recorded_actions == self.replayed_actions
+
+
+class _RecordingTraceWriter(TraceWriter):
+    """Keeps replayed events in memory so replays never reach the trace files or index."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.events: list[dict[str, Any]] = []
+
+    def emit(self, event: dict[str, Any]) -> None:
+        self.events.append(event)
+
+
+class _ReplaySessionStore(SessionStore):
+    def __init__(self, slot: dict[str, Any]) -> None:
+        super().__init__(ttl=0, local_max_entries=0, local_ttl=0)
+        self._slot = dict(slot)
+
+    async def get(self, session_id: str) -> dict[str, Any]:
+        return dict(self._slot)
+
+    async def update(self, session_id: str, values: dict[str, Any]) -> dict[str, Any]:
+        self._slot.update(values)
+        return dict(self._slot)
+
+
+def _actions(events: list[dict[str, Any]]) -> list[str]:
+    return [str(event.get("action")) for event in events if event.get("type") == "tool_call"]
+
+
+def _planner_ms(events: list[dict[str, Any]]) -> list[float]:
+    return [
+        float(event.get("latency_ms", 0.0)) for event in events if event.get("type") == "plan_call"
+    ]
+
+
+class AgentReplayer:
+    """Re-runs a recorded agent run with tools stubbed from its recorded observations.
+
+    The planner (and fast path) run for real, so a replay shows whether current prompts
+    and models still make the same decisions, and how long the planner takes now.
+    """
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        trace_store: AgentTraceStore,
+        web_search: WebSearchService | None = None,
+    ) -> None:
+        self.llm_service = llm_service
+        self.trace_store = trace_store
+        self.web_search = web_search
+
+    @staticmethod
+    def _stub_tools(service: CognitiveAgentService, events: list[dict[str, Any]]) -> None:
+        observations: dict[str, deque[str]] = defaultdict(deque)
+        for event in events:
+            if event.get("type") == "tool_call":
+                observations[str(event.get("action"))].append(str(event.get("observation", "")))
+
+        def stub(name: str):
+            async def run(_ctx: ToolContext, _args: dict[str, Any]) -> ToolResult:
+                queue = observations.get(name)
+                observation = queue.popleft() if queue else MISSING_OBSERVATION
+                return ToolResult(status="ok", observation=observation)
+
+            return run
+
+        # Recorded observations must win over anything in the shared tool cache, and
+        # replayed writes must not invalidate it.
+        service._tool_registry.cache_enabled = False
+        for tool in service._tool_registry.list_tools():
+            tool.handler = stub(tool.name)
+
+    async def replay(self, run_id: str) -> ReplayReport | None:
+        events = await asyncio.to_thread(self.trace_store.get_events, run_id)
+        if not events:
+            return None
+        start = next((event for event in events if event.get("type") == "run_start"), None)
+        if start is None or not start.get("text"):
+            raise ValidationError("Run has no recorded input to replay", detail={"run_id": run_id})
+        recorded_end = next((e for e in reversed(events) if e.get("type") == "run_end"), {})
+
+        recorder = _RecordingTraceWriter()
+        service = CognitiveAgentService(
+            llm_service=self.llm_service,
+            session_store=_ReplaySessionStore(
+                {
+                    "last_reminder_id": start.get("last_reminder_id"),
+                    "last_reminder_content": start.get("last_reminder_content", ""),
+                }
+            ),
+            trace_writer=recorder,
+            web_search=self.web_search,
+        )
+        self._stub_tools(service, events)
+
+        outcome = await service.run(
+            user_id=str(start.get("user_id", "")),
+            provider=str(start.get("provider", "")),
+            text=str(start["text"]),
+            channel_id=start.get("channel_id"),
+        )
+        report = ReplayReport(
+            run_id=run_id,
+            recorded_actions=_actions(events),
+            replayed_actions=_actions(recorder.events),
+            recorded_planner_ms=_planner_ms(events),
+            replayed_planner_ms=_planner_ms(recorder.events),
+            recorded_response=str(recorded_end.get("response", "")),
+            replayed_response=outcome.response,
+            replay_run_id=str(recorder.events[0].get("run_id", "")) if recorder.events else "",
+            replayed_events=recorder.events,
+        )
+        logger.info(
+            f"Replayed agent run {run_id}: decisions_match={report.decisions_match}, "
+            f"planner_ms {sum(report.recorded_planner_ms):.0f} -> "
+            f"{sum(report.replayed_planner_ms):.0f}"
+        )
+        return report
@@ -0,0 +1,154 @@
+import asyncio
+import contextlib
+import gzip
+import json
+from collections import deque
+from datetime import UTC, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import IO, Any
+
+from app.config import settings
+from app.utils import logger
+
+from .trace_store import AgentTraceStore, get_trace_store
+
+# Per-step detail that is useful for tuning but not needed to reconstruct a run; these
+# are the first to go when the buffer backs up.
+DEBUG_EVENT_TYPES = frozenset({"plan_call", "judge_continue"})
+
+
+class TraceWriter:
+    """Buffers agent trace events in memory and appends them to daily JSONL files in batches.
+
+    ``emit`` never blocks: events go into a bounded ring buffer drained by a background
+    task. Once the buffer is past its high-water mark, debug events are dropped; when it
+    is full, the oldest events are overwritten.
+    """
+
+    def __init__(
+        self,
+        trace_dir: Path | None = None,
+        *,
+        buffer_size: int | None = None,
+        flush_interval: float | None = None,
+        batch_size: int | None = None,
+        compress: bool | None = None,
+        store: AgentTraceStore | None = None,
+    ) -> None:
+        self.trace_dir = trace_dir or settings.storage_path / "agent_traces"
+        self.buffer_size = buffer_size or settings.agent_trace_buffer_size
+        self.flush_interval = (
+            settings.agent_trace_flush_interval if flush_interval is None else flush_interval
+        )
+        self.batch_size = batch_size or settings.agent_trace_batch_size
+        self.compress = settings.agent_trace_compress if compress is None else compress
+        self.store = store
+        self._buffer: deque[dict[str, Any]] = deque(maxlen=self.buffer_size)
+        self._high_water = max(int(self.buffer_size * 0.8), 1)
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._write_lock = asyncio.Lock()
+        self._handle: IO[str] | None = None
+        self._handle_day = ""
+        self.dropped = 0
+
+    def emit(self, event: dict[str, Any]) -> None:
+        if len(self._buffer) >= self._high_water and event.get("type") in DEBUG_EVENT_TYPES:
+            self.dropped += 1
+            return
+        if len(self._buffer) == self.buffer_size:
+            self.dropped += 1
+        self._buffer.append(event)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            self._stopping.clear()
+        except RuntimeError:
+            # No running loop (e.g. called from sync code); flush() will pick events up.
+            return
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Agent trace flush failed: {e}")
+
+    def _drain(self) -> list[dict[str, Any]]:
+        batch = list(self._buffer)
+        self._buffer.clear()
+        return batch
+
+    async def flush(self) -> None:
+        batch = self._drain()
+        if self.dropped:
+            logger.warning(f"Agent trace buffer under pressure, dropped {self.dropped} events")
+            self.dropped = 0
+        if batch:
+            async with self._write_lock:
+                await asyncio.to_thread(self._write, batch)
+
+    def _file_for(self, day: str) -> Path:
+        suffix = ".jsonl.gz" if self.compress else ".jsonl"
+        return self.trace_dir / f"{day}{suffix}"
+
+    def _open(self, day: str) -> IO[str]:
+        if self._handle is not None and self._handle_day == day:
+            return self._handle
+        self._close_handle()
+        self.trace_dir.mkdir(parents=True, exist_ok=True)
+        path = self._file_for(day)
+        # The handle stays open across batches until the day rolls over or close().
+        # Appending to a gzip file adds a new member; readers see one concatenated stream.
+        if self.compress:
+            handle: IO[str] = gzip.open(path, "at", encoding="utf-8")  # noqa: SIM115
+        else:
+            handle = open(path, "a", encoding="utf-8")  # noqa: SIM115
+        self._handle, self._handle_day = handle, day
+        return handle
+
+    def _close_handle(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+            self._handle_day = ""
+
+    def _write(self, batch: list[dict[str, Any]]) -> None:
+        for event in batch:
+            day = str(event.get("ts", ""))[:10] or datetime.now(UTC).strftime("%Y-%m-%d")
+            self._open(day).write(json.dumps(event, ensure_ascii=False) + "\n")
+        if self._handle is not None:
+            self._handle.flush()
+        if self.store is not None:
+            try:
+                self.store.record(batch)
+            except Exception as e:
+                logger.warning(f"Agent trace index update failed: {e}")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            # Asked to exit rather than cancelled: cancelling during a threaded write
+            # would release the write lock while the thread still holds the handle.
+            self._stopping.set()
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        async with self._write_lock:
+            await asyncio.to_thread(self._close_handle)
+
+
+@lru_cache(maxsize=1)
+def get_trace_writer() -> TraceWriter:
+    return TraceWriter(store=get_trace_store() if settings.agent_trace_index_enabled else None)
@@ -0,0 +1,133 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, cast
+
+import faiss
+import numpy as np
+
+from app.config import settings
+from app.utils import logger
+
+from .index_generation import get_generations
+from .memory.orchestrator import ContextBundle
+
+# Nearest entries inspected per lookup; the index is shared by all users and scopes,
+# so the best match for this user may not be the global top-1.
+LOOKUP_CANDIDATES = 16
+
+# (knowledge generation, the user's memory generation) the answer was generated at.
+SourceVersions = tuple[int, int]
+
+
+@dataclass(slots=True)
+class CachedAnswer:
+    user_id: str
+    scope: str
+    query: str
+    answer: str
+    bundle: ContextBundle
+    versions: SourceVersions
+    expires_at: float
+
+
+class SemanticAnswerCache:
+    def __init__(self) -> None:
+        self.dimension = settings.embedding_dimension
+        self.ttl = settings.answer_cache_ttl
+        self.threshold = settings.answer_cache_similarity
+        self.max_entries = settings.answer_cache_max_entries
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+        self._entries: OrderedDict[int, CachedAnswer] = OrderedDict()
+        self._next_id = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(vector: list[float]) -> np.ndarray:
+        arr = np.array([vector], dtype=np.float32)
+        faiss.normalize_L2(arr)
+        return arr
+
+    def _evict(self, entry_ids: list[int]) -> None:
+        if not entry_ids:
+            return
+        self.index.remove_ids(np.array(entry_ids, dtype=np.int64))
+        for entry_id in entry_ids:
+            self._entries.pop(entry_id, None)
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        self._evict([eid for eid, entry in self._entries.items() if entry.expires_at <= now])
+
+    @staticmethod
+    async def snapshot(user_id: str) -> SourceVersions:
+        # Whole-index generations rather than the cited items': new knowledge or
+        # memories can change the answer even when nothing it cited was touched.
+        return await get_generations(user_id)
+
+    async def _is_current(self, entry: CachedAnswer) -> bool:
+        return await self.snapshot(entry.user_id) == entry.versions
+
+    async def lookup(self, user_id: str, scope: str, embedding: list[float]) -> CachedAnswer | None:
+        if not self.enabled or not self._entries:
+            return None
+
+        self._evict_expired()
+        if not self._entries:
+            return None
+
+        k = min(len(self._entries), LOOKUP_CANDIDATES)
+        scores, ids = cast(Any, self.index).search(self._normalize(embedding), k)
+        for score, entry_id in zip(scores[0], ids[0], strict=False):
+            # Results are sorted by similarity, so nothing past this point can match.
+            if entry_id == -1 or float(score) < self.threshold:
+                break
+            entry = self._entries.get(int(entry_id))
+            if entry is None or entry.user_id != user_id or entry.scope != scope:
+                continue
+            if not await self._is_current(entry):
+                logger.debug(f"Answer cache entry {entry_id} invalidated by a source change")
+                self._evict([int(entry_id)])
+                continue
+
+            self._entries.move_to_end(int(entry_id))
+            logger.info(f"Answer cache hit: similarity={float(score):.4f}, query={entry.query!r}")
+            return entry
+
+        return None
+
+    def store(
+        self,
+        user_id: str,
+        scope: str,
+        query: str,
+        embedding: list[float],
+        answer: str,
+        bundle: ContextBundle,
+        versions: SourceVersions,
+    ) -> None:
+        if not self.enabled:
+            return
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self.index.add_with_ids(self._normalize(embedding), np.array([entry_id], dtype=np.int64))
+        self._entries[entry_id] = CachedAnswer(
+            user_id=user_id,
+            scope=scope,
+            query=query,
+            answer=answer,
+            bundle=bundle,
+            versions=versions,
+            expires_at=time.monotonic() + self.ttl,
+        )
+
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            self._evict(list(self._entries)[:overflow])
@@ -1,21 +1,32 @@
+import asyncio
 import json
+import re
+import time
+from collections.abc import Coroutine
 from dataclasses import dataclass
 from datetime import UTC, datetime
-from pathlib import Path
-from typing import Any, Literal, TypedDict
+from typing import Any, Literal, TypedDict, cast
 from uuid import uuid4
 
-import httpx
+import litellm
 from langgraph.graph import END, StateGraph
 
-from app.agents import AgentTool, ToolContext, ToolRegistry, ToolResult
+from app.agents import AgentTool, ToolCachePolicy, ToolContext, ToolRegistry, ToolResult
 from app.config import settings
+from app.enums import PlannerMode
+from app.models import Reminder
 from app.note import NoteService, TaskPriority
 from app.repositories import KnowledgeItemRepository
-from app.services.llm_service import LLMService
+from app.services.agent_trace import TraceWriter, get_trace_writer
+from app.services.index_generation import KNOWLEDGE_GENERATION_KEY
+from app.services.llm_service import LLMService, cacheable_system_message
 from app.services.reminder_service import ReminderService
+from app.services.session_store import SessionStore
+from app.services.token_budget import get_token_budgeter
 from app.services.vector_store import VectorStore
+from app.services.web_search import WebSearchService, get_web_search
 from app.utils import logger
+from app.utils.metrics import timed_node
 
 ActionName = Literal[
     "create_reminder",
@@ -39,6 +50,9 @@ ActionName = Literal[
 class AgentOutcome:
     success: bool
     response: str
+    # True when the response is a fixed or templated string rather than free-form model
+    # output, so channels can render it without another LLM pass.
+    templated: bool = False
 
 
 class AgentState(TypedDict, total=False):
@@ -52,24 +66,76 @@ class AgentState(TypedDict, total=False):
     thought: str
     action: ActionName | None
     action_input: dict[str, Any]
+    actions: list[dict[str, Any]]
     observation: str
+    observations: list[dict[str, str]]
     scratchpad: list[str]
+    tokens: dict[str, int]
     last_reminder_id: int | None
     last_reminder_content: str
+    # Shared by every state copy of a run; tools record the reminder they touched here
+    # too, so it survives the run being cancelled at its deadline.
+    reminder_slot: dict[str, Any]
     done: bool
     response: str
+    response_templated: bool
+    fast_path: str | None
+    # time.monotonic() by which the run must finish.
+    deadline: float | None
+
+
+# Tool result cache: reminder listings go stale as the checker sends reminders, so
+# they are kept briefly; write tools invalidate the matching tag immediately.
+REMINDERS_TAG = "reminders:{provider}:{user_id}"
+REMINDER_TOOL_CACHE_TTL = 30
+MEMORY_TOOL_CACHE_TTL = 300
+# Note writes pull, commit and push the same Logseq git repo, so they run one at a time.
+NOTE_WRITE_CONCURRENCY = 1
+WEB_SEARCH_CONCURRENCY = 4
+# Extra time the whole graph gets past the run deadline to finish cooperatively
+# before it is cancelled outright.
+RUN_DEADLINE_GRACE_SECONDS = 2.0
+DEADLINE_RESPONSE = "处理超时，先到这里，请稍后再试。"
+
+# Messages mixing several intents, or asking for options the tools only get from the
+# planner (lead time, retry on no response), are left to the planner.
+_FAST_PATH_ABSTAIN = re.compile(r"并且|然后|顺便|同时|另外|[；;]|提前|没回应|继续提醒|重复提醒")
+_FAST_PATH_QUESTION = re.compile(r"哪些|什么|多少|吗|[？?]")
+_FAST_PATH_SKIP = re.compile(r"跳过(?:下一次|下次|这次|明天)?的?提醒")
+_FAST_PATH_RECURRENCE_EDIT = re.compile(r"改成|改为|换成|设为|变成")
+
+# Function-calling counterpart of the JSON planner's done=true/response.
+_ANSWER_TOOL: dict[str, Any] = {
+    "type": "function",
+    "function": {
+        "name": "answer",
+        "description": "Finish the task and reply to the user with the final response.",
+        "parameters": {
+            "type": "object",
+            "properties": {"text": {"type": "string"}},
+            "required": ["text"],
+        },
+    },
+}
 
 
 class CognitiveAgentService:
     def __init__(
-        self, note_service: NoteService | None = None, llm_service: LLMService | None = None
+        self,
+        note_service: NoteService | None = None,
+        llm_service: LLMService | None = None,
+        session_store: SessionStore | None = None,
+        trace_writer: TraceWriter | None = None,
+        web_search: WebSearchService | None = None,
     ) -> None:
         self.note_service = note_service or NoteService()
         self.llm_service = llm_service or LLMService()
         self.vector_store = VectorStore()
         self.knowledge_repo = KnowledgeItemRepository()
         self._tool_registry = self._build_tool_registry()
-        self._session_slots: dict[str, dict[str, Any]] = {}
+        self._session_store = session_store or SessionStore()
+        self._trace_writer = trace_writer or get_trace_writer()
+        self._web_search = web_search or get_web_search()
         self._graph = self._build_graph()
 
     @staticmethod
@@ -78,10 +144,19 @@ class CognitiveAgentService:
 
     def _build_graph(self):
         builder = StateGraph(AgentState)
-        builder.add_node("plan", self._plan_node)
-        builder.add_node("act", self._act_node)
-        builder.add_node("judge", self._judge_node)
-        builder.set_entry_point("plan")
+        builder.add_node("route", timed_node("route", self._route_node))
+        builder.add_node("plan", timed_node("plan", self._plan_node))
+        builder.add_node("act", timed_node("act", self._act_node))
+        builder.add_node("judge", timed_node("judge", self._judge_node))
+        builder.set_entry_point("route")
+        builder.add_conditional_edges(
+            "route",
+            self._route_router,
+            {
+                "act": "act",
+                "plan": "plan",
+            },
+        )
         builder.add_conditional_edges(
             "plan",
             self._plan_router,
@@ -101,6 +176,12 @@ class CognitiveAgentService:
         )
         return builder.compile()
 
+    @staticmethod
+    def _route_router(state: AgentState) -> str:
+        if state.get("fast_path"):
+            return "act"
+        return "plan"
+
     @staticmethod
     def _plan_router(state: AgentState) -> str:
         if state.get("done"):
@@ -120,27 +201,60 @@ class CognitiveAgentService:
             return AgentOutcome(False, "")
 
         session_key = self._session_key(user_id=user_id, provider=provider)
-        slot = self._session_slots.get(session_key, {})
+        slot = await self._session_store.get(session_key)
         run_id = str(uuid4())
-        state: AgentState = await self._graph.ainvoke(
+        started = time.perf_counter()
+        run_timeout = settings.agent_run_timeout if settings.agent_run_timeout > 0 else None
+        deadline = time.monotonic() + run_timeout if run_timeout is not None else None
+        # Everything needed to replay the run: input text plus the session slot it saw.
+        await self._append_trace(
             {
+                "type": "run_start",
                 "run_id": run_id,
                 "user_id": user_id,
                 "provider": provider,
-                "text": text.strip(),
                 "channel_id": channel_id,
-                "steps": 0,
-                "max_steps": settings.agent_max_steps,
-                "scratchpad": [],
+                "text": text.strip(),
                 "last_reminder_id": slot.get("last_reminder_id"),
                 "last_reminder_content": slot.get("last_reminder_content", ""),
-                "done": False,
             }
         )
-        self._session_slots[session_key] = {
+        initial: AgentState = {
+            "run_id": run_id,
+            "user_id": user_id,
+            "provider": provider,
+            "text": text.strip(),
+            "channel_id": channel_id,
+            "steps": 0,
+            "max_steps": settings.agent_max_steps,
+            "scratchpad": [],
+            "last_reminder_id": slot.get("last_reminder_id"),
+            "last_reminder_content": slot.get("last_reminder_content", ""),
+            "reminder_slot": {},
+            "done": False,
+            "deadline": deadline,
+        }
+        try:
+            # Nodes and tools stop at the deadline on their own; this only catches code
+            # that ignores it.
+            state: AgentState = await asyncio.wait_for(
+                self._graph.ainvoke(initial),
+                timeout=run_timeout + RUN_DEADLINE_GRACE_SECONDS if run_timeout else None,
+            )
+        except TimeoutError:
+            logger.warning(f"Agent run {run_id} cancelled after exceeding its deadline")
+            state = {
+                **initial,
+                **initial["reminder_slot"],
+                "response": DEADLINE_RESPONSE,
+                "response_templated": True,
+            }
+        updated_slot = {
             "last_reminder_id": state.get("last_reminder_id"),
             "last_reminder_content": state.get("last_reminder_content", ""),
         }
+        if any(slot.get(key) != value for key, value in updated_slot.items()):
+            await self._session_store.update(session_key, updated_slot)
         response = state.get("response", "").strip()
         await self._append_trace(
             {
@@ -150,16 +264,70 @@ class CognitiveAgentService:
                 "provider": provider,
                 "steps": state.get("steps", 0),
                 "done": bool(state.get("done", False)),
+                "fast_path": state.get("fast_path"),
+                "tokens": state.get("tokens", {}),
+                "latency_ms": round((time.perf_counter() - started) * 1000, 2),
                 "response": response,
             }
         )
         if not response:
-            return AgentOutcome(False, "我还没想好怎么处理这条输入，请换个说法试试。")
-        return AgentOutcome(True, response)
+            return AgentOutcome(
+                False, "我还没想好怎么处理这条输入，请换个说法试试。", templated=True
+            )
+        return AgentOutcome(True, response, templated=bool(state.get("response_templated")))
+
+    async def _route_node(self, state: AgentState) -> AgentState:
+        if not settings.agent_fast_path_enabled:
+            return state
+
+        route = self._fast_route(state.get("text", ""))
+        if route is None or route["action"] not in self._tool_registry.names():
+            return state
+
+        await self._append_trace(
+            {
+                "type": "fast_path",
+                "run_id": state.get("run_id", ""),
+                "rule": route["rule"],
+                "action": route["action"],
+                "input": route["action_input"],
+            }
+        )
+        return {
+            **state,
+            "action": route["action"],
+            "action_input": route["action_input"],
+            "actions": [],
+            "thought": f"fast_path: {route['rule']}",
+            "fast_path": route["rule"],
+            "steps": int(state.get("steps", 0)) + 1,
+        }
+
+    @staticmethod
+    def _remaining(state: AgentState) -> float | None:
+        deadline = state.get("deadline")
+        return None if deadline is None else deadline - time.monotonic()
 
     async def _plan_node(self, state: AgentState) -> AgentState:
         steps = int(state.get("steps", 0))
         max_steps = int(state.get("max_steps", 4))
+        remaining = self._remaining(state)
+        if remaining is not None and remaining <= 0:
+            await self._append_trace(
+                {
+                    "type": "plan_stop",
+                    "run_id": state.get("run_id", ""),
+                    "reason": "run_deadline_exceeded",
+                    "steps": steps,
+                }
+            )
+            return {
+                **state,
+                "done": True,
+                "response": state.get("response", "") or DEADLINE_RESPONSE,
+                "response_templated": bool(state.get("response_templated"))
+                or not state.get("response"),
+            }
         if steps >= max_steps:
             await self._append_trace(
                 {
@@ -173,34 +341,71 @@ class CognitiveAgentService:
                 **state,
                 "done": True,
                 "response": state.get("response", "") or "已达到最大步骤，先到这里。",
+                "response_templated": bool(state.get("response_templated"))
+                or not state.get("response"),
             }
 
         scratchpad = state.get("scratchpad", [])
+        use_tools = self._planner_uses_tools()
         prompt = self._planner_prompt(
             state=state,
             user_text=state.get("text", ""),
             provider=state.get("provider", ""),
             scratchpad=scratchpad,
+            use_tools=use_tools,
         )
+        system_message = (
+            cacheable_system_message(prompt["system"])
+            if settings.agent_prompt_cache
+            else {"role": "system", "content": prompt["system"]}
+        )
+        planner_started = time.perf_counter()
         try:
-            raw = await self.llm_service.chat_with_system(
-                system_prompt=prompt["system"],
-                user_message=prompt["user"],
-                temperature=0.0,
-                max_tokens=settings.agent_planner_max_tokens,
-                model=self._agent_model(),
-                base_url=settings.intent_base_url or None,
-                api_key=settings.intent_api_key or None,
+            completion = await asyncio.wait_for(
+                self.llm_service.complete(
+                    [system_message, {"role": "user", "content": prompt["user"]}],
+                    temperature=0.0,
+                    max_tokens=settings.agent_planner_max_tokens,
+                    model=self._agent_model(),
+                    base_url=settings.intent_base_url or None,
+                    api_key=settings.intent_api_key or None,
+                    tools=self._planner_tools() if use_tools else None,
+                    tool_choice="required" if use_tools else None,
+                ),
+                timeout=remaining,
             )
-            plan = self._extract_json(raw)
+            if completion.tool_calls:
+                plan = self._plan_from_tool_calls(completion.tool_calls, completion.content)
+            else:
+                plan = self._extract_json(completion.content)
         except Exception as e:
             logger.warning(f"Agent planner failed: {e}")
             return {
                 **state,
                 "done": True,
                 "response": "暂时无法完成复杂处理，已记录你的输入。",
+                "response_templated": True,
             }
 
+        step_tokens = {
+            "prompt": completion.prompt_tokens,
+            "completion": completion.completion_tokens,
+            "cached": completion.cached_tokens,
+        }
+        tokens = dict(state.get("tokens", {}))
+        for key, value in step_tokens.items():
+            tokens[key] = tokens.get(key, 0) + value
+        state = {**state, "tokens": tokens}
+        await self._append_trace(
+            {
+                "type": "plan_call",
+                "run_id": state.get("run_id", ""),
+                "step": steps + 1,
+                "tokens": step_tokens,
+                "latency_ms": round((time.perf_counter() - planner_started) * 1000, 2),
+            }
+        )
+
         done = bool(plan.get("done", False))
         action = plan.get("action")
         action_input = plan.get("action_input") or {}
@@ -221,10 +426,25 @@ class CognitiveAgentService:
                 **state,
                 "done": True,
                 "response": response or "处理完成。",
+                "response_templated": not response,
                 "thought": thought,
                 "steps": steps + 1,
             }
 
+        batch = self._parallel_actions(plan.get("actions"))
+        if len(batch) > 1:
+            return {
+                **state,
+                "action": batch[0]["action"],
+                "action_input": batch[0]["action_input"],
+                "actions": batch,
+                "thought": thought,
+                "steps": steps + 1,
+            }
+        if batch:
+            action = batch[0]["action"]
+            action_input = batch[0]["action_input"]
+
         if action not in self._available_actions():
             fallback = self._fallback_action_from_text(state.get("text", ""))
             if fallback is not None:
@@ -241,6 +461,7 @@ class CognitiveAgentService:
                     **state,
                     "action": fallback["action"],
                     "action_input": fallback["action_input"],
+                    "actions": [],
                     "thought": f"invalid_action_fallback: {fallback['thought']}",
                     "steps": steps + 1,
                 }
@@ -256,6 +477,7 @@ class CognitiveAgentService:
                 **state,
                 "done": True,
                 "response": response or "我没法确定下一步动作，先按普通记录处理。",
+                "response_templated": not response,
                 "steps": steps + 1,
             }
 
@@ -263,60 +485,122 @@ class CognitiveAgentService:
             **state,
             "action": action,
             "action_input": action_input,
+            "actions": [],
             "thought": thought,
             "steps": steps + 1,
         }
 
+    def _parallel_actions(self, raw: Any) -> list[dict[str, Any]]:
+        """Valid, de-duplicated tool calls from the planner's ``actions`` list.
+
+        Only read-only calls in the batch run concurrently; see ``_run_calls``.
+        """
+        if not isinstance(raw, list):
+            return []
+        batch: list[dict[str, Any]] = []
+        seen: set[str] = set()
+        tools = self._tool_registry.names()
+        for item in raw:
+            if not isinstance(item, dict) or item.get("action") not in tools:
+                continue
+            action_input = item.get("action_input")
+            if not isinstance(action_input, dict):
+                action_input = {}
+            key = json.dumps([item["action"], action_input], ensure_ascii=False, sort_keys=True)
+            if key in seen:
+                continue
+            seen.add(key)
+            batch.append({"action": item["action"], "action_input": action_input})
+        return batch
+
+    async def _run_tool(self, state: AgentState, action: str, payload: dict[str, Any]) -> str:
+        context = ToolContext(
+            run_id=state.get("run_id", ""),
+            user_id=state.get("user_id", ""),
+            provider=state.get("provider", ""),
+            text=state.get("text", ""),
+            channel_id=state.get("channel_id"),
+            state=state,
+            deadline=state.get("deadline"),
+        )
+        try:
+            result = await self._tool_registry.execute(action, context, payload)
+        except Exception as e:
+            return f"tool_error: {e}"
+        return result.observation
+
+    async def _run_calls(self, state: AgentState, calls: list[dict[str, Any]]) -> list[str]:
+        """Runs one step's calls in order; consecutive read-only calls run concurrently.
+
+        Write tools run one at a time so each sees the run state (e.g. last_reminder_id)
+        left by the call before it. Every call is bounded by its own tool timeout.
+        """
+        results: list[str] = []
+        reads: list[Coroutine[Any, Any, str]] = []
+        for call in calls:
+            run = self._run_tool(state, str(call["action"]), call["action_input"])
+            tool = self._tool_registry.get(str(call["action"]))
+            if tool is not None and tool.read_only:
+                reads.append(run)
+                continue
+            if reads:
+                results.extend(await asyncio.gather(*reads))
+                reads = []
+            results.append(await run)
+        if reads:
+            results.extend(await asyncio.gather(*reads))
+        return results
+
     async def _act_node(self, state: AgentState) -> AgentState:
         action = state.get("action")
         payload = state.get("action_input", {})
 
-        observation = ""
-        try:
-            if action == "answer":
-                return {
-                    **state,
-                    "done": True,
-                    "response": str(payload.get("text", "")).strip() or "处理完成。",
-                }
+        if action == "answer":
+            return {
+                **state,
+                "done": True,
+                "response": str(payload.get("text", "")).strip() or "处理完成。",
+            }
 
-            context = ToolContext(
-                run_id=state.get("run_id", ""),
-                user_id=state.get("user_id", ""),
-                provider=state.get("provider", ""),
-                text=state.get("text", ""),
-                channel_id=state.get("channel_id"),
-                state=state,
-            )
-            result = await self._tool_registry.execute(str(action), context, payload)
-            observation = result.observation
-        except Exception as e:
-            observation = f"tool_error: {e}"
+        calls = state.get("actions") or [{"action": action, "action_input": payload}]
+        results = await self._run_calls(state, calls)
 
         scratchpad = list(state.get("scratchpad", []))
-        scratchpad.append(
-            json.dumps(
+        observations: list[dict[str, str]] = []
+        # The planner sees a clipped copy; the trace and judge keep the full observation.
+        entry_budget = max(settings.agent_scratchpad_step_tokens // len(calls), 1)
+        for call, observation in zip(calls, results, strict=True):
+            observations.append({"action": str(call["action"]), "observation": observation})
+            scratchpad.append(
+                json.dumps(
+                    {
+                        "action": call["action"],
+                        "input": call["action_input"],
+                        "observation": self._clip_observation(observation, entry_budget),
+                    },
+                    ensure_ascii=False,
+                )
+            )
+            await self._append_trace(
                 {
-                    "action": action,
-                    "input": payload,
+                    "type": "tool_call",
+                    "run_id": state.get("run_id", ""),
+                    "step": state.get("steps", 0),
+                    "action": call["action"],
+                    "input": call["action_input"],
                     "observation": observation,
-                },
-                ensure_ascii=False,
+                    "parallel": len(calls),
+                }
             )
-        )
-        await self._append_trace(
-            {
-                "type": "tool_call",
-                "run_id": state.get("run_id", ""),
-                "step": state.get("steps", 0),
-                "action": action,
-                "input": payload,
-                "observation": observation,
-            }
-        )
+
+        if len(observations) == 1:
+            observation = observations[0]["observation"]
+        else:
+            observation = "\n".join(f"{o['action']}: {o['observation']}" for o in observations)
         return {
             **state,
             "observation": observation,
+            "observations": observations,
             "scratchpad": scratchpad,
         }
 
@@ -347,6 +631,8 @@ class CognitiveAgentService:
             "pause_until_missing",
             "reminder_pause_no_recent",
             "tool_error:",
+            "tool_timeout",
+            "run_deadline_exceeded",
             "unknown_action",
             "write_doc_missing_title",
         )
@@ -358,6 +644,42 @@ class CognitiveAgentService:
             "reminder_pause_no_recent",
         }
 
+        batch = state.get("observations") or []
+        if len(batch) > 1:
+            if not all(item["observation"].startswith(terminal_ok_prefix) for item in batch):
+                await self._append_trace(
+                    {
+                        "type": "judge_continue",
+                        "run_id": state.get("run_id", ""),
+                        "action": [item["action"] for item in batch],
+                        "observation": observation,
+                        "steps": steps,
+                    }
+                )
+                return state
+            response = "\n".join(
+                self._format_terminal_response(
+                    cast(ActionName, item["action"]), item["observation"]
+                )
+                for item in batch
+            )
+            await self._append_trace(
+                {
+                    "type": "judge_done",
+                    "run_id": state.get("run_id", ""),
+                    "reason": "terminal_tool_success",
+                    "action": [item["action"] for item in batch],
+                    "observation": observation,
+                    "response": response,
+                }
+            )
+            return {
+                **state,
+                "done": True,
+                "response": response,
+                "response_templated": True,
+            }
+
         if observation.startswith(terminal_ok_prefix):
             response = self._format_terminal_response(action, observation)
             await self._append_trace(
@@ -374,6 +696,7 @@ class CognitiveAgentService:
                 **state,
                 "done": True,
                 "response": response,
+                "response_templated": True,
             }
 
         if observation.startswith(terminal_error_prefix) and steps >= max_steps - 1:
@@ -392,6 +715,7 @@ class CognitiveAgentService:
                 **state,
                 "done": True,
                 "response": response,
+                "response_templated": True,
             }
 
         if observation in terminal_error_immediate:
@@ -410,6 +734,7 @@ class CognitiveAgentService:
                 **state,
                 "done": True,
                 "response": response,
+                "response_templated": True,
             }
 
         await self._append_trace(
@@ -423,35 +748,107 @@ class CognitiveAgentService:
         )
         return state
 
+    def _clip_observation(self, observation: str, max_tokens: int) -> str:
+        budgeter = get_token_budgeter(self._agent_model())
+        clipped = budgeter.truncate(observation, max_tokens)
+        if clipped == observation:
+            return observation
+        return clipped.rstrip() + "…"
+
+    @staticmethod
+    def _planner_uses_tools() -> bool:
+        mode = settings.agent_planner_mode
+        if mode != PlannerMode.AUTO:
+            return mode == PlannerMode.TOOLS
+        try:
+            return bool(
+                litellm.supports_function_calling(model=CognitiveAgentService._agent_model())
+            )
+        except Exception:
+            return False
+
+    def _planner_tools(self) -> list[dict[str, Any]]:
+        return [*self._tool_registry.function_specs(), _ANSWER_TOOL]
+
+    @staticmethod
+    def _plan_from_tool_calls(calls: list[dict[str, Any]], content: str) -> dict[str, Any]:
+        """Map native tool calls onto the plan dict produced by the JSON planner.
+
+        Several calls become one ``actions`` batch, run under the same rule as the JSON
+        planner's: read-only tools concurrently, write tools one at a time in call order.
+        """
+        thought = content.strip()
+        for call in calls:
+            if call["name"] == "answer":
+                text = str(call["arguments"].get("text", "")).strip()
+                return {"done": True, "thought": thought, "response": text}
+        if len(calls) == 1:
+            return {
+                "done": False,
+                "thought": thought,
+                "action": calls[0]["name"],
+                "action_input": calls[0]["arguments"],
+            }
+        return {
+            "done": False,
+            "thought": thought,
+            "actions": [
+                {"action": call["name"], "action_input": call["arguments"]} for call in calls
+            ],
+        }
+
     def _planner_prompt(
-        self, state: AgentState, user_text: str, provider: str, scratchpad: list[str]
+        self,
+        state: AgentState,
+        user_text: str,
+        provider: str,
+        scratchpad: list[str],
+        use_tools: bool = False,
     ) -> dict[str, str]:
-        tools = [tool.usage for tool in self._tool_registry.list_tools()] + ["answer(text)"]
+        # Everything in the system message is identical across steps and runs, so it
+        # forms a cacheable prefix; per-run state goes in the user message.
+        if use_tools:
+            output_format = (
+                "每一步必须调用工具：需要多个互不依赖的查询工具时（如同时 search_memory 与 web_search）"
+                "可在同一步调用，它们会并行执行；创建或修改类工具会按调用顺序逐个执行。"
+                "任务完成时调用 answer(text) 给出最终回复。"
+            )
+            tool_list = ""
+        else:
+            tools = [tool.usage for tool in self._tool_registry.list_tools()] + ["answer(text)"]
+            output_format = (
+                "每一步必须输出严格 JSON: "
+                '{"done":bool,"thought":str,"action":str,"action_input":{},"response":str}。'
+                "done=true 时可直接返回最终 response。"
+                "done=false 时 action 必须是可用工具之一。"
+                "若本步需要多个互不依赖的查询工具（如同时 search_memory 与 web_search），"
+                '可改为输出 "actions":[{"action":str,"action_input":{}}]，这些查询会并行执行；'
+                "创建或修改类工具会按顺序逐个执行。"
+            )
+            tool_list = f"available_tools={tools}\n"
         system = (
             "你是 CognitiveOS 的认知代理。目标是通过多步工具调用完成用户任务。"
-            "每一步必须输出严格 JSON: "
-            '{"done":bool,"thought":str,"action":str,"action_input":{},"response":str}。'
-            "done=true 时可直接返回最终 response。"
-            "done=false 时 action 必须是可用工具之一。"
+            f"{output_format}"
             "当用户说“工作日提醒/每天提醒/仅明天”等对已有提醒的修改时，优先用 update_latest_reminder_recurrence。"
             "当用户查询“工作日有哪些提醒”时，优先用 list_workday_reminders。"
             "当用户说“提前N分钟提醒”时，在 create_reminder 的 action_input 里带 advance_minutes。"
             "当用户说“没回应继续提醒”时，设置 retry_interval_minutes 与 max_retries。"
             "当用户说“跳过明天/跳过这次提醒”时，优先用 skip_next_reminder。"
             "当用户说“暂停到某个时间再提醒”时，优先用 pause_latest_reminder_until。"
-            "不要输出 markdown，不要输出额外文本。"
+            "不要输出 markdown，不要输出额外文本。\n"
+            f"{tool_list}"
+            "规则提示：\n"
+            "- 用户说“每天/每日/天天”=> recurrence=DAILY\n"
+            "- 用户说“工作日/周一到周五”=> recurrence=WEEKDAYS\n"
+            "- 用户说“仅明天/只提醒一次”=> recurrence=NONE"
         )
+        history = "\n".join(scratchpad) if scratchpad else "（空）"
         user = (
             f"provider={provider}\n"
             f"user_input={user_text}\n"
             f"last_reminder_id={state.get('last_reminder_id')}\n"
             f"last_reminder_content={state.get('last_reminder_content', '')}\n"
-            f"available_tools={tools}\n"
-            f"scratchpad={scratchpad}\n"
-            "规则提示：\n"
-            "- 用户说“每天/每日/天天”=> recurrence=DAILY\n"
-            "- 用户说“工作日/周一到周五”=> recurrence=WEEKDAYS\n"
-            "- 用户说“仅明天/只提醒一次”=> recurrence=NONE\n"
+            f"scratchpad:\n{history}\n"
             "请决定下一步。"
         )
         return {"system": system, "user": user}
@@ -480,7 +877,10 @@ class CognitiveAgentService:
         return self._tool_registry.names() | {"answer"}
 
     def _build_tool_registry(self) -> ToolRegistry:
-        registry = ToolRegistry()
+        registry = ToolRegistry(
+            default_timeout=settings.agent_tool_timeout,
+            cache_enabled=settings.agent_tool_cache_enabled,
+        )
         registry.register(
             AgentTool(
                 name="create_reminder",
@@ -488,6 +888,11 @@ class CognitiveAgentService:
                 usage="create_reminder(text)",
                 input_schema={"type": "object", "properties": {"text": {"type": "string"}}},
                 handler=self._run_create_reminder,
+                invalidates=(REMINDERS_TAG,),
+                # Also writes a Logseq note, so it shares the note writers' git slot.
+                concurrency=NOTE_WRITE_CONCURRENCY,
+                concurrency_group="note_git",
+                cancellable=False,
             )
         )
         registry.register(
@@ -504,6 +909,7 @@ class CognitiveAgentService:
                     },
                 },
                 handler=self._run_update_latest_reminder_recurrence,
+                invalidates=(REMINDERS_TAG,),
             )
         )
         registry.register(
@@ -522,6 +928,11 @@ class CognitiveAgentService:
                     },
                 },
                 handler=self._run_delay_latest_reminder,
+                invalidates=(REMINDERS_TAG,),
+                # Also writes a Logseq note, so it shares the note writers' git slot.
+                concurrency=NOTE_WRITE_CONCURRENCY,
+                concurrency_group="note_git",
+                cancellable=False,
             )
         )
         registry.register(
@@ -534,6 +945,7 @@ class CognitiveAgentService:
                     "properties": {"target_reminder_id": {"type": "integer"}},
                 },
                 handler=self._run_skip_next_reminder,
+                invalidates=(REMINDERS_TAG,),
             )
         )
         registry.register(
@@ -550,6 +962,7 @@ class CognitiveAgentService:
                     },
                 },
                 handler=self._run_pause_latest_reminder_until,
+                invalidates=(REMINDERS_TAG,),
             )
         )
         registry.register(
@@ -562,6 +975,10 @@ class CognitiveAgentService:
                     "properties": {"limit": {"type": "integer", "minimum": 1, "maximum": 20}},
                 },
                 handler=self._run_check_reminders_status,
+                read_only=True,
+                cache=ToolCachePolicy(
+                    ttl=REMINDER_TOOL_CACHE_TTL, key_fields=("limit",), tags=(REMINDERS_TAG,)
+                ),
             )
         )
         registry.register(
@@ -577,6 +994,12 @@ class CognitiveAgentService:
                     },
                 },
                 handler=self._run_list_workday_reminders,
+                read_only=True,
+                cache=ToolCachePolicy(
+                    ttl=REMINDER_TOOL_CACHE_TTL,
+                    key_fields=("limit", "include_sent"),
+                    tags=(REMINDERS_TAG,),
+                ),
             )
         )
         registry.register(
@@ -586,6 +1009,9 @@ class CognitiveAgentService:
                 usage="write_idea(content)",
                 input_schema={"type": "object", "properties": {"content": {"type": "string"}}},
                 handler=self._run_write_idea,
+                concurrency=NOTE_WRITE_CONCURRENCY,
+                concurrency_group="note_git",
+                cancellable=False,
             )
         )
         registry.register(
@@ -601,6 +1027,9 @@ class CognitiveAgentService:
                     },
                 },
                 handler=self._run_write_task,
+                concurrency=NOTE_WRITE_CONCURRENCY,
+                concurrency_group="note_git",
+                cancellable=False,
             )
         )
         registry.register(
@@ -610,6 +1039,9 @@ class CognitiveAgentService:
                 usage="write_note(content)",
                 input_schema={"type": "object", "properties": {"content": {"type": "string"}}},
                 handler=self._run_write_note,
+                concurrency=NOTE_WRITE_CONCURRENCY,
+                concurrency_group="note_git",
+                cancellable=False,
             )
         )
         registry.register(
@@ -622,6 +1054,13 @@ class CognitiveAgentService:
                     "properties": {"query": {"type": "string"}, "top_k": {"type": "integer"}},
                 },
                 handler=self._run_search_memory,
+                read_only=True,
+                # Searches the knowledge index, so every indexer write makes it stale.
+                cache=ToolCachePolicy(
+                    ttl=MEMORY_TOOL_CACHE_TTL,
+                    key_fields=("query", "top_k"),
+                    generation_keys=(KNOWLEDGE_GENERATION_KEY,),
+                ),
             )
         )
         registry.register(
@@ -631,6 +1070,9 @@ class CognitiveAgentService:
                 usage="web_search(query)",
                 input_schema={"type": "object", "properties": {"query": {"type": "string"}}},
                 handler=self._run_web_search,
+                read_only=True,
+                concurrency=WEB_SEARCH_CONCURRENCY,
+                # WebSearchService caches results across users; no tool-level cache.
             )
         )
         registry.register(
@@ -647,6 +1089,9 @@ class CognitiveAgentService:
                     },
                 },
                 handler=self._run_write_logseq_doc,
+                concurrency=NOTE_WRITE_CONCURRENCY,
+                concurrency_group="note_git",
+                cancellable=False,
             )
         )
         return registry
@@ -734,6 +1179,47 @@ class CognitiveAgentService:
             }
         return None
 
+    @staticmethod
+    def _fast_route(text: str) -> dict[str, Any] | None:
+        """Deterministic routing for unambiguous reminder commands.
+
+        Returns None (abstains) unless exactly one reminder tool clearly applies, in which
+        case the planner is not consulted for the first step.
+        """
+        cleaned = text.strip()
+        if not cleaned or _FAST_PATH_ABSTAIN.search(cleaned):
+            return None
+
+        def route(rule: str, action: ActionName, action_input: dict[str, Any]) -> dict[str, Any]:
+            return {"rule": rule, "action": action, "action_input": action_input}
+
+        if _FAST_PATH_QUESTION.search(cleaned):
+            if "工作日" in cleaned and "提醒" in cleaned:
+                return route("list_workday", "list_workday_reminders", {})
+            return None
+
+        if _FAST_PATH_SKIP.search(cleaned):
+            return route("skip", "skip_next_reminder", {})
+        if ReminderService.parse_snooze_delta(cleaned) is not None:
+            return route("snooze", "delay_latest_reminder", {"text": cleaned})
+
+        remind_at, content = ReminderService.parse_time_expression(cleaned)
+        if "暂停" in cleaned:
+            if remind_at is None:
+                return None
+            return route("pause", "pause_latest_reminder_until", {"until": cleaned})
+        if remind_at is not None:
+            if "提醒" in cleaned and content:
+                return route("create", "create_reminder", {"text": cleaned})
+            return None
+
+        recurrence = ReminderService.parse_recurrence_rule(cleaned)
+        if recurrence is not None and _FAST_PATH_RECURRENCE_EDIT.search(cleaned):
+            return route(
+                "recurrence", "update_latest_reminder_recurrence", {"recurrence": recurrence}
+            )
+        return None
+
     @staticmethod
     def _format_terminal_response(action: ActionName | None, observation: str) -> str:
         if action == "create_reminder" and observation.startswith("reminder_created:"):
@@ -796,22 +1282,15 @@ class CognitiveAgentService:
             f"[agent-trace] run_id={data.get('run_id', '')} type={data.get('type', '')} "
             f"action={data.get('action', '')} obs={str(data.get('observation', ''))[:80]}"
         )
-
-        trace_dir = settings.storage_path / "agent_traces"
-        trace_dir.mkdir(parents=True, exist_ok=True)
-        trace_file = trace_dir / f"{datetime.now(UTC).strftime('%Y-%m-%d')}.jsonl"
-        line = json.dumps(data, ensure_ascii=False)
-        await self._append_line(trace_file, line)
+        self._trace_writer.emit(data)
 
     @staticmethod
-    async def _append_line(path: Path, line: str) -> None:
-        def _write() -> None:
-            with open(path, "a", encoding="utf-8") as f:
-                f.write(line + "\n")
-
-        import asyncio
-
-        await asyncio.to_thread(_write)
+    def _remember_reminder(state: AgentState, reminder: Reminder) -> None:
+        state["last_reminder_id"] = reminder.id
+        state["last_reminder_content"] = reminder.content
+        state.setdefault("reminder_slot", {}).update(
+            last_reminder_id=reminder.id, last_reminder_content=reminder.content
+        )
 
     async def _tool_create_reminder(self, state: AgentState, payload: dict[str, Any]) -> str:
         text = str(payload.get("text", "")).strip() or state.get("text", "")
@@ -850,8 +1329,7 @@ class CognitiveAgentService:
             max_retries=max_retries,
             require_ack=require_ack,
         )
-        state["last_reminder_id"] = reminder.id
-        state["last_reminder_content"] = reminder.content
+        self._remember_reminder(state, reminder)
         await self.note_service.write_reminder(
             content, remind_at, tags=[state.get("provider", "unknown")]
         )
@@ -885,8 +1363,7 @@ class CognitiveAgentService:
         )
         if reminder is None:
             return "recurrence_update_no_recent"
-        state["last_reminder_id"] = reminder.id
-        state["last_reminder_content"] = reminder.content
+        self._remember_reminder(state, reminder)
         rule = reminder.recurrence_rule or "ONCE"
         return (
             f"reminder_recurrence_updated:#{reminder.id} "
@@ -938,8 +1415,7 @@ class CognitiveAgentService:
         )
         if reminder is None:
             return "reminder_delay_no_recent"
-        state["last_reminder_id"] = reminder.id
-        state["last_reminder_content"] = reminder.content
+        self._remember_reminder(state, reminder)
 
         delay_minutes = int(delta.total_seconds() // 60)
         await self.note_service.write_note(
@@ -959,8 +1435,7 @@ class CognitiveAgentService:
         )
         if reminder is None:
             return "reminder_skip_no_recent"
-        state["last_reminder_id"] = reminder.id
-        state["last_reminder_content"] = reminder.content
+        self._remember_reminder(state, reminder)
         return (
             f"reminder_skipped:#{reminder.id} {reminder.content}@{reminder.remind_at.isoformat()}"
         )
@@ -985,8 +1460,7 @@ class CognitiveAgentService:
         )
         if reminder is None:
             return "reminder_pause_no_recent"
-        state["last_reminder_id"] = reminder.id
-        state["last_reminder_content"] = reminder.content
+        self._remember_reminder(state, reminder)
         return f"reminder_paused:#{reminder.id} {reminder.content} until {pause_until.isoformat()}"
 
     async def _tool_check_reminders_status(self, state: AgentState, payload: dict[str, Any]) -> str:
@@ -1111,35 +1585,13 @@ class CognitiveAgentService:
         if not query:
             return "web_search_empty_query"
 
-        url = "https://zh.wikipedia.org/w/api.php"
-        params = {
-            "action": "query",
-            "list": "search",
-            "srsearch": query,
-            "utf8": 1,
-            "format": "json",
-            "srlimit": 3,
-        }
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.get(url, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-            rows = data.get("query", {}).get("search", [])
-            if not rows:
-                return "web_search_no_result"
-            lines = []
-            for row in rows:
-                title = row.get("title", "")
-                snippet = (
-                    str(row.get("snippet", ""))
-                    .replace('<span class="searchmatch">', "")
-                    .replace("</span>", "")
-                )
-                lines.append(f"[web]{title}: {snippet}")
-            return "\n".join(lines)
+            hits = await self._web_search.search(query, limit=3)
         except Exception as e:
             return f"web_search_error:{e}"
+        if not hits:
+            return "web_search_no_result"
+        return "\n".join(f"[web]{hit.title}: {hit.snippet}" for hit in hits)
 
     async def _tool_write_logseq_doc(self, state: AgentState, payload: dict[str, Any]) -> str:
         title = str(payload.get("title", "")).strip()
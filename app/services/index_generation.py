@@ -0,0 +1,21 @@
+from cashews import cache
+
+# Monotonic counters bumped by every writer of an index. Readers fold them into cache
+# keys, so a write invalidates derived entries without having to enumerate them.
+KNOWLEDGE_GENERATION_KEY = "index_gen:knowledge"
+MEMORY_GENERATION_KEY = "index_gen:memory:{user_id}"
+
+
+async def bump_knowledge_generation() -> int:
+    return await cache.incr(KNOWLEDGE_GENERATION_KEY)
+
+
+async def bump_memory_generation(user_id: str) -> int:
+    return await cache.incr(MEMORY_GENERATION_KEY.format(user_id=user_id))
+
+
+async def get_generations(user_id: str) -> tuple[int, int]:
+    knowledge, memory = await cache.get_many(
+        KNOWLEDGE_GENERATION_KEY, MEMORY_GENERATION_KEY.format(user_id=user_id)
+    )
+    return int(knowledge or 0), int(memory or 0)
@@ -0,0 +1,120 @@
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+from app.config import settings
+from app.models import KnowledgeItem
+from app.utils import logger, parse_json_field
+
+# CJK runs are split into overlapping bigrams so FTS5's unicode61 tokenizer can match
+# Chinese phrases without a segmentation dictionary; latin words / identifiers stay whole
+# (the tokenizer is told to treat "-", "_" and "." as part of a token).
+_TOKEN_PATTERN = re.compile(
+    r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[A-Za-z0-9_](?:[A-Za-z0-9_.\-]*[A-Za-z0-9_])?"
+)
+_CJK_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+# bm25() weights per column: item_id (unindexed), raw_text, structured_text, tags
+_BM25_WEIGHTS = (0.0, 1.0, 1.0, 2.0)
+
+_FTS_TOKENIZER = "unicode61 tokenchars '-_.'"
+
+
+def tokenize(text: str) -> list[str]:
+    tokens: list[str] = []
+    for match in _TOKEN_PATTERN.finditer(text or ""):
+        segment = match.group(0)
+        if _CJK_PATTERN.match(segment):
+            if len(segment) == 1:
+                tokens.append(segment)
+            else:
+                tokens.extend(segment[i : i + 2] for i in range(len(segment) - 1))
+        else:
+            tokens.append(segment.lower())
+    return tokens
+
+
+class KeywordIndex:
+    def __init__(self) -> None:
+        self.index_path = Path(settings.keyword_index_path)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.index_path), check_same_thread=False)
+        existing = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'knowledge_fts'"
+        ).fetchone()
+        if existing is not None and _FTS_TOKENIZER not in existing[0]:
+            # Built with an older tokenizer; start over and let the backfill refill it.
+            logger.info("Keyword index tokenizer changed, recreating knowledge_fts")
+            self._conn.execute("DROP TABLE knowledge_fts")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5("
+            f'item_id UNINDEXED, raw_text, structured_text, tags, tokenize="{_FTS_TOKENIZER}")'
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _row(item: KnowledgeItem) -> tuple[int, str, str, str]:
+        tags = " ".join(str(tag) for tag in parse_json_field(item.tags))
+        return (
+            int(item.id),
+            " ".join(tokenize(item.raw_text or "")),
+            " ".join(tokenize(item.structured_text or "")),
+            " ".join(tokenize(tags)),
+        )
+
+    def upsert(self, item: KnowledgeItem) -> None:
+        self.upsert_batch([item])
+
+    def upsert_batch(self, items: list[KnowledgeItem]) -> None:
+        if not items:
+            return
+
+        rows = [self._row(item) for item in items]
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM knowledge_fts WHERE item_id = ?", [(row[0],) for row in rows]
+            )
+            self._conn.executemany(
+                "INSERT INTO knowledge_fts (item_id, raw_text, structured_text, tags) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+        logger.debug(f"Keyword-indexed {len(rows)} items")
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT count(*) FROM knowledge_fts").fetchone()[0])
+
+    def delete(self, item_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM knowledge_fts WHERE item_id = ?", (item_id,))
+            self._conn.commit()
+
+    @staticmethod
+    def _match_expression(query: str) -> str:
+        tokens = list(dict.fromkeys(tokenize(query)))
+        return " OR ".join(f'"{token}"' for token in tokens)
+
+    def search(self, query: str, top_k: int = 5) -> list[dict[str, Any]]:
+        expression = self._match_expression(query)
+        if not expression or top_k <= 0:
+            return []
+
+        weights = ", ".join(str(w) for w in _BM25_WEIGHTS)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT item_id, bm25(knowledge_fts, {weights}) AS rank "
+                "FROM knowledge_fts WHERE knowledge_fts MATCH ? ORDER BY rank LIMIT ?",
+                (expression, top_k),
+            ).fetchall()
+
+        # bm25() is "lower is better"; flip the sign so callers can treat it as a score.
+        return [{"item_id": int(item_id), "bm25": -float(rank)} for item_id, rank in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,21 +1,29 @@
+import asyncio
 from uuid import UUID
 
 from cashews import cache
 
 from app.config import settings
+from app.constants import MAX_PAGE_SIZE
 from app.core import BaseService, CursorPage, NotFoundError
 from app.enums import SortField, SortOrder
 from app.models import KnowledgeItem
 from app.repositories import KnowledgeItemRepository
 from app.utils import logger
 
+from .index_generation import bump_knowledge_generation
+from .keyword_index import KeywordIndex
+
 
 class KnowledgeItemService(BaseService[KnowledgeItem, KnowledgeItemRepository]):
     cache_prefix = "knowledge_item"
     cache_ttl = settings.cache_default_ttl
 
-    def __init__(self, repo: KnowledgeItemRepository) -> None:
+    def __init__(
+        self, repo: KnowledgeItemRepository, keyword_index: KeywordIndex | None = None
+    ) -> None:
         super().__init__(repo)
+        self.keyword_index = keyword_index
 
     def _cache_key_uuid_to_id(self, uuid: UUID) -> str:
         return self._cache_key("uuid2id", uuid)
@@ -170,6 +178,11 @@ class KnowledgeItemService(BaseService[KnowledgeItem, KnowledgeItemRepository]):
                 self._cache_key_by_id(item.id),
                 self._cache_key_uuid_to_id(uuid),
             )
+            if self.keyword_index is not None:
+                updated = await self._repo.get_by_id(item.id)
+                if updated is not None:
+                    await asyncio.to_thread(self.keyword_index.upsert, updated)
+            await bump_knowledge_generation()
             logger.info(f"Updated knowledge item: uuid={uuid}")
 
         return result
@@ -198,6 +211,9 @@ class KnowledgeItemService(BaseService[KnowledgeItem, KnowledgeItemRepository]):
             await self._set_cached(item, self._cache_key_by_id(item.id))
         return items
 
+    async def list_batch(self, limit: int = MAX_PAGE_SIZE, offset: int = 0) -> list[KnowledgeItem]:
+        return await self._repo.list(limit=limit, offset=offset, order_by=KnowledgeItem.id)
+
     async def filter_without_embedding(self, limit: int = 1000) -> list[KnowledgeItem]:
         items = await self._repo.filter(embedding=None)
         return items[:limit]
@@ -212,6 +228,9 @@ class KnowledgeItemService(BaseService[KnowledgeItem, KnowledgeItemRepository]):
                 self._cache_key_uuid_to_id(uuid),
             )
             await self._invalidate_list_cache()
+            if self.keyword_index is not None:
+                await asyncio.to_thread(self.keyword_index.delete, item.id)
+            await bump_knowledge_generation()
             logger.info(f"Deleted knowledge item: uuid={uuid}")
 
         return result
@@ -1,4 +1,8 @@
 import hashlib
+import json
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any
 
 import litellm
 from cashews import cache
@@ -7,6 +11,30 @@ from litellm import acompletion, aembedding
 from app.config import settings
 from app.constants import CACHE_DEFAULT_TTL
 from app.utils import logger
+from app.utils.metrics import span
+
+
+@dataclass(slots=True)
+class ChatCompletion:
+    content: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # Prompt tokens served from the provider's prompt cache, when it reports them.
+    cached_tokens: int = 0
+    # Function calls as {"name": str, "arguments": dict}, in the order the model made them.
+    tool_calls: list[dict[str, Any]] = field(default_factory=list)
+
+
+def cacheable_system_message(content: str) -> dict[str, Any]:
+    """System message marked as a cacheable prompt prefix.
+
+    Anthropic-style providers cache up to the marker; LiteLLM strips the flag for
+    providers such as OpenAI that cache stable prefixes automatically.
+    """
+    return {
+        "role": "system",
+        "content": [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}],
+    }
 
 
 class LLMService:
@@ -20,36 +48,100 @@ class LLMService:
         if self.base_url:
             litellm.api_base = self.base_url
 
+    def _completion_kwargs(
+        self,
+        messages: list[dict[str, Any]],
+        temperature: float,
+        max_tokens: int | None,
+        model: str | None,
+        base_url: str | None,
+        api_key: str | None,
+    ) -> dict[str, object]:
+        req_max_tokens = settings.llm_max_tokens if max_tokens is None else max_tokens
+        kwargs: dict[str, object] = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "api_base": base_url or self.base_url or None,
+            "api_key": api_key or self.api_key or None,
+        }
+        if req_max_tokens is not None:
+            kwargs["max_tokens"] = req_max_tokens
+        return kwargs
+
+    @staticmethod
+    def _parse_tool_calls(message: Any) -> list[dict[str, Any]]:
+        calls: list[dict[str, Any]] = []
+        for call in getattr(message, "tool_calls", None) or []:
+            raw = call.function.arguments or "{}"
+            try:
+                arguments = json.loads(raw) if isinstance(raw, str) else dict(raw)
+            except (TypeError, ValueError):
+                logger.warning(f"Discarding malformed tool arguments for {call.function.name}")
+                arguments = {}
+            calls.append({"name": call.function.name, "arguments": arguments})
+        return calls
+
+    async def complete(
+        self,
+        messages: list[dict[str, Any]],
+        temperature: float = 0.7,
+        max_tokens: int | None = None,
+        model: str | None = None,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        tools: list[dict[str, Any]] | None = None,
+        tool_choice: str | None = None,
+    ) -> ChatCompletion:
+        kwargs = self._completion_kwargs(
+            messages, temperature, max_tokens, model, base_url, api_key
+        )
+        if tools:
+            kwargs["tools"] = tools
+            if tool_choice:
+                kwargs["tool_choice"] = tool_choice
+        with span("llm", str(kwargs["model"])) as current:
+            try:
+                response = await acompletion(**kwargs)
+            except Exception as e:
+                logger.error(f"LLM chat failed: {e}")
+                raise
+            message = response.choices[0].message
+            content = message.content or ""
+            usage = getattr(response, "usage", None)
+            details = getattr(usage, "prompt_tokens_details", None)
+            completion = ChatCompletion(
+                content=content,
+                prompt_tokens=int(getattr(usage, "prompt_tokens", 0) or 0),
+                completion_tokens=int(getattr(usage, "completion_tokens", 0) or 0),
+                cached_tokens=int(getattr(details, "cached_tokens", 0) or 0),
+                tool_calls=self._parse_tool_calls(message),
+            )
+            current.attributes.update(
+                prompt_tokens=completion.prompt_tokens,
+                completion_tokens=completion.completion_tokens,
+                cached_tokens=completion.cached_tokens,
+            )
+        logger.debug(
+            f"LLM chat completed: {len(content)} chars, "
+            f"tokens={completion.prompt_tokens}+{completion.completion_tokens} "
+            f"(cached {completion.cached_tokens})"
+        )
+        return completion
+
     async def chat(
         self,
-        messages: list[dict[str, str]],
+        messages: list[dict[str, Any]],
         temperature: float = 0.7,
         max_tokens: int | None = None,
         model: str | None = None,
         base_url: str | None = None,
         api_key: str | None = None,
     ) -> str:
-        try:
-            req_max_tokens = settings.llm_max_tokens if max_tokens is None else max_tokens
-            kwargs: dict[str, object] = {
-                "model": model or self.model,
-                "messages": messages,
-                "temperature": temperature,
-                "api_base": base_url or self.base_url or None,
-                "api_key": api_key or self.api_key or None,
-            }
-            if req_max_tokens is not None:
-                kwargs["max_tokens"] = req_max_tokens
-
-            response = await acompletion(
-                **kwargs,
-            )
-            content = response.choices[0].message.content
-            logger.debug(f"LLM chat completed: {len(content)} chars")
-            return content
-        except Exception as e:
-            logger.error(f"LLM chat failed: {e}")
-            raise
+        completion = await self.complete(
+            messages, temperature, max_tokens, model=model, base_url=base_url, api_key=api_key
+        )
+        return completion.content
 
     async def chat_with_system(
         self,
@@ -74,6 +166,47 @@ class LLMService:
             api_key=api_key,
         )
 
+    async def chat_stream(
+        self,
+        messages: list[dict[str, Any]],
+        temperature: float = 0.7,
+        max_tokens: int | None = None,
+        model: str | None = None,
+        base_url: str | None = None,
+        api_key: str | None = None,
+    ) -> AsyncIterator[str]:
+        kwargs = self._completion_kwargs(
+            messages, temperature, max_tokens, model, base_url, api_key
+        )
+        with span("llm_stream", str(kwargs["model"])):
+            try:
+                response = await acompletion(**kwargs, stream=True)
+                total = 0
+                async for chunk in response:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        total += len(delta)
+                        yield delta
+                logger.debug(f"LLM stream completed: {total} chars")
+            except Exception as e:
+                logger.error(f"LLM stream failed: {e}")
+                raise
+
+    def chat_with_system_stream(
+        self,
+        system_prompt: str,
+        user_message: str,
+        temperature: float = 0.7,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message},
+        ]
+        return self.chat_stream(messages, temperature, max_tokens)
+
     @staticmethod
     def _embedding_cache_key(text: str) -> str:
         text_hash = hashlib.md5(text.encode()).hexdigest()
@@ -81,62 +214,68 @@ class LLMService:
 
     async def get_embedding(self, text: str) -> list[float]:
         key = self._embedding_cache_key(text)
-        cached = await cache.get(key)
-        if cached is not None:
-            logger.debug(f"Cache hit for embedding: {key}")
-            return cached
-
-        try:
-            response = await aembedding(
-                model=settings.embedding_model,
-                input=[text],
-            )
-            embedding = response.data[0]["embedding"]
-            await cache.set(key, embedding, expire=CACHE_DEFAULT_TTL * 12)
-            logger.debug(f"Generated embedding: {len(embedding)} dimensions")
-            return embedding
-        except Exception as e:
-            logger.error(f"Embedding generation failed: {e}")
-            raise
+        with span("embedding", settings.embedding_model) as current:
+            cached = await cache.get(key)
+            if cached is not None:
+                current.attributes["cache_hits"] = 1
+                logger.debug(f"Cache hit for embedding: {key}")
+                return cached
+
+            current.attributes["cache_misses"] = 1
+            try:
+                response = await aembedding(
+                    model=settings.embedding_model,
+                    input=[text],
+                )
+                embedding = response.data[0]["embedding"]
+                await cache.set(key, embedding, expire=CACHE_DEFAULT_TTL * 12)
+                logger.debug(f"Generated embedding: {len(embedding)} dimensions")
+                return embedding
+            except Exception as e:
+                logger.error(f"Embedding generation failed: {e}")
+                raise
 
     async def get_embeddings(self, texts: list[str]) -> list[list[float]]:
         if not texts:
             return []
 
-        keys = [self._embedding_cache_key(text) for text in texts]
-        cached_results = await cache.get_many(*keys)
+        with span("embedding", settings.embedding_model) as current:
+            keys = [self._embedding_cache_key(text) for text in texts]
+            cached_results = await cache.get_many(*keys)
 
-        results = []
-        missing_indices = []
-        missing_texts = []
-        missing_keys = []
+            results = []
+            missing_indices = []
+            missing_texts = []
+            missing_keys = []
 
-        for i, (text, key, cached) in enumerate(zip(texts, keys, cached_results, strict=False)):
-            if cached is not None:
-                results.append(cached)
-            else:
-                missing_indices.append(i)
-                missing_texts.append(text)
-                missing_keys.append(key)
-                results.append(None)
-
-        if missing_texts:
-            try:
-                response = await aembedding(
-                    model=settings.embedding_model,
-                    input=missing_texts,
-                )
-                new_embeddings = [item["embedding"] for item in response.data]
+            for i, (text, key, cached) in enumerate(zip(texts, keys, cached_results, strict=False)):
+                if cached is not None:
+                    results.append(cached)
+                else:
+                    missing_indices.append(i)
+                    missing_texts.append(text)
+                    missing_keys.append(key)
+                    results.append(None)
 
-                for key, embedding in zip(missing_keys, new_embeddings, strict=False):
-                    await cache.set(key, embedding, expire=CACHE_DEFAULT_TTL * 12)
+            current.attributes["cache_hits"] = len(texts) - len(missing_texts)
+            current.attributes["cache_misses"] = len(missing_texts)
+            if missing_texts:
+                try:
+                    response = await aembedding(
+                        model=settings.embedding_model,
+                        input=missing_texts,
+                    )
+                    new_embeddings = [item["embedding"] for item in response.data]
 
-                for i, embedding in zip(missing_indices, new_embeddings, strict=False):
-                    results[i] = embedding
+                    for key, embedding in zip(missing_keys, new_embeddings, strict=False):
+                        await cache.set(key, embedding, expire=CACHE_DEFAULT_TTL * 12)
 
-                logger.debug(f"Generated {len(new_embeddings)} embeddings")
-            except Exception as e:
-                logger.error(f"Batch embedding generation failed: {e}")
-                raise
+                    for i, embedding in zip(missing_indices, new_embeddings, strict=False):
+                        results[i] = embedding
+
+                    logger.debug(f"Generated {len(new_embeddings)} embeddings")
+                except Exception as e:
+                    logger.error(f"Batch embedding generation failed: {e}")
+                    raise
 
-        return results
+            return results
@@ -1,10 +1,13 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any
 
+from app.config import settings
 from app.models import KnowledgeItem
 from app.services.prompt_template_service import PromptTemplateService
+from app.services.token_budget import Snippet, get_token_budgeter
 
 from .embedder import MemoryEmbedder
-from .retriever import MemoryRetriever
+from .retriever import MemoryHit, MemoryRetriever
 from .writer import MemoryWriter
 
 
@@ -13,6 +16,14 @@ class ContextBundle:
     system_prompt: str
     user_prompt: str
     memory_context: str
+    knowledge_context: str = ""
+    memory_hits: list[dict[str, Any]] = field(default_factory=list)
+    knowledge_ids: list[int] = field(default_factory=list)
+    knowledge_scores: dict[int, dict[str, float | None]] = field(default_factory=dict)
+
+    @property
+    def memory_ids(self) -> list[int]:
+        return [int(hit["memory_id"]) for hit in self.memory_hits]
 
 
 class MemoryOrchestrator:
@@ -29,20 +40,32 @@ class MemoryOrchestrator:
         self._prompt_template_service = prompt_template_service
 
     @staticmethod
-    def _build_knowledge_context(items: list[KnowledgeItem], max_tokens: int = 1200) -> str:
-        parts: list[str] = []
-        token_count = 0
-
-        for item in items:
-            text = item.structured_text or item.raw_text
-            line = f"[knowledge_id={item.id}] {text}"
-            estimate = len(line) // 4
-            if token_count + estimate > max_tokens:
-                break
-            parts.append(line)
-            token_count += estimate
+    def _pack_context(
+        hits: list[MemoryHit], items: list[KnowledgeItem], max_tokens: int
+    ) -> list[Snippet]:
+        # Memory final_score and knowledge distances live on different scales, so both
+        # lists compete on reciprocal rank; ties go to memory, the primary source.
+        k = settings.retrieval_rrf_k
+        snippets = [
+            Snippet(
+                text=MemoryRetriever.format_hit(hit),
+                score=1.0 / (k + rank),
+                source="memory",
+                ref=hit,
+            )
+            for rank, hit in enumerate(hits, start=1)
+        ]
+        snippets.extend(
+            Snippet(
+                text=f"[knowledge_id={item.id}] {item.structured_text or item.raw_text}",
+                score=1.0 / (k + rank),
+                source="knowledge",
+                ref=int(item.id),
+            )
+            for rank, item in enumerate(items, start=1)
+        )
 
-        return "\n".join(parts)
+        return get_token_budgeter().pack(snippets, max_tokens)
 
     async def build_context(
         self,
@@ -51,13 +74,23 @@ class MemoryOrchestrator:
         knowledge_items: list[KnowledgeItem],
         *,
         top_k: int = 8,
+        max_context_tokens: int | None = None,
+        query_embedding: list[float] | None = None,
     ) -> ContextBundle:
-        query_embedding = await self._embedder.embed(query)
+        if query_embedding is None:
+            query_embedding = await self._embedder.embed(query)
         hits = await self._retriever.search(
             user_id=user_id, query_embedding=query_embedding, top_k=top_k
         )
-        memory_context = self._retriever.build_context(hits)
-        knowledge_context = self._build_knowledge_context(knowledge_items)
+        packed = self._pack_context(
+            hits,
+            knowledge_items,
+            max_context_tokens or settings.rag_max_context_tokens,
+        )
+        memory = [s for s in packed if s.source == "memory"]
+        knowledge = [s for s in packed if s.source == "knowledge"]
+        memory_context = "\n".join(s.text for s in memory)
+        knowledge_context = "\n".join(s.text for s in knowledge)
 
         system_prompt, user_prompt = await self._prompt_template_service.render(
             "memory_rag",
@@ -70,12 +103,28 @@ class MemoryOrchestrator:
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             memory_context=memory_context,
+            knowledge_context=knowledge_context,
+            memory_hits=[
+                {
+                    "memory_id": int(s.ref.memory.id),
+                    "memory_type": s.ref.memory.memory_type,
+                    "content": s.ref.memory.summary or s.ref.memory.content,
+                    "similarity": s.ref.similarity,
+                    "score": s.ref.final_score,
+                }
+                for s in memory
+            ],
+            knowledge_ids=[s.ref for s in knowledge],
         )
 
     async def write_back(self, user_id: str, query: str, response: str) -> None:
+        # The transcript of an answer does not bump the memory generation: otherwise
+        # every answer would invalidate the cached context of the question it answered.
+        # It becomes retrievable once that context expires (rag_context_cache_ttl).
         await self._writer.write(
             user_id=user_id,
             content=f"Q: {query}\nA: {response}",
             memory_type="conversation",
             importance=2,
+            bump_generation=False,
         )
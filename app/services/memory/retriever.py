@@ -1,12 +1,19 @@
-import math
 from dataclasses import dataclass
 
+import numpy as np
+
+from app.config import settings
 from app.models import Memory
 from app.repositories import MemoryRepository
+from app.services.token_budget import Snippet, get_token_budgeter
 from app.utils import utc_time
 
 from .faiss_store import MemoryFAISSStore
 
+SIMILARITY_WEIGHT = 0.7
+IMPORTANCE_WEIGHT = 0.3
+DECAY_LAMBDA = 0.015
+
 
 @dataclass
 class MemoryHit:
@@ -22,8 +29,19 @@ class MemoryRetriever:
         self._memory_repo = memory_repo
 
     @staticmethod
-    def _decay_factor(days: float, lambda_: float = 0.015) -> float:
-        return math.exp(-lambda_ * max(days, 0.0))
+    def _score_candidates(
+        similarity: np.ndarray,
+        importance: np.ndarray,
+        age_days: np.ndarray,
+        lambda_: float = DECAY_LAMBDA,
+    ) -> np.ndarray:
+        importance_weight = np.clip(importance, 1, 5) / 5.0
+        decay = np.exp(-lambda_ * np.maximum(age_days, 0.0))
+        return (similarity * SIMILARITY_WEIGHT + importance_weight * IMPORTANCE_WEIGHT) * decay
+
+    @staticmethod
+    def _initial_fetch_k(top_k: int) -> int:
+        return max(top_k * settings.memory_overfetch_factor, top_k)
 
     async def search(
         self,
@@ -32,59 +50,79 @@ class MemoryRetriever:
         top_k: int = 8,
         min_importance: int = 1,
     ) -> list[MemoryHit]:
-        raw_hits = self._store.search(query_embedding, top_k=max(top_k * 3, top_k))
-        if not raw_hits:
+        if top_k <= 0:
             return []
 
-        ordered_ids = [int(item["memory_id"]) for item in raw_hits]
-        memories = await self._memory_repo.get_by_ids(ordered_ids)
-        by_id = {m.id: m for m in memories}
+        # The store is shared by all users, so grow the over-fetch window until enough
+        # candidates survive the user / importance filter or the index is exhausted.
+        fetch_k = self._initial_fetch_k(top_k)
+        fetch_cap = max(settings.memory_overfetch_max, fetch_k)
+        while True:
+            raw_hits = self._store.search(query_embedding, top_k=fetch_k)
+            if not raw_hits:
+                return []
+
+            ordered_ids = [int(item["memory_id"]) for item in raw_hits]
+            memories = await self._memory_repo.get_by_ids(ordered_ids)
+            by_id = {m.id: m for m in memories}
+            candidates = [
+                (item, memory)
+                for item in raw_hits
+                if (memory := by_id.get(int(item["memory_id"]))) is not None
+                and memory.user_id == user_id
+                and int(memory.importance) >= min_importance
+            ]
+
+            exhausted = len(raw_hits) < fetch_k or fetch_k >= fetch_cap
+            if len(candidates) >= top_k or exhausted:
+                break
+            fetch_k = min(fetch_k * 2, fetch_cap)
+
+        if not candidates:
+            return []
 
         now = utc_time()
+        similarity = np.fromiter(
+            (float(item["similarity"]) for item, _ in candidates),
+            dtype=np.float64,
+            count=len(candidates),
+        )
+        importance = np.fromiter(
+            (int(memory.importance) for _, memory in candidates),
+            dtype=np.float64,
+            count=len(candidates),
+        )
+        age_days = np.fromiter(
+            ((now - memory.updated_at).total_seconds() / 86400.0 for _, memory in candidates),
+            dtype=np.float64,
+            count=len(candidates),
+        )
+        scores = self._score_candidates(similarity, importance, age_days)
+
+        order = np.argsort(-scores, kind="stable")[:top_k]
         hits: list[MemoryHit] = []
-        for item in raw_hits:
-            memory_id = int(item["memory_id"])
-            memory = by_id.get(memory_id)
-            if not memory:
-                continue
-            if memory.user_id != user_id:
-                continue
-            if int(memory.importance) < min_importance:
-                continue
-
-            similarity = float(item["similarity"])
-            importance_weight = min(max(int(memory.importance), 1), 5) / 5.0
-            age_days = (now - memory.updated_at).total_seconds() / 86400.0
-            decay = self._decay_factor(age_days)
-            final_score = (similarity * 0.7 + importance_weight * 0.3) * decay
-
+        for idx in order:
+            item, memory = candidates[int(idx)]
             hits.append(
                 MemoryHit(
                     memory=memory,
-                    similarity=similarity,
-                    final_score=final_score,
+                    similarity=float(similarity[idx]),
+                    final_score=float(scores[idx]),
                     vector_id=int(item["vector_id"]),
                 )
             )
-
-        hits.sort(key=lambda x: x.final_score, reverse=True)
-        return hits[:top_k]
+        return hits
 
     @staticmethod
-    def build_context(hits: list[MemoryHit], max_tokens: int = 1600) -> str:
-        parts: list[str] = []
-        token_budget = 0
-
-        for hit in hits:
-            text = hit.memory.summary or hit.memory.content
-            line = (
-                f"[memory_id={hit.memory.id};type={hit.memory.memory_type};"
-                f"importance={hit.memory.importance};score={hit.final_score:.4f}] {text}"
-            )
-            estimate = len(line) // 4
-            if token_budget + estimate > max_tokens:
-                break
-            parts.append(line)
-            token_budget += estimate
-
-        return "\n".join(parts)
+    def format_hit(hit: MemoryHit) -> str:
+        text = hit.memory.summary or hit.memory.content
+        return (
+            f"[memory_id={hit.memory.id};type={hit.memory.memory_type};"
+            f"importance={hit.memory.importance};score={hit.final_score:.4f}] {text}"
+        )
+
+    @classmethod
+    def build_context(cls, hits: list[MemoryHit], max_tokens: int = 1600) -> str:
+        snippets = [Snippet(text=cls.format_hit(hit), score=hit.final_score) for hit in hits]
+        packed = get_token_budgeter().pack(snippets, max_tokens)
+        return "\n".join(snippet.text for snippet in packed)
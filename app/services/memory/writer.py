@@ -2,6 +2,7 @@ import json
 
 from app.config import settings
 from app.repositories import EmbeddingRecordRepository, MemoryRepository
+from app.services.index_generation import bump_memory_generation
 from app.services.llm_service import LLMService
 from app.utils import logger
 
@@ -84,6 +85,7 @@ class MemoryWriter:
         memory_type: str | None = None,
         importance: int | None = None,
         force: bool = False,
+        bump_generation: bool = True,
     ) -> int | None:
         if not content.strip():
             return None
@@ -114,6 +116,8 @@ class MemoryWriter:
             vector_id=vector_id,
         )
         self._store.save()
+        if bump_generation:
+            await bump_memory_generation(user_id)
 
         logger.info(
             f"Memory stored: id={memory.id}, user={user_id}, type={memory_type_final}, importance={importance_final}"
@@ -1,11 +1,35 @@
 import asyncio
+import contextlib
+import heapq
+import itertools
+import time
 from datetime import datetime, timedelta
 from typing import Any, cast
 
-from app.channels.runtime import get_default_provider, send_reminder
+from app.channels.runtime import get_default_provider
+from app.config import settings
 from app.models import Reminder
-from app.services.reminder_service import ReminderService
+from app.services.reminder_dispatcher import Delivery, ReminderDispatcher
+from app.services.reminder_service import (
+    ReminderService,
+    add_reminder_listener,
+    remove_reminder_listener,
+)
 from app.utils import logger
+from app.utils.metrics import REGISTRY
+
+REMINDER_LAG_SECONDS = REGISTRY.histogram(
+    "cognitive_reminder_lag_seconds",
+    "Delay between a reminder's due time and its delivery attempt",
+    ("kind",),
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 900.0, 3600.0),
+)
+REMINDER_CHECK_SECONDS = REGISTRY.histogram(
+    "cognitive_reminder_check_seconds", "Duration of one reminder scheduler pass"
+)
+REMINDERS_SCHEDULED = REGISTRY.gauge(
+    "cognitive_reminders_scheduled", "Reminders held in the in-memory reminder schedule"
+)
 
 
 def parse_reminder_from_row(row: dict) -> Reminder:
@@ -53,122 +77,280 @@ def parse_reminder_from_row(row: dict) -> Reminder:
     return reminder
 
 
-async def check_reminders() -> None:
-    while True:
-        try:
-            now = datetime.now()
+class ReminderScheduler:
+    """Fires reminders from an in-memory heap instead of polling the database.
+
+    Reminders due within ``horizon`` are loaded once and then kept current through
+    ReminderService change notifications, so the loop can sleep until the earliest
+    wake-up time. A periodic resync against the database picks up anything changed
+    behind its back (other processes, manual edits) and reminders entering the horizon.
+    Due reminders are handed to a ReminderDispatcher; failed sends come back onto the
+    heap ``retry_delay`` seconds later.
+    """
+
+    def __init__(
+        self,
+        horizon: timedelta | None = None,
+        sync_interval: float | None = None,
+        retry_delay: float | None = None,
+    ) -> None:
+        self.horizon = horizon or timedelta(hours=settings.reminder_horizon_hours)
+        self.sync_interval = (
+            settings.reminder_sync_interval if sync_interval is None else sync_interval
+        )
+        self.retry_delay = (
+            settings.reminder_send_retry_delay if retry_delay is None else retry_delay
+        )
+        # (wake_at, version, reminder_id); entries whose version is no longer current are
+        # stale and skipped when popped.
+        self._heap: list[tuple[datetime, int, int]] = []
+        self._reminders: dict[int, Reminder] = {}
+        self._versions: dict[int, int] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        # Ids changed while a sync query is in flight; their in-memory state is newer.
+        self._changed_during_sync: set[int] | None = None
+        # reminder_id -> version of the delivery currently with the dispatcher.
+        self._in_flight: dict[int, int] = {}
+        self._dispatcher = ReminderDispatcher(self._on_sent)
+
+    def __len__(self) -> int:
+        return len(self._reminders)
+
+    @staticmethod
+    def _wake_at(reminder: Reminder) -> datetime | None:
+        """When the reminder next needs attention, or None if it never will."""
+        if reminder.is_sent or reminder.status not in ("active", "paused"):
+            return None
+        if reminder.status == "paused":
+            if reminder.pause_until is None:
+                return None
+            if reminder.pause_until > datetime.now():
+                return reminder.pause_until
+        advance_minutes = int(reminder.advance_minutes or 0)
+        if advance_minutes > 0 and not reminder.is_advance_sent:
+            return reminder.remind_at - timedelta(minutes=advance_minutes)
+        return reminder.remind_at
+
+    def _schedule(self, reminder: Reminder, wake_at: datetime | None = None) -> None:
+        reminder_id = int(reminder.id)
+        wake_at = wake_at or self._wake_at(reminder)
+        if wake_at is None or wake_at > datetime.now() + self.horizon:
+            self._discard(reminder_id)
+            return
+        self._versions[reminder_id] = version = next(self._counter)
+        self._reminders[reminder_id] = reminder
+        heapq.heappush(self._heap, (wake_at, version, reminder_id))
+        if self._heap[0][2] == reminder_id:
+            self._wakeup.set()
 
-            is_sent_col = cast(Any, Reminder.is_sent)
-            remind_at_col = cast(Any, Reminder.remind_at)
-            status_col = cast(Any, Reminder.status)
-            pause_until_col = cast(Any, Reminder.pause_until)
-            id_col = cast(Any, Reminder.id)
+    def _discard(self, reminder_id: int) -> None:
+        # Heap entries for the id go stale once its version is gone.
+        self._versions.pop(reminder_id, None)
+        self._reminders.pop(reminder_id, None)
+
+    def _touch(self, reminder_id: int) -> None:
+        if self._changed_during_sync is not None:
+            self._changed_during_sync.add(reminder_id)
+
+    def reminder_changed(self, reminder: Reminder) -> None:
+        if reminder.id is None:
+            return
+        self._touch(int(reminder.id))
+        # The edit supersedes whatever a delivery in progress would have written.
+        self._dispatcher.drop_writes(int(reminder.id))
+        self._schedule(reminder)
+
+    def reminder_removed(self, reminder_id: int) -> None:
+        self._touch(reminder_id)
+        self._dispatcher.drop_writes(reminder_id)
+        self._discard(reminder_id)
+
+    async def sync(self) -> None:
+        """Reloads every reminder due within the horizon from the database."""
+        now = datetime.now()
+        is_sent_col = cast(Any, Reminder.is_sent)
+        remind_at_col = cast(Any, Reminder.remind_at)
+        status_col = cast(Any, Reminder.status)
+        self._changed_during_sync = changed = set()
+        try:
+            # Unflushed transitions would otherwise be read back as still pending.
+            await self._dispatcher.flush()
             rows = (
                 await Reminder.select()
                 .where(is_sent_col == False)  # noqa: E712
-                .where(
-                    (status_col == "active") | ((status_col == "paused") & (pause_until_col <= now))
-                )
-                .where(remind_at_col <= now + timedelta(days=1))
-                .order_by(remind_at_col)
+                .where(status_col.is_in(["active", "paused"]))
+                .where(remind_at_col <= now + self.horizon)
             )
+        finally:
+            self._changed_during_sync = None
 
-            for row in rows:
-                try:
-                    reminder = parse_reminder_from_row(row)
-                    if (
-                        reminder.status == "paused"
-                        and reminder.pause_until
-                        and reminder.pause_until <= now
-                    ):
-                        await Reminder.update(status="active").where(id_col == reminder.id)
-                        reminder.status = "active"
-
-                    if reminder.status != "active":
-                        continue
-
-                    advance_window = now + timedelta(
-                        minutes=max(0, int(reminder.advance_minutes or 0))
-                    )
+        fresh = {int(reminder.id): reminder for reminder in self._reminders.values()}
+        self._heap.clear()
+        self._reminders.clear()
+        self._versions.clear()
+        for reminder_id, version in self._in_flight.items():
+            if reminder_id in fresh:
+                self._reminders[reminder_id] = fresh[reminder_id]
+                self._versions[reminder_id] = version
+        for row in rows:
+            if int(row["id"]) in changed or int(row["id"]) in self._in_flight:
+                continue
+            self._schedule(parse_reminder_from_row(row))
+        for reminder_id in changed:
+            if reminder_id in fresh:
+                self._schedule(fresh[reminder_id])
+        logger.debug(f"Reminder schedule synced: {len(self._reminders)} upcoming")
 
-                    if reminder.remind_at <= now:
-                        success = await send_reminder(reminder, is_advance=False)
-                        if success:
-                            if reminder.is_recurring and reminder.recurrence_rule:
-                                next_time = ReminderService.next_occurrence(
-                                    base=reminder.remind_at,
-                                    rule=reminder.recurrence_rule,
-                                    now=now,
-                                )
-                                await Reminder.update(
-                                    remind_at=next_time,
-                                    is_sent=False,
-                                    is_advance_sent=False,
-                                    retry_count=0,
-                                    sent_at=datetime.now(),
-                                    last_triggered_at=datetime.now(),
-                                    status="active",
-                                ).where(id_col == reminder.id)
-                                logger.info(
-                                    f"Sent recurring reminder: {reminder.content}, next at {next_time}"
-                                )
-                            elif int(reminder.retry_interval_minutes or 0) > 0 and int(
-                                reminder.retry_count or 0
-                            ) < int(reminder.max_retries or 0):
-                                retry_time = now + timedelta(
-                                    minutes=int(reminder.retry_interval_minutes or 0)
-                                )
-                                await Reminder.update(
-                                    remind_at=retry_time,
-                                    is_sent=False,
-                                    is_advance_sent=False,
-                                    retry_count=int(reminder.retry_count or 0) + 1,
-                                    sent_at=datetime.now(),
-                                    last_triggered_at=datetime.now(),
-                                ).where(id_col == reminder.id)
-                                logger.info(
-                                    f"Sent reminder with retry schedule: {reminder.content}, retry at {retry_time}"
-                                )
-                            else:
-                                await Reminder.update(
-                                    is_sent=True,
-                                    sent_at=datetime.now(),
-                                    last_triggered_at=datetime.now(),
-                                ).where(id_col == reminder.id)
-                                logger.info(f"Sent reminder: {reminder.content}")
-
-                    elif (
-                        int(reminder.advance_minutes or 0) > 0
-                        and reminder.remind_at <= advance_window
-                        and not reminder.is_advance_sent
-                    ):
-                        success = await send_reminder(reminder, is_advance=True)
-                        if success:
-                            await Reminder.update(is_advance_sent=True).where(id_col == reminder.id)
-                            logger.info(f"Sent advance reminder: {reminder.content}")
+    def _transition(self, reminder: Reminder, is_advance: bool, now: datetime) -> dict[str, Any]:
+        """Applies a successful send to ``reminder`` and returns the columns to persist."""
+        if is_advance:
+            reminder.is_advance_sent = True
+            logger.info(f"Sent advance reminder: {reminder.content}")
+            return {"is_advance_sent": True}
 
-                except Exception as e:
-                    logger.error(f"Error processing reminder row: {e}")
-                    continue
+        values: dict[str, Any] = {"sent_at": now, "last_triggered_at": now}
+        if reminder.is_recurring and reminder.recurrence_rule:
+            next_time = ReminderService.next_occurrence(
+                base=reminder.remind_at,
+                rule=reminder.recurrence_rule,
+                now=now,
+            )
+            values.update(
+                remind_at=next_time,
+                is_sent=False,
+                is_advance_sent=False,
+                retry_count=0,
+                status="active",
+            )
+            logger.info(f"Sent recurring reminder: {reminder.content}, next at {next_time}")
+        elif int(reminder.retry_interval_minutes or 0) > 0 and int(reminder.retry_count or 0) < int(
+            reminder.max_retries or 0
+        ):
+            retry_time = now + timedelta(minutes=int(reminder.retry_interval_minutes or 0))
+            values.update(
+                remind_at=retry_time,
+                is_sent=False,
+                is_advance_sent=False,
+                retry_count=int(reminder.retry_count or 0) + 1,
+            )
+            logger.info(
+                f"Sent reminder with retry schedule: {reminder.content}, retry at {retry_time}"
+            )
+        else:
+            values["is_sent"] = True
+            logger.info(f"Sent reminder: {reminder.content}")
+        for column, value in values.items():
+            setattr(reminder, column, value)
+        return values
+
+    def _on_sent(self, delivery: Delivery, success: bool) -> None:
+        reminder = delivery.reminder
+        reminder_id = int(reminder.id)
+        if self._in_flight.get(reminder_id) == delivery.version:
+            del self._in_flight[reminder_id]
+        now = datetime.now()
+        due_at = reminder.remind_at
+        if delivery.is_advance:
+            due_at -= timedelta(minutes=int(reminder.advance_minutes or 0))
+        REMINDER_LAG_SECONDS.observe(
+            max((now - due_at).total_seconds(), 0.0),
+            kind="advance" if delivery.is_advance else "due",
+        )
+        # Edited or removed while it was being sent; the edit wins.
+        if self._versions.get(reminder_id) != delivery.version:
+            return
+        self._touch(reminder_id)
+        if not success:
+            self._schedule(reminder, now + timedelta(seconds=self.retry_delay))
+            return
+        self._dispatcher.write(reminder_id, self._transition(reminder, delivery.is_advance, now))
+        self._schedule(reminder)
+
+    def _fire_due(self) -> None:
+        now = datetime.now()
+        while self._heap and self._heap[0][0] <= now:
+            _, version, reminder_id = heapq.heappop(self._heap)
+            reminder = self._reminders.get(reminder_id)
+            if reminder is None or self._versions.get(reminder_id) != version:
+                continue
+            if reminder.status == "paused" and reminder.pause_until and reminder.pause_until <= now:
+                reminder.status = "active"
+                self._dispatcher.write(reminder_id, {"status": "active"})
 
-        except Exception as e:
-            logger.error(f"Error checking reminders: {e}")
+            advance_minutes = int(reminder.advance_minutes or 0)
+            if reminder.status != "active":
+                is_advance = None
+            elif reminder.remind_at <= now:
+                is_advance = False
+            elif (
+                advance_minutes > 0
+                and not reminder.is_advance_sent
+                and reminder.remind_at <= now + timedelta(minutes=advance_minutes)
+            ):
+                is_advance = True
+            else:
+                is_advance = None
 
-        await asyncio.sleep(30)
+            if is_advance is None:
+                self._schedule(reminder)
+                continue
+            self._in_flight[reminder_id] = version
+            self._dispatcher.submit(Delivery(reminder, version, is_advance))
+
+    def _seconds_until_next(self, next_sync: float) -> float:
+        timeout = next_sync - time.monotonic()
+        if self._heap:
+            timeout = min(timeout, (self._heap[0][0] - datetime.now()).total_seconds())
+        return max(timeout, 0.0)
+
+    async def run(self) -> None:
+        self._dispatcher.start()
+        next_sync = time.monotonic()
+        try:
+            while True:
+                started = time.perf_counter()
+                self._wakeup.clear()
+                try:
+                    if time.monotonic() >= next_sync:
+                        next_sync = time.monotonic() + self.sync_interval
+                        await self.sync()
+                    self._fire_due()
+                except Exception as e:
+                    logger.error(f"Error running reminder scheduler: {e}")
+                REMINDER_CHECK_SECONDS.observe(time.perf_counter() - started)
+
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=self._seconds_until_next(next_sync)
+                    )
+        finally:
+            await self._dispatcher.stop()
 
 
+_scheduler: ReminderScheduler | None = None
 _reminder_task: asyncio.Task | None = None
 
 
 def start_reminder_checker() -> None:
-    global _reminder_task
+    global _scheduler, _reminder_task
     if _reminder_task is None or _reminder_task.done():
-        _reminder_task = asyncio.create_task(check_reminders())
-        logger.info("Reminder checker started")
+        _scheduler = ReminderScheduler()
+        add_reminder_listener(_scheduler)
+        REMINDERS_SCHEDULED.set_function(lambda: len(_scheduler) if _scheduler else 0)
+        _reminder_task = asyncio.create_task(_scheduler.run())
+        logger.info("Reminder scheduler started")
 
 
-def stop_reminder_checker() -> None:
-    global _reminder_task
-    if _reminder_task and not _reminder_task.done():
-        _reminder_task.cancel()
-        logger.info("Reminder checker stopped")
+async def stop_reminder_checker() -> None:
+    global _scheduler, _reminder_task
+    if _scheduler is not None:
+        remove_reminder_listener(_scheduler)
+        _scheduler = None
+    task, _reminder_task = _reminder_task, None
+    if task and not task.done():
+        task.cancel()
+        # The scheduler flushes its batched state writes on the way out.
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        logger.info("Reminder scheduler stopped")
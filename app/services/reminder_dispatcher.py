@@ -0,0 +1,168 @@
+import asyncio
+import contextlib
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, cast
+
+from app.channels.runtime import send_reminder
+from app.config import settings
+from app.models import Reminder
+from app.utils import logger
+from app.utils.metrics import REGISTRY
+
+REMINDER_DISPATCH_QUEUE = REGISTRY.gauge(
+    "cognitive_reminder_dispatch_queue", "Due reminders waiting for a dispatch worker"
+)
+REMINDER_WRITE_BATCH = REGISTRY.histogram(
+    "cognitive_reminder_write_batch_size",
+    "Reminder state transitions written per database transaction",
+    buckets=(1.0, 2.0, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0),
+)
+REMINDER_FLUSH_SECONDS = REGISTRY.histogram(
+    "cognitive_reminder_flush_seconds", "Duration of one batched reminder state write"
+)
+
+
+@dataclass(slots=True)
+class Delivery:
+    reminder: Reminder
+    version: int
+    is_advance: bool
+
+
+def _provider_key(reminder: Reminder) -> str:
+    return str(reminder.provider or "").lower()
+
+
+class ReminderDispatcher:
+    """Sends due reminders from a bounded worker pool and batches their state writes.
+
+    Each provider gets its own concurrency limit, so a slow Discord lookup only holds
+    up other Discord sends, and a burst drains at the providers' pace rather than the
+    sum of every send's latency. State transitions queued with ``write`` are merged per
+    reminder and flushed in one transaction every ``flush_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        on_sent: Callable[[Delivery, bool], None],
+        workers: int | None = None,
+        provider_concurrency: int | None = None,
+        flush_interval: float | None = None,
+    ) -> None:
+        self._on_sent = on_sent
+        self.workers = max(1, workers or settings.reminder_dispatch_workers)
+        self.provider_concurrency = max(
+            1, provider_concurrency or settings.reminder_provider_concurrency
+        )
+        self.flush_interval = (
+            settings.reminder_flush_interval if flush_interval is None else flush_interval
+        )
+        self._queue: asyncio.Queue[Delivery] = asyncio.Queue()
+        self._limits: dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.provider_concurrency)
+        )
+        self._tasks: list[asyncio.Task] = []
+        self._flusher_task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+        self._writes: dict[int, dict[str, Any]] = {}
+        self._writes_pending = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._stopping.clear()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._flusher_task = asyncio.create_task(self._flusher())
+        REMINDER_DISPATCH_QUEUE.set_function(self._queue.qsize)
+
+    async def stop(self) -> None:
+        workers, self._tasks = self._tasks, []
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # The flusher is asked to exit rather than cancelled, so a batch it is writing
+        # is never abandoned halfway through.
+        if self._flusher_task is not None:
+            self._stopping.set()
+            self._writes_pending.set()
+            await self._flusher_task
+            self._flusher_task = None
+        await self.flush()
+
+    def submit(self, delivery: Delivery) -> None:
+        self._queue.put_nowait(delivery)
+
+    async def join(self) -> None:
+        """Waits until every submitted reminder has been sent and its result handled."""
+        await self._queue.join()
+
+    def write(self, reminder_id: int, values: dict[str, Any]) -> None:
+        self._writes.setdefault(reminder_id, {}).update(values)
+        self._writes_pending.set()
+
+    def drop_writes(self, reminder_id: int) -> None:
+        """Forgets unflushed transitions, e.g. after the reminder was edited."""
+        self._writes.pop(reminder_id, None)
+
+    async def _worker(self) -> None:
+        while True:
+            delivery = await self._queue.get()
+            try:
+                reminder = delivery.reminder
+                async with self._limits[_provider_key(reminder)]:
+                    try:
+                        success = await send_reminder(reminder, is_advance=delivery.is_advance)
+                    except Exception as e:
+                        logger.error(f"Failed to send reminder {reminder.id}: {e}")
+                        success = False
+                self._on_sent(delivery, success)
+            except Exception as e:
+                logger.error(f"Error dispatching reminder {delivery.reminder.id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _flusher(self) -> None:
+        while not self._stopping.is_set():
+            await self._writes_pending.wait()
+            # Let the rest of a burst land so it shares one transaction.
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+            await self.flush()
+
+    def _restore(self, writes: dict[int, dict[str, Any]]) -> None:
+        # Anything written since the swap is newer and wins.
+        for reminder_id, values in writes.items():
+            self._writes[reminder_id] = {**values, **self._writes.get(reminder_id, {})}
+        self._writes_pending.set()
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            self._writes_pending.clear()
+            writes, self._writes = self._writes, {}
+            if not writes:
+                return
+            # Rows receiving identical values (e.g. advance sent) share one UPDATE.
+            groups: dict[tuple[tuple[str, Any], ...], list[int]] = defaultdict(list)
+            for reminder_id, values in writes.items():
+                groups[tuple(sorted(values.items()))].append(reminder_id)
+
+            id_col = cast(Any, Reminder.id)
+            started = time.perf_counter()
+            try:
+                async with Reminder._meta.db.transaction():
+                    for values, ids in groups.items():
+                        await Reminder.update(dict(values)).where(id_col.is_in(ids))
+            except Exception as e:
+                logger.error(f"Failed to write {len(writes)} reminder state changes: {e}")
+                self._restore(writes)
+                return
+            except BaseException:
+                # Cancelled mid-write: keep the batch for the final flush in stop().
+                self._restore(writes)
+                raise
+            REMINDER_FLUSH_SECONDS.observe(time.perf_counter() - started)
+            REMINDER_WRITE_BATCH.observe(len(writes))
@@ -1,12 +1,46 @@
 import re
 from datetime import datetime, timedelta
-from typing import Any, Literal, cast
+from typing import Any, Literal, Protocol, cast
 
 from app.models import Reminder
 from app.services.calendar_service import ChinaWorkdayCalendarService
 from app.utils import logger
 
 
+class ReminderListener(Protocol):
+    def reminder_changed(self, reminder: Reminder) -> None: ...
+
+    def reminder_removed(self, reminder_id: int) -> None: ...
+
+
+_listeners: list[ReminderListener] = []
+
+
+def add_reminder_listener(listener: ReminderListener) -> None:
+    _listeners.append(listener)
+
+
+def remove_reminder_listener(listener: ReminderListener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def _notify_changed(reminder: Reminder) -> None:
+    for listener in list(_listeners):
+        try:
+            listener.reminder_changed(reminder)
+        except Exception as e:
+            logger.warning(f"Reminder listener {type(listener).__name__} failed: {e}")
+
+
+def _notify_removed(reminder_id: int) -> None:
+    for listener in list(_listeners):
+        try:
+            listener.reminder_removed(reminder_id)
+        except Exception as e:
+            logger.warning(f"Reminder listener {type(listener).__name__} failed: {e}")
+
+
 class ReminderService:
     _calendar = ChinaWorkdayCalendarService()
 
@@ -263,6 +297,7 @@ class ReminderService:
             status="active",
         )
         await reminder.save()
+        _notify_changed(reminder)
         logger.info(
             f"Created reminder: {reminder.content} at {remind_at}, recurring={is_recurring}, rule={normalized_rule}"
         )
@@ -305,6 +340,7 @@ class ReminderService:
     async def mark_as_sent(reminder_id: int) -> None:
         id_col = cast(Any, Reminder.id)
         await Reminder.update(is_sent=True, sent_at=datetime.now()).where(id_col == reminder_id)
+        _notify_removed(reminder_id)
 
     @staticmethod
     async def get_reminder_status(
@@ -410,6 +446,7 @@ class ReminderService:
         reminder.remind_at = next_time
         reminder.is_sent = False
         reminder.is_advance_sent = False
+        _notify_changed(reminder)
         return reminder
 
     @staticmethod
@@ -492,6 +529,7 @@ class ReminderService:
             ).where(id_col == latest.id)
             latest.remind_at = new_time
             latest.is_advance_sent = False
+            _notify_changed(latest)
             return latest
 
         # Otherwise create a new reminder from now with same content.
@@ -508,10 +546,12 @@ class ReminderService:
             provider=provider or latest.provider,
         )
         await reminder.save()
+        _notify_changed(reminder)
 
         # Optional: mark old as sent if it wasn't yet, to avoid duplicate fire.
         if not latest.is_sent:
             await Reminder.update(is_sent=True, sent_at=now).where(id_col == latest.id)
+            _notify_removed(int(latest.id))
 
         return reminder
 
@@ -571,6 +611,7 @@ class ReminderService:
         reminder.retry_count = 0
         reminder.pause_until = None
         reminder.status = "active"
+        _notify_changed(reminder)
         return reminder
 
     @staticmethod
@@ -598,6 +639,7 @@ class ReminderService:
         reminder.pause_until = pause_until
         reminder.status = "paused" if pause_until > datetime.now() else "active"
         reminder.is_advance_sent = False
+        _notify_changed(reminder)
         return reminder
 
     @staticmethod
@@ -638,6 +680,7 @@ class ReminderService:
         reminder.is_advance_sent = False
         reminder.retry_count = 0
         reminder.status = "active"
+        _notify_changed(reminder)
         return reminder
 
     @staticmethod
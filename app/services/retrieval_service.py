@@ -1,15 +1,59 @@
-from typing import Any
+import asyncio
+import hashlib
+import time
+from collections.abc import AsyncIterator
+from dataclasses import asdict, dataclass, field
+from typing import Any, Literal
 
+from cashews import cache
+
+from app.config import settings
+from app.core import ValidationError
 from app.models import KnowledgeItem
 from app.utils import logger
 
+from .answer_cache import SemanticAnswerCache, SourceVersions
 from .embedding_service import EmbeddingService
+from .index_generation import bump_knowledge_generation, get_generations
+from .keyword_index import KeywordIndex
 from .knowledge_item_service import KnowledgeItemService
 from .llm_service import LLMService
-from .memory.orchestrator import MemoryOrchestrator
+from .memory.orchestrator import ContextBundle, MemoryOrchestrator
 from .prompt_service import PromptService
 from .vector_store import VectorStore
 
+RetrievalMode = Literal["vector", "keyword", "hybrid"]
+RETRIEVAL_MODES: tuple[str, ...] = ("vector", "keyword", "hybrid")
+
+
+@dataclass
+class RAGResult:
+    answer: str
+    knowledge_items: list[KnowledgeItem] = field(default_factory=list)
+    memory_hits: list[dict[str, Any]] = field(default_factory=list)
+    scores: dict[int, dict[str, float | None]] = field(default_factory=dict)
+    timings: dict[str, float] = field(default_factory=dict)
+    # "answer" / "context" when served from the semantic answer / context bundle cache
+    cache: str | None = None
+
+
+@dataclass
+class _RAGPlan:
+    scope: str
+    started: float
+    timings: dict[str, float] = field(default_factory=dict)
+    query_embedding: list[float] | None = None
+    bundle: ContextBundle | None = None
+    items: list[KnowledgeItem] | None = None
+    cache_kind: str | None = None
+    versions: SourceVersions = (0, 0)
+    # Set when the request is answered without a generation step.
+    result: RAGResult | None = None
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
 
 class RetrievalService:
     def __init__(
@@ -20,6 +64,8 @@ class RetrievalService:
         vector_store: VectorStore,
         prompt_service: PromptService,
         memory_orchestrator: MemoryOrchestrator,
+        keyword_index: KeywordIndex,
+        answer_cache: SemanticAnswerCache,
     ) -> None:
         self.llm_service = llm_service
         self.embedding_service = embedding_service
@@ -27,14 +73,70 @@ class RetrievalService:
         self.vector_store = vector_store
         self.prompt_service = prompt_service
         self.memory_orchestrator = memory_orchestrator
+        self.keyword_index = keyword_index
+        self.answer_cache = answer_cache
 
-    async def search_similar(self, query: str, top_k: int = 5) -> list[dict[str, Any]]:
-        query_embedding = await self.llm_service.get_embedding(query)
+    async def search_similar(
+        self, query: str, top_k: int = 5, query_embedding: list[float] | None = None
+    ) -> list[dict[str, Any]]:
+        if query_embedding is None:
+            query_embedding = await self.llm_service.get_embedding(query)
         results = self.vector_store.search(query_embedding, top_k)
         return results
 
-    async def search_and_retrieve(self, query: str, top_k: int = 5) -> list[KnowledgeItem]:
-        results = await self.search_similar(query, top_k)
+    async def search_keyword(self, query: str, top_k: int = 5) -> list[dict[str, Any]]:
+        return await asyncio.to_thread(self.keyword_index.search, query, top_k)
+
+    async def search_hybrid(
+        self, query: str, top_k: int = 5, query_embedding: list[float] | None = None
+    ) -> list[dict[str, Any]]:
+        # Fetch a deeper candidate list from both retrievers so fusion can promote items
+        # that rank moderately in both over items that rank well in only one.
+        candidate_k = max(top_k * 4, top_k)
+        dense, sparse = await asyncio.gather(
+            self.search_similar(query, candidate_k, query_embedding),
+            self.search_keyword(query, candidate_k),
+        )
+
+        distances = {int(row["item_id"]): float(row["distance"]) for row in dense}
+        fused = self._reciprocal_rank_fusion(
+            [[int(row["item_id"]) for row in dense], [int(row["item_id"]) for row in sparse]],
+            k=settings.retrieval_rrf_k,
+        )
+        return [
+            {"item_id": item_id, "distance": distances.get(item_id), "score": score}
+            for item_id, score in fused[:top_k]
+        ]
+
+    async def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        mode: RetrievalMode = "vector",
+        query_embedding: list[float] | None = None,
+    ) -> list[dict[str, Any]]:
+        if mode == "vector":
+            return await self.search_similar(query, top_k, query_embedding)
+        if mode == "keyword":
+            return await self.search_keyword(query, top_k)
+        if mode == "hybrid":
+            return await self.search_hybrid(query, top_k, query_embedding)
+        raise ValidationError(
+            f"Unsupported retrieval mode: {mode}", detail={"allowed": list(RETRIEVAL_MODES)}
+        )
+
+    @staticmethod
+    def _reciprocal_rank_fusion(rankings: list[list[int]], k: int = 60) -> list[tuple[int, float]]:
+        scores: dict[int, float] = {}
+        for ranking in rankings:
+            for rank, item_id in enumerate(dict.fromkeys(ranking), start=1):
+                scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+        return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+    async def search_and_retrieve(
+        self, query: str, top_k: int = 5, mode: RetrievalMode = "vector"
+    ) -> list[KnowledgeItem]:
+        results = await self.search(query, top_k, mode=mode)
 
         if not results:
             return []
@@ -45,16 +147,40 @@ class RetrievalService:
         logger.info(f"Retrieved {len(items)} items for query")
         return items
 
-    async def rag_query(
+    async def _load_context(
         self,
         query: str,
-        top_k: int = 5,
-        max_context_tokens: int = 2000,
-        user_id: str = "default",
-    ) -> str:
-        # Reserved for future prompt budget control when merging knowledge + memory context.
-        _ = max_context_tokens
-        items = await self.search_and_retrieve(query, top_k)
+        top_k: int,
+        max_context_tokens: int | None,
+        user_id: str,
+        mode: RetrievalMode,
+        query_embedding: list[float] | None,
+        timings: dict[str, float],
+    ) -> tuple[ContextBundle, list[KnowledgeItem] | None]:
+        """Returns the bundle and, on a cache miss, the knowledge items it was built from."""
+        key = None
+        ttl = settings.rag_context_cache_ttl
+        if ttl > 0:
+            # Generations are read before retrieval: a write racing with this request
+            # lands the bundle under the stale key, which no later reader will ask for.
+            knowledge_gen, memory_gen = await get_generations(user_id)
+            digest = hashlib.md5(
+                f"{mode}:{top_k}:{max_context_tokens}:{query}".encode()
+            ).hexdigest()
+            key = f"rag_context:{user_id}:{digest}:{knowledge_gen}:{memory_gen}"
+            cached = await cache.get(key)
+            if isinstance(cached, dict):
+                logger.debug(f"RAG context cache hit: {key}")
+                return ContextBundle(**cached), None
+
+        if query_embedding is None:
+            started = time.perf_counter()
+            query_embedding = await self.llm_service.get_embedding(query)
+            timings["embed_ms"] = _elapsed_ms(started)
+
+        started = time.perf_counter()
+        results = await self.search(query, top_k, mode=mode, query_embedding=query_embedding)
+        items = await self.knowledge_service.get_by_ids([row["item_id"] for row in results])
 
         if not items:
             # Even when knowledge base has no match, memory layer may still answer.
@@ -65,43 +191,198 @@ class RetrievalService:
             query=query,
             knowledge_items=items,
             top_k=top_k,
+            max_context_tokens=max_context_tokens,
+            query_embedding=query_embedding,
         )
+        rows = {int(row["item_id"]): row for row in results}
+        bundle.knowledge_scores = {
+            item_id: {
+                "distance": rows[item_id].get("distance"),
+                "score": rows[item_id].get("score", rows[item_id].get("bm25")),
+            }
+            for item_id in bundle.knowledge_ids
+            if item_id in rows
+        }
+        timings["retrieve_ms"] = _elapsed_ms(started)
 
-        if not bundle.memory_context and not items:
-            return "No relevant knowledge found."
+        if key is not None:
+            await cache.set(key, asdict(bundle), expire=ttl)
+        return bundle, items
 
-        response = await self.llm_service.chat_with_system(
-            bundle.system_prompt, bundle.user_prompt, temperature=0.7
+    async def _build_result(
+        self,
+        answer: str,
+        bundle: ContextBundle,
+        items: list[KnowledgeItem] | None,
+        timings: dict[str, float],
+        cache_kind: str | None = None,
+    ) -> RAGResult:
+        if items is None:
+            items = await self.knowledge_service.get_by_ids(bundle.knowledge_ids)
+        by_id = {int(item.id): item for item in items}
+        return RAGResult(
+            answer=answer,
+            knowledge_items=[by_id[i] for i in bundle.knowledge_ids if i in by_id],
+            memory_hits=bundle.memory_hits,
+            scores=bundle.knowledge_scores,
+            timings=timings,
+            cache=cache_kind,
         )
+
+    async def _plan(
+        self,
+        query: str,
+        top_k: int,
+        max_context_tokens: int | None,
+        user_id: str,
+        mode: RetrievalMode,
+    ) -> _RAGPlan:
+        plan = _RAGPlan(scope=f"{mode}:{top_k}:{max_context_tokens}", started=time.perf_counter())
+
+        # The query is embedded at most once per call and threaded through the answer
+        # cache, dense search and memory retrieval.
+        if self.answer_cache.enabled:
+            started = time.perf_counter()
+            plan.query_embedding = await self.llm_service.get_embedding(query)
+            plan.timings["embed_ms"] = _elapsed_ms(started)
+            entry = await self.answer_cache.lookup(user_id, plan.scope, plan.query_embedding)
+            if entry is not None:
+                plan.timings["total_ms"] = _elapsed_ms(plan.started)
+                plan.result = await self._build_result(
+                    entry.answer, entry.bundle, None, plan.timings, cache_kind="answer"
+                )
+                return plan
+
+        plan.bundle, plan.items = await self._load_context(
+            query, top_k, max_context_tokens, user_id, mode, plan.query_embedding, plan.timings
+        )
+        plan.cache_kind = "context" if plan.items is None else None
+
+        if not plan.bundle.memory_context and not plan.bundle.knowledge_context:
+            plan.timings["total_ms"] = _elapsed_ms(plan.started)
+            plan.result = RAGResult(answer="No relevant knowledge found.", timings=plan.timings)
+            return plan
+
+        # Versions are taken before generation so an edit racing with the LLM call
+        # leaves the stored answer already stale rather than silently current.
+        plan.versions = await self.answer_cache.snapshot(user_id)
+        return plan
+
+    async def _finish(self, plan: _RAGPlan, query: str, user_id: str, response: str) -> None:
+        assert plan.bundle is not None
+        started = time.perf_counter()
         await self.memory_orchestrator.write_back(user_id=user_id, query=query, response=response)
+        plan.timings["write_back_ms"] = _elapsed_ms(started)
 
-        return response
+        if plan.query_embedding is not None:
+            self.answer_cache.store(
+                user_id,
+                plan.scope,
+                query,
+                plan.query_embedding,
+                response,
+                plan.bundle,
+                plan.versions,
+            )
 
-    @staticmethod
-    def _build_context(items: list[KnowledgeItem], max_tokens: int) -> str:
-        context_parts = []
-        current_length = 0
+    async def rag_query(
+        self,
+        query: str,
+        top_k: int = 5,
+        max_context_tokens: int | None = None,
+        user_id: str = "default",
+        mode: RetrievalMode = "vector",
+    ) -> RAGResult:
+        plan = await self._plan(query, top_k, max_context_tokens, user_id, mode)
+        if plan.result is not None:
+            return plan.result
+        assert plan.bundle is not None
+
+        started = time.perf_counter()
+        response = await self.llm_service.chat_with_system(
+            plan.bundle.system_prompt, plan.bundle.user_prompt, temperature=0.7
+        )
+        plan.timings["generate_ms"] = _elapsed_ms(started)
+
+        await self._finish(plan, query, user_id, response)
+        plan.timings["total_ms"] = _elapsed_ms(plan.started)
+        return await self._build_result(
+            response, plan.bundle, plan.items, plan.timings, plan.cache_kind
+        )
+
+    async def rag_stream(
+        self,
+        query: str,
+        top_k: int = 5,
+        max_context_tokens: int | None = None,
+        user_id: str = "default",
+        mode: RetrievalMode = "vector",
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """Yields ("sources", RAGResult), then ("token", str)*, then ("done", RAGResult).
 
-        for item in items:
-            text = item.structured_text or item.raw_text
-            entry = f"[ID: {item.id}] {text}\n"
+        Memory write-back runs after "done" has been handed to the consumer, so it never
+        delays the end of the answer; a consumer that stops early skips it. If generation
+        fails, the error propagates after the tokens already yielded and nothing is
+        written back or cached.
+        """
+        plan = await self._plan(query, top_k, max_context_tokens, user_id, mode)
+        if plan.result is not None:
+            yield "sources", plan.result
+            yield "token", plan.result.answer
+            yield "done", plan.result
+            return
+        assert plan.bundle is not None
+
+        result = await self._build_result(
+            "", plan.bundle, plan.items, plan.timings, plan.cache_kind
+        )
+        yield "sources", result
 
-            estimated_tokens = len(entry) // 4
-            if current_length + estimated_tokens > max_tokens:
-                break
+        started = time.perf_counter()
+        parts: list[str] = []
+        async for token in self.llm_service.chat_with_system_stream(
+            plan.bundle.system_prompt, plan.bundle.user_prompt, temperature=0.7
+        ):
+            if not parts:
+                plan.timings["first_token_ms"] = _elapsed_ms(plan.started)
+            parts.append(token)
+            yield "token", token
+        plan.timings["generate_ms"] = _elapsed_ms(started)
+        plan.timings["total_ms"] = _elapsed_ms(plan.started)
 
-            context_parts.append(entry)
-            current_length += estimated_tokens
+        result.answer = "".join(parts)
+        yield "done", result
 
-        return "\n".join(context_parts)
+        await self._finish(plan, query, user_id, result.answer)
 
     async def index_item(self, item: KnowledgeItem) -> None:
         embedding = await self.embedding_service.generate_and_store(item)
         self.vector_store.add(item, embedding)
         self.vector_store.save()
+        await asyncio.to_thread(self.keyword_index.upsert, item)
+        await bump_knowledge_generation()
         logger.info(f"Indexed item {item.id}")
 
+    async def backfill_keyword_index(self) -> int:
+        """Fills an empty keyword index from every knowledge item already stored.
+
+        Items embedded before the keyword index existed (or before its tokenizer
+        changed) are never picked up by ``rebuild_index``, which only handles items
+        without an embedding.
+        """
+        if await asyncio.to_thread(self.keyword_index.count) > 0:
+            return 0
+        total = 0
+        while batch := await self.knowledge_service.list_batch(offset=total):
+            await asyncio.to_thread(self.keyword_index.upsert_batch, batch)
+            total += len(batch)
+        if total:
+            await bump_knowledge_generation()
+            logger.info(f"Backfilled keyword index with {total} items")
+        return total
+
     async def rebuild_index(self) -> int:
+        await self.backfill_keyword_index()
         items = await self.knowledge_service.filter_without_embedding(limit=1000)
 
         if not items:
@@ -112,6 +393,8 @@ class RetrievalService:
 
         self.vector_store.add_batch(items, embeddings)
         self.vector_store.save()
+        await asyncio.to_thread(self.keyword_index.upsert_batch, items)
+        await bump_knowledge_generation()
 
         logger.info(f"Rebuilt index with {len(items)} items")
         return len(items)
@@ -0,0 +1,73 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+from cashews import cache
+
+from app.config import settings
+from app.utils import logger
+
+SESSION_KEY = "agent_session:{session_id}"
+SESSION_LOCK_KEY = "agent_session_lock:{session_id}"
+# Upper bound on how long an update holds the lock if the worker dies mid-write.
+LOCK_EXPIRE_SECONDS = 5
+
+
+class SessionStore:
+    """Per-user agent session slots shared by all workers through the cashews backend.
+
+    Reads go through a small in-process LRU whose entries live for ``local_ttl``
+    seconds, which bounds how stale a slot written by another worker can appear.
+    """
+
+    def __init__(
+        self,
+        ttl: int | None = None,
+        local_max_entries: int | None = None,
+        local_ttl: float | None = None,
+    ) -> None:
+        self.ttl = settings.agent_session_ttl if ttl is None else ttl
+        self.local_max_entries = (
+            settings.agent_session_local_max_entries
+            if local_max_entries is None
+            else local_max_entries
+        )
+        self.local_ttl = settings.agent_session_local_ttl if local_ttl is None else local_ttl
+        self._local: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    def _remember(self, session_id: str, slot: dict[str, Any]) -> None:
+        if self.local_max_entries <= 0 or self.local_ttl <= 0:
+            return
+        self._local[session_id] = (time.monotonic() + self.local_ttl, slot)
+        self._local.move_to_end(session_id)
+        while len(self._local) > self.local_max_entries:
+            self._local.popitem(last=False)
+
+    async def get(self, session_id: str) -> dict[str, Any]:
+        local = self._local.get(session_id)
+        if local is not None:
+            expires_at, slot = local
+            if expires_at > time.monotonic():
+                self._local.move_to_end(session_id)
+                return dict(slot)
+            del self._local[session_id]
+
+        slot = await cache.get(SESSION_KEY.format(session_id=session_id)) or {}
+        self._remember(session_id, slot)
+        return dict(slot)
+
+    async def update(self, session_id: str, values: dict[str, Any]) -> dict[str, Any]:
+        """Merge ``values`` into the slot under a backend lock and refresh its TTL."""
+        key = SESSION_KEY.format(session_id=session_id)
+        async with cache.lock(
+            SESSION_LOCK_KEY.format(session_id=session_id), expire=LOCK_EXPIRE_SECONDS
+        ):
+            slot = {**(await cache.get(key) or {}), **values}
+            await cache.set(key, slot, expire=self.ttl or None)
+        self._remember(session_id, slot)
+        logger.debug(f"Agent session {session_id} updated: {sorted(values)}")
+        return dict(slot)
+
+    async def clear(self, session_id: str) -> None:
+        self._local.pop(session_id, None)
+        await cache.delete(SESSION_KEY.format(session_id=session_id))
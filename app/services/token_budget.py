@@ -0,0 +1,95 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+import litellm
+
+from app.config import settings
+from app.utils import logger
+
+_CJK_CHAR = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+# Truncating the last snippet below this many tokens yields noise rather than context.
+MIN_TRUNCATED_TOKENS = 16
+
+
+@dataclass(slots=True)
+class Snippet:
+    text: str
+    score: float
+    source: str = ""
+    ref: Any = None
+
+
+class TokenBudgeter:
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self.exact = True
+        try:
+            # litellm picks the model's tokenizer (tiktoken / HF) and caches it per model;
+            # the cl100k fallback ships with the package, so this works offline.
+            self._encode("ping")
+        except Exception as e:
+            logger.warning(f"Tokenizer unavailable for {model}, using estimate: {e}")
+            self.exact = False
+
+    def _encode(self, text: str) -> list[int]:
+        encoded = litellm.encode(model=self.model, text=text)
+        return list(getattr(encoded, "ids", encoded))
+
+    def _estimate(self, text: str) -> int:
+        cjk = len(_CJK_CHAR.findall(text))
+        return cjk + (len(text) - cjk + 3) // 4
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if not self.exact:
+            return self._estimate(text)
+        return len(self._encode(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if not self.exact:
+            while text and self._estimate(text) > max_tokens:
+                text = text[: len(text) - max(len(text) // 8, 1)]
+            return text
+        tokens = self._encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        # Cutting inside a multi-byte character leaves a replacement char at the end.
+        return litellm.decode(model=self.model, tokens=tokens[:max_tokens]).rstrip("\ufffd")
+
+    def pack(self, snippets: list[Snippet], max_tokens: int) -> list[Snippet]:
+        packed: list[Snippet] = []
+        remaining = max_tokens
+        for snippet in sorted(snippets, key=lambda s: s.score, reverse=True):
+            # +1 for the newline joining this snippet to the previous one.
+            cost = self.count(snippet.text) + (1 if packed else 0)
+            if cost <= remaining:
+                packed.append(snippet)
+                remaining -= cost
+                continue
+
+            room = remaining - (1 if packed else 0)
+            if room < MIN_TRUNCATED_TOKENS:
+                # Too little room to be worth a truncated copy; a shorter, lower-ranked
+                # snippet may still fit whole.
+                continue
+            packed.append(
+                Snippet(
+                    text=self.truncate(snippet.text, room),
+                    score=snippet.score,
+                    source=snippet.source,
+                    ref=snippet.ref,
+                )
+            )
+            break
+        return packed
+
+
+@lru_cache(maxsize=16)
+def get_token_budgeter(model: str | None = None) -> TokenBudgeter:
+    return TokenBudgeter(model or settings.llm_model)
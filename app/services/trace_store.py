@@ -0,0 +1,185 @@
+import json
+import sqlite3
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from app.config import settings
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS agent_runs ("
+    "run_id TEXT PRIMARY KEY, user_id TEXT, provider TEXT, text TEXT, "
+    "started_at TEXT, ended_at TEXT, latency_ms REAL, steps INTEGER, done INTEGER, "
+    "fast_path TEXT, prompt_tokens INTEGER, completion_tokens INTEGER, response TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_agent_runs_started ON agent_runs (started_at)",
+    "CREATE INDEX IF NOT EXISTS idx_agent_runs_user ON agent_runs (user_id, started_at)",
+    "CREATE TABLE IF NOT EXISTS agent_events ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT NOT NULL, ts TEXT, type TEXT, "
+    "action TEXT, payload TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_agent_events_run ON agent_events (run_id, id)",
+    "CREATE INDEX IF NOT EXISTS idx_agent_events_action ON agent_events (action, run_id)",
+)
+
+_RUN_COLUMNS = (
+    "run_id",
+    "user_id",
+    "provider",
+    "text",
+    "started_at",
+    "ended_at",
+    "latency_ms",
+    "steps",
+    "done",
+    "fast_path",
+    "prompt_tokens",
+    "completion_tokens",
+    "response",
+)
+
+
+class AgentTraceStore:
+    """SQLite index over agent trace events, written alongside the JSONL files.
+
+    Every event is stored with its run_id and action; ``agent_runs`` keeps one summary
+    row per run so listing and filtering never touch the trace files.
+    """
+
+    def __init__(self, index_path: str | Path | None = None) -> None:
+        self.index_path = Path(index_path or settings.agent_trace_index_path)
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Opened on first use so constructing an agent does not create the index file.
+        if self._db is None:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.index_path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._db = conn
+        return self._db
+
+    @staticmethod
+    def _run_end_row(event: dict[str, Any]) -> tuple[Any, ...]:
+        tokens = event.get("tokens") or {}
+        return (
+            event.get("user_id"),
+            event.get("provider"),
+            event.get("ts"),
+            event.get("latency_ms"),
+            event.get("steps"),
+            int(bool(event.get("done"))),
+            event.get("fast_path"),
+            tokens.get("prompt"),
+            tokens.get("completion"),
+            event.get("response"),
+            event["run_id"],
+        )
+
+    def record(self, events: list[dict[str, Any]]) -> None:
+        events = [event for event in events if event.get("run_id")]
+        if not events:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO agent_runs (run_id, started_at) VALUES (?, ?)",
+                [(event["run_id"], event.get("ts")) for event in events],
+            )
+            self._conn.executemany(
+                "INSERT INTO agent_events (run_id, ts, type, action, payload) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        event["run_id"],
+                        event.get("ts"),
+                        event.get("type"),
+                        event["action"] if isinstance(event.get("action"), str) else None,
+                        json.dumps(event, ensure_ascii=False),
+                    )
+                    for event in events
+                ],
+            )
+            self._conn.executemany(
+                "UPDATE agent_runs SET user_id = ?, provider = ?, text = ? WHERE run_id = ?",
+                [
+                    (
+                        event.get("user_id"),
+                        event.get("provider"),
+                        event.get("text"),
+                        event["run_id"],
+                    )
+                    for event in events
+                    if event.get("type") == "run_start"
+                ],
+            )
+            self._conn.executemany(
+                "UPDATE agent_runs SET user_id = ?, provider = ?, ended_at = ?, latency_ms = ?, "
+                "steps = ?, done = ?, fast_path = ?, prompt_tokens = ?, completion_tokens = ?, "
+                "response = ? WHERE run_id = ?",
+                [self._run_end_row(event) for event in events if event.get("type") == "run_end"],
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _run(row: sqlite3.Row) -> dict[str, Any]:
+        run = {column: row[column] for column in _RUN_COLUMNS}
+        run["done"] = bool(run["done"])
+        return run
+
+    def list_runs(
+        self,
+        user_id: str | None = None,
+        action: str | None = None,
+        before: str | None = None,
+        limit: int = 50,
+    ) -> list[dict[str, Any]]:
+        clauses: list[str] = []
+        params: list[Any] = []
+        if user_id:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if action:
+            clauses.append("run_id IN (SELECT run_id FROM agent_events WHERE action = ?)")
+            params.append(action)
+        if before:
+            clauses.append("started_at < ?")
+            params.append(before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_RUN_COLUMNS)} FROM agent_runs {where} "
+                "ORDER BY started_at DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [self._run(row) for row in rows]
+
+    def get_run(self, run_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_RUN_COLUMNS)} FROM agent_runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        return self._run(row) if row is not None else None
+
+    def get_events(self, run_id: str) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM agent_events WHERE run_id = ? ORDER BY id", (run_id,)
+            ).fetchall()
+        return [json.loads(row["payload"]) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+@lru_cache(maxsize=1)
+def get_trace_store() -> AgentTraceStore:
+    return AgentTraceStore()
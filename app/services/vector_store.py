@@ -8,6 +8,9 @@ import numpy as np
 from app.config import settings
 from app.models import KnowledgeItem
 from app.utils import logger
+from app.utils.metrics import REGISTRY, span
+
+FAISS_VECTORS = REGISTRY.gauge("cognitive_faiss_vectors", "Vectors in the FAISS index (ntotal)")
 
 
 class VectorStore:
@@ -19,6 +22,7 @@ class VectorStore:
         self.index = self._load_or_create_index()
         self.id_map: dict[int, int] = {}
         self._load_id_map()
+        FAISS_VECTORS.set_function(lambda: self.index.ntotal)
 
     def _load_or_create_index(self):
         if self.index_path.exists():
@@ -76,8 +80,9 @@ class VectorStore:
             return []
 
         query_vector = np.array([query_embedding], dtype=np.float32)
-        # FAISS Python stubs can be inconsistent across versions, so cast for static type checkers.
-        distances, indices = cast(Any, self.index).search(query_vector, top_k)
+        with span("vector_search", "faiss", top_k=top_k):
+            # FAISS Python stubs can be inconsistent across versions, so cast for type checkers.
+            distances, indices = cast(Any, self.index).search(query_vector, top_k)
 
         results = []
         for distance, faiss_id in zip(distances[0], indices[0], strict=False):
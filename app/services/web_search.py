@@ -0,0 +1,118 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Protocol
+
+import httpx
+
+from app.config import settings
+from app.utils import logger
+from app.utils.http import create_http_client
+
+
+@dataclass(slots=True, frozen=True)
+class SearchHit:
+    title: str
+    snippet: str
+    url: str = ""
+
+
+class SearchProvider(Protocol):
+    name: str
+
+    async def search(self, query: str, limit: int) -> list[SearchHit]: ...
+
+
+class WikipediaSearchProvider:
+    name = "wikipedia"
+
+    def __init__(self, client: httpx.AsyncClient, endpoint: str | None = None) -> None:
+        self.client = client
+        self.endpoint = endpoint or settings.web_search_endpoint
+
+    async def search(self, query: str, limit: int) -> list[SearchHit]:
+        params = {
+            "action": "query",
+            "list": "search",
+            "srsearch": query,
+            "utf8": 1,
+            "format": "json",
+            "srlimit": limit,
+        }
+        resp = await self.client.get(self.endpoint, params=params)
+        resp.raise_for_status()
+        rows = resp.json().get("query", {}).get("search", [])
+        return [
+            SearchHit(
+                title=str(row.get("title", "")),
+                snippet=str(row.get("snippet", ""))
+                .replace('<span class="searchmatch">', "")
+                .replace("</span>", ""),
+            )
+            for row in rows
+        ]
+
+
+class StaticSearchProvider:
+    """Serves canned results; for tests, load tests and offline runs."""
+
+    name = "static"
+
+    def __init__(self, results: dict[str, list[SearchHit]] | None = None) -> None:
+        self.results = results or {}
+        self.calls = 0
+
+    async def search(self, query: str, limit: int) -> list[SearchHit]:
+        self.calls += 1
+        return self.results.get(query, [])[:limit]
+
+
+class WebSearchService:
+    """Web search through a pluggable provider, with an in-process query -> result cache.
+
+    Results do not depend on who asked, so the cache is shared by every user and channel.
+    Queries are normalised (case and whitespace) before lookup; failed searches are not
+    cached. This is the only web search cache; the agent tool does not add another.
+    """
+
+    def __init__(
+        self,
+        provider: SearchProvider,
+        ttl: float | None = None,
+        max_entries: int | None = None,
+    ) -> None:
+        self.provider = provider
+        self.ttl = settings.web_search_cache_ttl if ttl is None else ttl
+        self.max_entries = (
+            settings.web_search_cache_max_entries if max_entries is None else max_entries
+        )
+        self._cache: OrderedDict[tuple[str, str, int], tuple[float, list[SearchHit]]] = (
+            OrderedDict()
+        )
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        return " ".join(query.split()).casefold()
+
+    async def search(self, query: str, limit: int = 3) -> list[SearchHit]:
+        key = (self.provider.name, self._normalize(query), limit)
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            logger.debug(f"Web search cache hit: {query}")
+            return entry[1]
+
+        hits = await self.provider.search(query, limit)
+        if self.ttl > 0 and self.max_entries > 0:
+            self._cache[key] = (time.monotonic() + self.ttl, hits)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return hits
+
+
+@lru_cache(maxsize=1)
+def get_web_search() -> WebSearchService:
+    """Shared fallback for services built outside the DI container."""
+    return WebSearchService(WikipediaSearchProvider(create_http_client()))
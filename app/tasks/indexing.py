@@ -1,9 +1,20 @@
+import asyncio
 from typing import Any
 
+from cashews import cache
 from dishka import AsyncContainer, make_async_container
 
+from app.config import settings
 from app.container import AppProvider
-from app.services import EmbeddingService, KnowledgeItemService, VectorStore
+from app.services import (
+    EmbeddingService,
+    KeywordIndex,
+    KnowledgeItemService,
+    RetrievalService,
+    VectorStore,
+)
+from app.services.index_generation import bump_knowledge_generation
+from app.utils import logger
 
 from .worker import get_redis_settings
 
@@ -11,6 +22,15 @@ _container = make_async_container(AppProvider())
 
 
 async def startup(ctx: dict) -> None:
+    # Index generations bumped here must reach the API process through the shared cache.
+    if settings.cache_enabled:
+        cache.setup(settings.cache_url)
+    else:
+        cache.setup("mem://")
+        logger.warning(
+            "Cache disabled: index generation bumps from the worker stay in this process, "
+            "so the API keeps serving cached RAG context and answers until they expire"
+        )
     ctx["container"] = _container
 
 
@@ -32,6 +52,7 @@ async def index_knowledge_item(ctx: dict, item_id: int) -> dict[str, Any]:
         knowledge_service = await request_container.get(KnowledgeItemService)
         embedding_service = await request_container.get(EmbeddingService)
         vector_store = await request_container.get(VectorStore)
+        keyword_index = await request_container.get(KeywordIndex)
 
         item = await knowledge_service.get_by_id(item_id)
         if not item:
@@ -42,6 +63,8 @@ async def index_knowledge_item(ctx: dict, item_id: int) -> dict[str, Any]:
 
         embedding = await embedding_service.generate_and_store(item)
         vector_store.add(item, embedding)
+        await asyncio.to_thread(keyword_index.upsert, item)
+        await bump_knowledge_generation()
 
         return {"success": True, "item_id": item_id}
 
@@ -52,7 +75,10 @@ async def rebuild_all_indexes(ctx: dict) -> dict[str, Any]:
         knowledge_service = await request_container.get(KnowledgeItemService)
         embedding_service = await request_container.get(EmbeddingService)
         vector_store = await request_container.get(VectorStore)
+        keyword_index = await request_container.get(KeywordIndex)
+        retrieval_service = await request_container.get(RetrievalService)
 
+        await retrieval_service.backfill_keyword_index()
         items = await knowledge_service.filter_without_embedding(limit=1000)
 
         if not items:
@@ -60,6 +86,8 @@ async def rebuild_all_indexes(ctx: dict) -> dict[str, Any]:
 
         embeddings = await embedding_service.batch_generate_and_store(items)
         vector_store.add_batch(items, embeddings)
+        await asyncio.to_thread(keyword_index.upsert_batch, items)
+        await bump_knowledge_generation()
 
         return {"success": True, "indexed_count": len(items)}
 
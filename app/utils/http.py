@@ -0,0 +1,19 @@
+from importlib.util import find_spec
+
+import httpx
+
+from app.config import settings
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Shared outbound client: pooled keep-alive connections, HTTP/2 when h2 is installed."""
+    return httpx.AsyncClient(
+        http2=settings.http_client_http2 and find_spec("h2") is not None,
+        timeout=settings.http_client_timeout,
+        limits=httpx.Limits(
+            max_connections=settings.http_client_max_connections,
+            max_keepalive_connections=settings.http_client_max_keepalive,
+            keepalive_expiry=settings.http_client_keepalive_expiry,
+        ),
+        follow_redirects=True,
+    )
@@ -0,0 +1,370 @@
+import bisect
+import itertools
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Protocol
+
+from app.utils.logging import logger
+
+# Recent samples kept per label set for percentile estimates.
+RESERVOIR_SIZE = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+# Latency bucket upper bounds in seconds for the Prometheus exposition.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = tuple[str, ...]
+
+
+def _quantile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def values(self) -> dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge:
+    """Point-in-time value, either set directly or read from a callback at export time."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[LabelValues, float] = {}
+        self._function: Callable[[], float] | None = None
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def values(self) -> dict[LabelValues, float]:
+        if self._function is not None:
+            try:
+                return {(): float(self._function())}
+            except Exception as e:
+                logger.warning(f"Gauge {self.name} callback failed: {e}")
+                return {}
+        with self._lock:
+            return dict(self._values)
+
+
+@dataclass(slots=True)
+class _Series:
+    buckets: list[int]
+    count: int = 0
+    total: float = 0.0
+    samples: deque[float] = field(default_factory=lambda: deque(maxlen=RESERVOIR_SIZE))
+
+
+class Histogram:
+    """Latency histogram keeping a count, a sum and a reservoir of recent samples.
+
+    Percentiles are computed from the reservoir, so they describe the last
+    ``RESERVOIR_SIZE`` observations of each label set rather than the whole lifetime.
+    Bucket counts cover the whole lifetime, as Prometheus expects.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[LabelValues, _Series] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(buckets=[0] * len(self.buckets))
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series.buckets[index] += 1
+            series.count += 1
+            series.total += value
+            series.samples.append(value)
+
+    def summary(self) -> list[dict[str, Any]]:
+        with self._lock:
+            series = {key: (s.count, s.total, list(s.samples)) for key, s in self._series.items()}
+        rows: list[dict[str, Any]] = []
+        for key, (count, total, samples) in sorted(series.items()):
+            row: dict[str, Any] = dict(zip(self.labelnames, key, strict=True))
+            row["count"] = count
+            row["sum"] = total
+            for q in QUANTILES:
+                row[f"p{int(q * 100)}"] = _quantile(samples, q)
+            rows.append(row)
+        return rows
+
+    def buckets_by_series(self) -> dict[LabelValues, tuple[list[int], int, float]]:
+        """Cumulative bucket counts, total count and sum per label set."""
+        with self._lock:
+            series = {key: (list(s.buckets), s.count, s.total) for key, s in self._series.items()}
+        return {
+            key: (list(itertools.accumulate(buckets)), count, total)
+            for key, (buckets, count, total) in series.items()
+        }
+
+
+type Metric = Counter | Gauge | Histogram
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create[M: (Counter, Gauge, Histogram)](
+        self,
+        kind: type[M],
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        **kwargs: Any,
+    ) -> M:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = kind(name, documentation, labelnames, **kwargs)
+            if not isinstance(metric, kind):
+                raise TypeError(f"Metric {name} is already registered as {type(metric).__name__}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def metrics(self) -> list[Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: list[str] = []
+        for metric in sorted(self.metrics(), key=lambda m: m.name):
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            if isinstance(metric, Histogram):
+                for key, (cumulative, count, total) in sorted(metric.buckets_by_series().items()):
+                    for bound, value in zip(metric.buckets, cumulative, strict=True):
+                        labels = _labels(metric.labelnames, key, le=_format_value(bound))
+                        lines.append(f"{metric.name}_bucket{labels} {value}")
+                    labels = _labels(metric.labelnames, key, le="+Inf")
+                    lines.append(f"{metric.name}_bucket{labels} {count}")
+                    labels = _labels(metric.labelnames, key)
+                    lines.append(f"{metric.name}_sum{labels} {_format_value(total)}")
+                    lines.append(f"{metric.name}_count{labels} {count}")
+            else:
+                for key, value in sorted(metric.values().items()):
+                    labels = _labels(metric.labelnames, key)
+                    lines.append(f"{metric.name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(names: tuple[str, ...], values: LabelValues, **extra: str) -> str:
+    pairs = [*zip(names, values, strict=True), *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+REGISTRY = MetricsRegistry()
+
+SPAN_SECONDS = REGISTRY.histogram(
+    "cognitive_span_duration_seconds",
+    "Duration of instrumented operations (agent nodes, tools, LLM and embedding calls)",
+    ("kind", "name", "node"),
+)
+SPAN_TOKENS = REGISTRY.counter(
+    "cognitive_span_tokens_total",
+    "LLM tokens consumed by instrumented operations",
+    ("kind", "name", "node", "type"),
+)
+SPAN_CACHE = REGISTRY.counter(
+    "cognitive_span_cache_total",
+    "Cache lookups made by instrumented operations",
+    ("kind", "name", "result"),
+)
+SPAN_ERRORS = REGISTRY.counter(
+    "cognitive_span_errors_total",
+    "Instrumented operations that raised",
+    ("kind", "name", "node"),
+)
+
+# Agent graph node currently executing, so LLM and tool spans can be attributed to it.
+current_node: ContextVar[str] = ContextVar("current_node", default="")
+
+
+@dataclass(slots=True)
+class Span:
+    kind: str
+    name: str
+    node: str = ""
+    duration: float = 0.0
+    # Free-form attributes; "prompt_tokens", "completion_tokens", "cached_tokens",
+    # "cache_hits" and "cache_misses" are understood by the default collector.
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+
+class SpanCollector(Protocol):
+    def record(self, span: Span) -> None: ...
+
+
+class MetricsCollector:
+    """Default collector: folds spans into the process-wide metrics registry."""
+
+    def record(self, span: Span) -> None:
+        SPAN_SECONDS.observe(span.duration, kind=span.kind, name=span.name, node=span.node)
+        if span.error is not None:
+            SPAN_ERRORS.inc(kind=span.kind, name=span.name, node=span.node)
+        for token_type in ("prompt", "completion", "cached"):
+            tokens = span.attributes.get(f"{token_type}_tokens")
+            if tokens:
+                SPAN_TOKENS.inc(
+                    tokens, kind=span.kind, name=span.name, node=span.node, type=token_type
+                )
+        for result in ("hit", "miss"):
+            lookups = span.attributes.get(f"cache_{result}s")
+            if lookups:
+                SPAN_CACHE.inc(lookups, kind=span.kind, name=span.name, result=result)
+
+
+_collectors: list[SpanCollector] = [MetricsCollector()]
+
+
+def add_span_collector(collector: SpanCollector) -> None:
+    _collectors.append(collector)
+
+
+def remove_span_collector(collector: SpanCollector) -> None:
+    if collector in _collectors:
+        _collectors.remove(collector)
+
+
+@contextmanager
+def span(kind: str, name: str, **attributes: Any) -> Iterator[Span]:
+    """Times the enclosed block and hands the finished span to every collector.
+
+    The yielded span's ``attributes`` may be filled in before the block exits, e.g.
+    with token usage once a response arrives.
+    """
+    current = Span(kind=kind, name=name, node=current_node.get(), attributes=attributes)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - start
+        for collector in _collectors:
+            try:
+                collector.record(current)
+            except Exception as e:
+                logger.warning(f"Span collector {type(collector).__name__} failed: {e}")
+
+
+def timed_node[S](name: str, fn: Callable[[S], Awaitable[S]]) -> Callable[[S], Awaitable[S]]:
+    """Wraps an agent graph node so it is timed and marked as the current node."""
+
+    @wraps(fn)
+    async def wrapper(state: S) -> S:
+        token = current_node.set(name)
+        try:
+            with span("agent_node", name):
+                return await fn(state)
+        finally:
+            current_node.reset(token)
+
+    return wrapper
+
+
+def latency_summary() -> dict[str, list[dict[str, Any]]]:
+    """Per-span latency percentiles plus token and cache counters, for the metrics API."""
+    tokens = [
+        {**dict(zip(SPAN_TOKENS.labelnames, key, strict=True)), "value": int(value)}
+        for key, value in sorted(SPAN_TOKENS.values().items())
+    ]
+    cache = [
+        {**dict(zip(SPAN_CACHE.labelnames, key, strict=True)), "value": int(value)}
+        for key, value in sorted(SPAN_CACHE.values().items())
+    ]
+    return {"spans": SPAN_SECONDS.summary(), "tokens": tokens, "cache": cache}
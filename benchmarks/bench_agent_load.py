@@ -0,0 +1,537 @@
+# Offline load test for the IM -> agent path.
+#
+# Synthetic Discord and Feishu messages go through the real handlers
+# (handle_*_message -> BotMessageService -> CognitiveAgentService). LiteLLM is replaced by
+# a scripted in-process stub, the channels by fake senders, and the database by a
+# throwaway SQLite file, so the run needs no network and no API keys.
+#
+# Run with: uv run python -m benchmarks.bench_agent_load --messages 2000 --concurrency 64
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import tempfile
+import time
+from collections import Counter, defaultdict
+from collections.abc import AsyncIterator, Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from cashews import cache
+from dishka import Provider, Scope, make_async_container, provide
+
+import app.channels.feishu as feishu_channel
+import app.services.llm_service as llm_module
+from app.bot import handle_discord_message, handle_feishu_message
+from app.channels import FeishuIncomingMessage
+from app.config import settings
+from app.container import AppProvider
+from app.core import InstrumentedSQLiteEngine
+from app.enums import PlannerMode
+from app.models import (
+    EmbeddingRecord,
+    KnowledgeItem,
+    Memory,
+    Prompt,
+    PromptTemplate,
+    Reminder,
+    Sessions,
+)
+from app.runtime import get_app_container, set_app_container
+from app.services import SearchHit, SearchProvider, StaticSearchProvider
+from app.services.agent_trace import get_trace_writer
+from app.services.trace_store import get_trace_store
+from app.utils import logger
+from app.utils.metrics import Span, add_span_collector, remove_span_collector
+
+from .support import patched, percentiles_ms
+
+TABLES = (KnowledgeItem, Prompt, PromptTemplate, Memory, EmbeddingRecord, Reminder, Sessions)
+FAILURE_PREFIX = "处理消息失败"
+_USER_INPUT = re.compile(r"^user_input=(.*)$", re.MULTILINE)
+_SCRATCHPAD = re.compile(r"scratchpad:\n(.*)\n请决定下一步。", re.DOTALL)
+
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    name: str
+    text: str
+    # Planner replies in the JSON planner format, one per step. Empty for messages the
+    # fast path handles without the planner.
+    plan: tuple[dict[str, Any], ...] = ()
+
+
+def _act(*calls: tuple[str, dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "done": False,
+        "actions": [{"action": name, "action_input": args} for name, args in calls],
+    }
+
+
+def _answer(response: str) -> dict[str, Any]:
+    return {"done": True, "response": response}
+
+
+SCENARIOS = (
+    Scenario("fast_reminder", "明天早上8点提醒我开周会"),
+    Scenario(
+        "reminder_status",
+        "我现在有哪些提醒？",
+        (_act(("check_reminders_status", {"limit": 8})), _answer("这是你当前的提醒。")),
+    ),
+    Scenario(
+        "write_task",
+        "记一个待办：周五前交周报",
+        (
+            _act(("write_task", {"content": "周五前交周报", "priority": "LATER"})),
+            _answer("已记录待办。"),
+        ),
+    ),
+    Scenario(
+        "write_idea",
+        "有个想法：给检索结果加一层语义缓存",
+        (_act(("write_idea", {"content": "给检索结果加一层语义缓存"})), _answer("已记下。")),
+    ),
+    Scenario(
+        "research",
+        "帮我查一下 FAISS 是什么，顺便看看我之前记过什么",
+        (
+            _act(("web_search", {"query": "FAISS"}), ("search_memory", {"query": "FAISS"})),
+            _answer("FAISS 是 Meta 开源的向量检索库。"),
+        ),
+    ),
+)
+
+SEARCH_RESULTS = {
+    "FAISS": [
+        SearchHit(
+            title="FAISS",
+            snippet="A library for efficient similarity search of dense vectors.",
+            url="https://en.wikipedia.org/wiki/FAISS",
+        )
+    ]
+}
+
+
+def _content(message: dict[str, Any]) -> str:
+    content = message.get("content", "")
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return str(content)
+
+
+def _tokens(text: str) -> int:
+    return max(len(text) // 2, 1)
+
+
+class StubLLM:
+    """Scripted stand-in for LiteLLM's ``acompletion`` and ``aembedding``.
+
+    Planner prompts are answered from the scenario matching their ``user_input`` line,
+    picking the step from how many tool observations the scratchpad already holds. Any
+    other completion (the Feishu reply rewrite) echoes a fixed rewrite of the draft.
+    """
+
+    def __init__(
+        self,
+        scenarios: tuple[Scenario, ...] = SCENARIOS,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        stream_chunks: int = 4,
+        seed: int = 42,
+    ) -> None:
+        self._plans = {scenario.text: scenario.plan for scenario in scenarios}
+        self.latency = latency
+        self.jitter = jitter
+        self.stream_chunks = stream_chunks
+        self._rng = random.Random(seed)
+        self.calls: Counter[str] = Counter()
+
+    async def _wait(self, seconds: float | None = None) -> None:
+        delay = self.latency if seconds is None else seconds
+        if self.jitter:
+            delay += self._rng.uniform(0.0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _plan(self, prompt: str) -> dict[str, Any]:
+        match = _USER_INPUT.search(prompt)
+        steps = self._plans.get(match.group(1).strip() if match else "", ())
+        history = _SCRATCHPAD.search(prompt)
+        entries = history.group(1).strip() if history else ""
+        observed = 0 if entries in ("", "（空）") else len(entries.splitlines())
+        consumed = 0
+        for step in steps:
+            if consumed >= observed:
+                return step
+            consumed += len(step.get("actions", []))
+        return _answer("好的。")
+
+    @staticmethod
+    def _tool_calls(plan: dict[str, Any]) -> list[SimpleNamespace]:
+        if plan.get("done"):
+            calls = [("answer", {"text": plan.get("response", "")})]
+        else:
+            calls = [(call["action"], call["action_input"]) for call in plan["actions"]]
+        return [
+            SimpleNamespace(
+                function=SimpleNamespace(name=name, arguments=json.dumps(args, ensure_ascii=False))
+            )
+            for name, args in calls
+        ]
+
+    async def acompletion(
+        self,
+        *,
+        messages: list[dict[str, Any]],
+        stream: bool = False,
+        tools: list[dict[str, Any]] | None = None,
+        **_kwargs: Any,
+    ) -> Any:
+        prompt = _content(messages[-1])
+        if "user_input=" in prompt:
+            self.calls["planner"] += 1
+            plan = self._plan(prompt)
+            content, tool_calls = ("", self._tool_calls(plan)) if tools else (json.dumps(plan), [])
+        else:
+            self.calls["rewrite"] += 1
+            draft = prompt.partition("事实草稿：")[2].partition("\n")[0]
+            content, tool_calls = f"好的，{draft}", []
+
+        if stream:
+            return self._stream(content)
+        await self._wait()
+        message = SimpleNamespace(content=content, tool_calls=tool_calls)
+        usage = SimpleNamespace(
+            prompt_tokens=sum(_tokens(_content(m)) for m in messages),
+            completion_tokens=_tokens(content),
+            prompt_tokens_details=None,
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    async def _stream(self, content: str) -> AsyncIterator[SimpleNamespace]:
+        size = max(math.ceil(len(content) / self.stream_chunks), 1)
+        for start in range(0, len(content), size):
+            await self._wait(self.latency / self.stream_chunks)
+            delta = SimpleNamespace(content=content[start : start + size])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    async def aembedding(self, *, model: str, input: list[str], **_kwargs: Any) -> Any:
+        self.calls["embedding"] += 1
+        await self._wait()
+        data = []
+        for text in input:
+            rng = random.Random(hashlib.md5(text.encode()).digest())
+            data.append(
+                {"embedding": [rng.uniform(-1.0, 1.0) for _ in range(settings.embedding_dimension)]}
+            )
+        return SimpleNamespace(data=data)
+
+    @contextmanager
+    def installed(self) -> Iterator["StubLLM"]:
+        original = llm_module.acompletion, llm_module.aembedding
+        llm_module.acompletion, llm_module.aembedding = self.acompletion, self.aembedding
+        try:
+            yield self
+        finally:
+            llm_module.acompletion, llm_module.aembedding = original
+
+
+@dataclass(slots=True)
+class ChannelLog:
+    """What the fake senders delivered, keyed by the conversation they replied to."""
+
+    latency: float = 0.0
+    sends: Counter[str] = field(default_factory=Counter)
+    edits: Counter[str] = field(default_factory=Counter)
+    last_text: dict[str, str] = field(default_factory=dict)
+
+    async def deliver(self, target: str, text: str, *, edit: bool = False) -> None:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        (self.edits if edit else self.sends)[target] += 1
+        self.last_text[target] = text
+
+
+class FakeDiscordChannel:
+    def __init__(self, channel_id: int, log: ChannelLog) -> None:
+        self.id = channel_id
+        self._log = log
+
+    async def send(self, content: str) -> SimpleNamespace:
+        target = f"discord:{self.id}"
+        await self._log.deliver(target, content)
+
+        async def edit(content: str) -> None:
+            await self._log.deliver(target, content, edit=True)
+
+        return SimpleNamespace(edit=edit)
+
+
+class FakeFeishuBot:
+    """Implements the slice of FeishuBot the message handler calls."""
+
+    def __init__(self, log: ChannelLog) -> None:
+        self._log = log
+        self._targets: dict[str, str] = {}
+        self._ids = iter(range(1, 1 << 62))
+
+    async def send_text_to_chat(self, chat_id: str, text: str) -> bool:
+        await self._log.deliver(f"feishu:{chat_id}", text)
+        return True
+
+    async def send_text_to_user(self, open_id: str, text: str) -> bool:
+        await self._log.deliver(f"feishu:{open_id}", text)
+        return True
+
+    async def create_text_in_chat(self, chat_id: str, text: str) -> str | None:
+        await self._log.deliver(f"feishu:{chat_id}", text)
+        message_id = f"om_{next(self._ids)}"
+        self._targets[message_id] = f"feishu:{chat_id}"
+        return message_id
+
+    async def create_text_to_user(self, open_id: str, text: str) -> str | None:
+        return await self.create_text_in_chat(open_id, text)
+
+    async def update_text_message(self, message_id: str, text: str) -> bool:
+        await self._log.deliver(self._targets[message_id], text, edit=True)
+        return True
+
+
+class _BenchProvider(Provider):
+    @provide(scope=Scope.APP, override=True)
+    def search_provider(self) -> SearchProvider:
+        return StaticSearchProvider(SEARCH_RESULTS)
+
+
+class _SpanLog:
+    def __init__(self) -> None:
+        self.durations: dict[tuple[str, str, str], list[float]] = defaultdict(list)
+        self.errors: Counter[tuple[str, str, str]] = Counter()
+
+    def record(self, span: Span) -> None:
+        key = (span.kind, span.name, span.node)
+        self.durations[key].append(span.duration)
+        if span.error is not None:
+            self.errors[key] += 1
+
+
+@dataclass(slots=True)
+class LoadConfig:
+    messages: int = 1000
+    concurrency: int = 32
+    users: int = 50
+    llm_latency: float = 0.05
+    llm_jitter: float = 0.02
+    send_latency: float = 0.005
+    planner_mode: PlannerMode = PlannerMode.JSON
+    seed: int = 42
+
+
+@dataclass(slots=True)
+class LoadReport:
+    config: LoadConfig
+    elapsed: float
+    answered: int
+    failed: int
+    latency_ms: dict[str, float]
+    by_scenario: dict[str, dict[str, float]]
+    spans: list[dict[str, Any]]
+    llm_calls: dict[str, int]
+    sends: int
+    edits: int
+
+    @property
+    def throughput(self) -> float:
+        return self.config.messages / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "throughput": round(self.throughput, 2)}
+
+
+@contextmanager
+def _isolated(root: Path, config: LoadConfig) -> Iterator[None]:
+    """Points every on-disk store at ``root`` and swaps in the fake Feishu bot."""
+    with ExitStack() as stack:
+        stack.enter_context(
+            patched(
+                settings,
+                storage_path=root / "storage",
+                agent_trace_index_path=str(root / "storage" / "agent_traces" / "index.db"),
+                vector_index_path=str(root / "vectors" / "index.faiss"),
+                memory_vector_index_path=str(root / "vectors" / "memory.index"),
+                keyword_index_path=str(root / "vectors" / "keyword.db"),
+                note_path=str(root / "logseq"),
+                note_git_enabled=False,
+                agent_enabled=True,
+                agent_planner_mode=config.planner_mode,
+            )
+        )
+        # The trace writer and index are process-wide singletons built from settings.
+        get_trace_writer.cache_clear()
+        get_trace_store.cache_clear()
+        stack.callback(get_trace_store.cache_clear)
+        stack.callback(get_trace_writer.cache_clear)
+        stack.callback(set_app_container, get_app_container())
+        engine = InstrumentedSQLiteEngine(path=str(root / "bench.db"))
+        for table in TABLES:
+            stack.enter_context(patched(table._meta, _db=engine))
+        yield
+
+
+def _messages(config: LoadConfig) -> list[tuple[Scenario, str, str]]:
+    rng = random.Random(config.seed)
+    plan = []
+    for i in range(config.messages):
+        provider = "discord" if i % 2 == 0 else "feishu"
+        plan.append((rng.choice(SCENARIOS), provider, f"user-{i % config.users}"))
+    return plan
+
+
+async def run_load(config: LoadConfig) -> LoadReport:
+    llm = StubLLM(latency=config.llm_latency, jitter=config.llm_jitter, seed=config.seed)
+    channels = ChannelLog(latency=config.send_latency)
+    spans = _SpanLog()
+    latencies: list[float] = []
+    by_scenario: dict[str, list[float]] = defaultdict(list)
+
+    with tempfile.TemporaryDirectory() as tmp, _isolated(Path(tmp), config), llm.installed():
+        for table in TABLES:
+            await table.create_table(if_not_exists=True)
+        container = make_async_container(AppProvider(), _BenchProvider())
+        set_app_container(container)
+        bot = FakeFeishuBot(channels)
+        gate = asyncio.Semaphore(config.concurrency)
+
+        async def send(index: int, scenario: Scenario, provider: str, user_id: str) -> None:
+            async with gate:
+                started = time.perf_counter()
+                if provider == "discord":
+                    author = SimpleNamespace(id=user_id)
+                    channel = FakeDiscordChannel(index, channels)
+                    message = SimpleNamespace(author=author, content=scenario.text, channel=channel)
+                    await handle_discord_message(message)
+                else:
+                    await handle_feishu_message(
+                        FeishuIncomingMessage(
+                            message_id=f"in_{index}",
+                            user_open_id=user_id,
+                            chat_id=str(index),
+                            chat_type="p2p",
+                            text=scenario.text,
+                        )
+                    )
+                elapsed = time.perf_counter() - started
+                latencies.append(elapsed)
+                by_scenario[scenario.name].append(elapsed)
+
+        add_span_collector(spans)
+        try:
+            with patched(feishu_channel, _bot_instance=bot):
+                started = time.perf_counter()
+                await asyncio.gather(
+                    *(send(i, *message) for i, message in enumerate(_messages(config)))
+                )
+                elapsed = time.perf_counter() - started
+        finally:
+            remove_span_collector(spans)
+            await get_trace_writer().close()
+            get_trace_store().close()
+            await container.close()
+
+    replies = channels.last_text
+    return LoadReport(
+        config=config,
+        elapsed=round(elapsed, 3),
+        answered=sum(1 for text in replies.values() if not text.startswith(FAILURE_PREFIX)),
+        failed=sum(1 for text in replies.values() if text.startswith(FAILURE_PREFIX)),
+        latency_ms=percentiles_ms(latencies),
+        by_scenario={
+            name: percentiles_ms(samples) for name, samples in sorted(by_scenario.items())
+        },
+        spans=[
+            {
+                "kind": kind,
+                "name": name,
+                "node": node,
+                "count": len(samples),
+                "errors": spans.errors[(kind, name, node)],
+                **percentiles_ms(samples),
+            }
+            for (kind, name, node), samples in sorted(spans.durations.items())
+        ],
+        llm_calls=dict(llm.calls),
+        sends=sum(channels.sends.values()),
+        edits=sum(channels.edits.values()),
+    )
+
+
+def _print_report(report: LoadReport) -> None:
+    print(
+        f"{report.config.messages} messages, concurrency {report.config.concurrency}: "
+        f"{report.elapsed:.2f}s, {report.throughput:.1f} msg/s, "
+        f"{report.answered} answered, {report.failed} failed"
+    )
+    latency = report.latency_ms
+    print(
+        f"end-to-end ms: p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  "
+        f"p99 {latency['p99']:.1f}  max {latency['max']:.1f}"
+    )
+    print(f"\n{'scenario':<18} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9}")
+    for name, row in report.by_scenario.items():
+        print(f"{name:<18} {row['p50']:>9.1f} {row['p95']:>9.1f} {row['p99']:>9.1f}")
+    print(f"\n{'kind':<12} {'name':<32} {'node':<6} {'count':>7} {'p50_ms':>9} {'p95_ms':>9}")
+    for row in report.spans:
+        print(
+            f"{row['kind']:<12} {row['name'][:32]:<32} {row['node']:<6} {row['count']:>7} "
+            f"{row['p50']:>9.1f} {row['p95']:>9.1f}"
+        )
+
+
+def main() -> None:
+    defaults = LoadConfig()
+    parser = argparse.ArgumentParser(description="Offline load test for the IM -> agent path.")
+    parser.add_argument("--messages", type=int, default=defaults.messages)
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--llm-latency", type=float, default=defaults.llm_latency)
+    parser.add_argument("--llm-jitter", type=float, default=defaults.llm_jitter)
+    parser.add_argument("--send-latency", type=float, default=defaults.send_latency)
+    parser.add_argument(
+        "--planner-mode",
+        type=PlannerMode,
+        choices=[PlannerMode.JSON, PlannerMode.TOOLS],
+        default=defaults.planner_mode,
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--json", type=Path, help="also write the report to this file")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    cache.setup("mem://")
+    config = LoadConfig(
+        messages=args.messages,
+        concurrency=args.concurrency,
+        users=args.users,
+        llm_latency=args.llm_latency,
+        llm_jitter=args.llm_jitter,
+        send_latency=args.send_latency,
+        planner_mode=args.planner_mode,
+        seed=args.seed,
+    )
+    report = asyncio.run(run_load(config))
+    _print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
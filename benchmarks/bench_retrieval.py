@@ -0,0 +1,449 @@
+# Vector search and retrieval benchmarks on synthetic corpora.
+#
+# For each corpus size this measures VectorStore and MemoryFAISSStore add / save / load /
+# search time, recall@k against exact numpy search and memory footprint, then times
+# MemoryRetriever.search and RetrievalService.rag_query (the /rag path) end to end with a
+# stub embedder and LLM. Results are written as JSON named after the current commit so
+# runs can be compared across commits.
+#
+# Run with: uv run python -m benchmarks.bench_retrieval --sizes 10000 100000 1000000
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import faiss
+import numpy as np
+from cashews import cache
+
+from app.config import settings
+from app.services import MemoryRetriever, RetrievalService, SemanticAnswerCache, VectorStore
+from app.services.memory import MemoryEmbedder, MemoryFAISSStore, MemoryOrchestrator
+from app.services.prompt_template_service import DEFAULT_PROMPT_TEMPLATES, PromptTemplateService
+from app.utils import logger
+
+from .support import git_commit, patched, percentiles_ms
+
+SIZES = (10_000, 100_000, 1_000_000)
+RESULTS_DIR = Path(__file__).parent / "results"
+# Vectors are added in chunks so the float64 -> float32 copies stay small at 1M.
+ADD_CHUNK = 50_000
+EXACT_CHUNK = 100_000
+# VectorStore.add and MemoryFAISSStore.add rewrite the id map on every call, so single
+# adds are timed on a sample after the corpus is loaded rather than used to build it.
+SINGLE_ADDS = 20
+MEMORY_USERS = 20
+
+
+@dataclass(slots=True)
+class BenchConfig:
+    sizes: tuple[int, ...] = SIZES
+    dimension: int = 384
+    queries: int = 200
+    top_k: int = 10
+    rag_queries: int = 100
+    seed: int = 42
+
+
+@dataclass(slots=True)
+class StoreResult:
+    add_s: float
+    single_add_ms: float
+    save_s: float
+    load_s: float
+    search_ms: dict[str, float]
+    recall_at_k: float
+    index_bytes: int
+    disk_bytes: int
+
+
+@dataclass(slots=True)
+class SizeResult:
+    size: int
+    vector_store: StoreResult
+    memory_store: StoreResult
+    memory_retriever_ms: dict[str, float]
+    rag_ms: dict[str, float]
+    rag_stages_ms: dict[str, float]
+    peak_rss_mb: float
+
+
+@dataclass(slots=True)
+class BenchReport:
+    commit: str
+    created_at: str
+    machine: dict[str, Any]
+    config: BenchConfig
+    results: list[SizeResult] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1 << 20 if platform.system() == "Darwin" else 1 << 10), 1)
+
+
+def _disk_bytes(index_path: Path) -> int:
+    return sum(
+        path.stat().st_size
+        for path in index_path.parent.glob(f"{index_path.stem}.*")
+        if path.is_file()
+    )
+
+
+def _exact_top_k(corpus: np.ndarray, queries: np.ndarray, top_k: int, metric: str) -> np.ndarray:
+    """Exact neighbours by brute force, scanning the corpus in chunks."""
+    best_scores = np.full((len(queries), 0), 0.0, dtype=np.float32)
+    best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+    query_norms = (queries**2).sum(axis=1, keepdims=True)
+    for start in range(0, len(corpus), EXACT_CHUNK):
+        chunk = corpus[start : start + EXACT_CHUNK]
+        scores = queries @ chunk.T
+        if metric == "l2":
+            # Negated squared distance so that larger is better for both metrics.
+            scores = 2 * scores - query_norms - (chunk**2).sum(axis=1)
+        ids = np.broadcast_to(np.arange(start, start + len(chunk)), scores.shape)
+        scores = np.concatenate([best_scores, scores], axis=1)
+        ids = np.concatenate([best_ids, ids], axis=1)
+        keep = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+        best_ids = np.take_along_axis(ids, keep, axis=1)
+    return best_ids
+
+
+def _recall(found: list[list[int]], exact: np.ndarray) -> float:
+    hits = sum(len(set(row) & set(truth.tolist())) for row, truth in zip(found, exact, strict=True))
+    return round(hits / exact.size, 4)
+
+
+def _chunks(corpus: np.ndarray):
+    for start in range(0, len(corpus), ADD_CHUNK):
+        yield start, corpus[start : start + ADD_CHUNK]
+
+
+def _bench_vector_store(
+    corpus: np.ndarray, queries: np.ndarray, extra: np.ndarray, config: BenchConfig
+) -> StoreResult:
+    store = VectorStore()
+    started = time.perf_counter()
+    for start, chunk in _chunks(corpus):
+        # Item ids start at 1: VectorStore drops id 0 from search results.
+        items = [SimpleNamespace(id=start + i + 1) for i in range(len(chunk))]
+        store.add_batch(items, list(chunk))  # type: ignore[arg-type]
+    add_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i, vector in enumerate(extra, start=len(corpus) + 1):
+        store.add(SimpleNamespace(id=i), vector.tolist())  # type: ignore[arg-type]
+    single_add_ms = (time.perf_counter() - started) / len(extra) * 1000
+    store.index.remove_ids(np.arange(len(corpus), store.index.ntotal, dtype=np.int64))
+
+    started = time.perf_counter()
+    store.save()
+    save_s = time.perf_counter() - started
+    started = time.perf_counter()
+    store = VectorStore()
+    load_s = time.perf_counter() - started
+
+    durations: list[float] = []
+    found: list[list[int]] = []
+    for query in queries:
+        vector = query.tolist()
+        started = time.perf_counter()
+        rows = store.search(vector, top_k=config.top_k)
+        durations.append(time.perf_counter() - started)
+        found.append([int(row["item_id"]) - 1 for row in rows])
+
+    return StoreResult(
+        add_s=round(add_s, 3),
+        single_add_ms=round(single_add_ms, 3),
+        save_s=round(save_s, 3),
+        load_s=round(load_s, 3),
+        search_ms=percentiles_ms(durations),
+        recall_at_k=_recall(found, _exact_top_k(corpus, queries, config.top_k, "l2")),
+        index_bytes=store.index.ntotal * store.dimension * 4,
+        disk_bytes=_disk_bytes(store.index_path),
+    )
+
+
+def _bench_memory_store(
+    corpus: np.ndarray, queries: np.ndarray, extra: np.ndarray, config: BenchConfig
+) -> tuple[StoreResult, MemoryFAISSStore]:
+    store = MemoryFAISSStore()
+    started = time.perf_counter()
+    # No batch add exists, so the corpus goes straight into the index the way add()
+    # would put it there: L2-normalised, memory id = vector id + 1.
+    for start, chunk in _chunks(corpus):
+        vectors = np.array(chunk, dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        store.index.add(vectors)
+        store.id_map.update((start + i, start + i + 1) for i in range(len(chunk)))
+    store._save_id_map()
+    add_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i, vector in enumerate(extra, start=len(corpus) + 1):
+        store.add(i, vector.tolist())
+    single_add_ms = (time.perf_counter() - started) / len(extra) * 1000
+    store.index.remove_ids(np.arange(len(corpus), store.index.ntotal, dtype=np.int64))
+
+    started = time.perf_counter()
+    store.save()
+    save_s = time.perf_counter() - started
+    started = time.perf_counter()
+    store = MemoryFAISSStore()
+    load_s = time.perf_counter() - started
+
+    durations: list[float] = []
+    found: list[list[int]] = []
+    for query in queries:
+        vector = query.tolist()
+        started = time.perf_counter()
+        rows = store.search(vector, top_k=config.top_k)
+        durations.append(time.perf_counter() - started)
+        found.append([int(row["memory_id"]) - 1 for row in rows])
+
+    normalized = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    result = StoreResult(
+        add_s=round(add_s, 3),
+        single_add_ms=round(single_add_ms, 3),
+        save_s=round(save_s, 3),
+        load_s=round(load_s, 3),
+        search_ms=percentiles_ms(durations),
+        recall_at_k=_recall(found, _exact_top_k(normalized, queries, config.top_k, "ip")),
+        index_bytes=store.index.ntotal * store.dimension * 4,
+        disk_bytes=_disk_bytes(store.index_path),
+    )
+    return result, store
+
+
+class _SyntheticRows:
+    """Stands in for the memory and knowledge repositories; rows are derived from ids."""
+
+    def __init__(self) -> None:
+        self._now = datetime.now(UTC)
+
+    def memory(self, memory_id: int) -> SimpleNamespace:
+        return SimpleNamespace(
+            id=memory_id,
+            user_id=f"user-{memory_id % MEMORY_USERS}",
+            importance=1 + memory_id % 5,
+            updated_at=self._now - timedelta(days=memory_id % 365),
+            memory_type="fact",
+            summary=None,
+            content=f"synthetic memory {memory_id}",
+        )
+
+    async def get_memories(self, ids: list[int]) -> list[SimpleNamespace]:
+        return [self.memory(memory_id) for memory_id in ids]
+
+    async def get_items(self, ids: list[int]) -> list[SimpleNamespace]:
+        return [
+            SimpleNamespace(
+                id=item_id,
+                uuid=f"item-{item_id}",
+                raw_text=f"synthetic knowledge {item_id}",
+                structured_text=None,
+            )
+            for item_id in ids
+        ]
+
+
+class _StubLLM:
+    """Embeds the benchmark queries to their precomputed vectors and answers instantly."""
+
+    def __init__(self, vectors: dict[str, list[float]]) -> None:
+        self._vectors = vectors
+
+    async def get_embedding(self, text: str) -> list[float]:
+        return self._vectors[text]
+
+    async def chat_with_system(self, *_args: Any, **_kwargs: Any) -> str:
+        return "synthetic answer"
+
+
+async def _noop_write(**_kwargs: Any) -> None:
+    return None
+
+
+async def _active_template(name: str) -> SimpleNamespace:
+    return SimpleNamespace(**DEFAULT_PROMPT_TEMPLATES[name])
+
+
+async def _bench_retrieval(
+    memory_store: MemoryFAISSStore, queries: np.ndarray, config: BenchConfig
+) -> tuple[dict[str, float], dict[str, float], dict[str, float]]:
+    rows = _SyntheticRows()
+    retriever = MemoryRetriever(memory_store, SimpleNamespace(get_by_ids=rows.get_memories))  # type: ignore[arg-type]
+
+    durations: list[float] = []
+    for i, query in enumerate(queries):
+        vector = query.tolist()
+        started = time.perf_counter()
+        await retriever.search(f"user-{i % MEMORY_USERS}", vector, top_k=config.top_k)
+        durations.append(time.perf_counter() - started)
+
+    rag_queries = queries[: config.rag_queries]
+    llm = _StubLLM({f"query-{i}": query.tolist() for i, query in enumerate(rag_queries)})
+    service = RetrievalService(
+        llm,  # type: ignore[arg-type]
+        embedding_service=None,  # type: ignore[arg-type]
+        knowledge_service=SimpleNamespace(get_by_ids=rows.get_items),  # type: ignore[arg-type]
+        vector_store=VectorStore(),
+        prompt_service=None,  # type: ignore[arg-type]
+        memory_orchestrator=MemoryOrchestrator(
+            MemoryEmbedder(llm),  # type: ignore[arg-type]
+            retriever,
+            SimpleNamespace(write=_noop_write),  # type: ignore[arg-type]
+            PromptTemplateService(SimpleNamespace(get_active_by_name=_active_template)),  # type: ignore[arg-type]
+        ),
+        keyword_index=None,  # type: ignore[arg-type]
+        answer_cache=SemanticAnswerCache(),
+    )
+    rag_durations: list[float] = []
+    stages: dict[str, list[float]] = {}
+    for i in range(len(rag_queries)):
+        started = time.perf_counter()
+        result = await service.rag_query(
+            f"query-{i}", top_k=config.top_k, user_id=f"user-{i % MEMORY_USERS}"
+        )
+        rag_durations.append(time.perf_counter() - started)
+        for stage, ms in result.timings.items():
+            stages.setdefault(stage, []).append(ms)
+    stage_p50 = {stage: round(float(np.median(values)), 3) for stage, values in stages.items()}
+    return percentiles_ms(durations), percentiles_ms(rag_durations), stage_p50
+
+
+async def _bench_size(size: int, root: Path, config: BenchConfig) -> SizeResult:
+    rng = np.random.default_rng(config.seed)
+    corpus = rng.standard_normal((size, config.dimension), dtype=np.float32)
+    # Queries sit near corpus points so the neighbourhoods are not arbitrary.
+    anchors = rng.integers(0, size, config.queries)
+    queries = corpus[anchors] + 0.1 * rng.standard_normal(
+        (config.queries, config.dimension), dtype=np.float32
+    )
+    extra = rng.standard_normal((SINGLE_ADDS, config.dimension), dtype=np.float32)
+
+    directory = root / str(size)
+    with patched(
+        settings,
+        vector_index_path=str(directory / "index.faiss"),
+        memory_vector_index_path=str(directory / "memory.index"),
+    ):
+        vector_result = _bench_vector_store(corpus, queries, extra, config)
+        memory_result, memory_store = _bench_memory_store(corpus, queries, extra, config)
+        del corpus
+        retriever_ms, rag_ms, rag_stages = await _bench_retrieval(memory_store, queries, config)
+
+    return SizeResult(
+        size=size,
+        vector_store=vector_result,
+        memory_store=memory_result,
+        memory_retriever_ms=retriever_ms,
+        rag_ms=rag_ms,
+        rag_stages_ms=rag_stages,
+        peak_rss_mb=_peak_rss_mb(),
+    )
+
+
+async def run_benchmarks(config: BenchConfig) -> BenchReport:
+    report = BenchReport(
+        commit=git_commit(),
+        created_at=datetime.now(UTC).isoformat(),
+        machine={
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "faiss": faiss.__version__,
+            "faiss_threads": faiss.omp_get_max_threads(),
+            "numpy": np.__version__,
+        },
+        config=config,
+    )
+    with (
+        tempfile.TemporaryDirectory() as tmp,
+        patched(settings, embedding_dimension=config.dimension, rag_context_cache_ttl=0),
+    ):
+        for size in config.sizes:
+            report.results.append(await _bench_size(size, Path(tmp), config))
+    return report
+
+
+def _print_store(name: str, result: StoreResult) -> None:
+    print(
+        f"  {name:<14} add {result.add_s:>8.2f}s  add1 {result.single_add_ms:>8.2f}ms  "
+        f"save {result.save_s:>6.2f}s  load {result.load_s:>6.2f}s  "
+        f"search p50 {result.search_ms['p50']:>7.2f}ms p99 {result.search_ms['p99']:>7.2f}ms  "
+        f"recall@k {result.recall_at_k:.3f}  index {result.index_bytes / 2**20:>7.1f}MiB  "
+        f"disk {result.disk_bytes / 2**20:>7.1f}MiB"
+    )
+
+
+def _print_report(report: BenchReport) -> None:
+    config = report.config
+    print(
+        f"commit {report.commit}, dim {config.dimension}, top_k {config.top_k}, "
+        f"{config.queries} queries, faiss threads {report.machine['faiss_threads']}"
+    )
+    for result in report.results:
+        print(f"\n{result.size} vectors (peak RSS {result.peak_rss_mb:.0f} MiB)")
+        _print_store("VectorStore", result.vector_store)
+        _print_store("MemoryFAISS", result.memory_store)
+        retriever = result.memory_retriever_ms
+        rag = result.rag_ms
+        print(
+            f"  {'MemoryRetriever':<14} p50 {retriever['p50']:>7.2f}ms  p99 {retriever['p99']:>7.2f}ms"
+        )
+        stages = "  ".join(f"{stage} {ms:.2f}" for stage, ms in result.rag_stages_ms.items())
+        print(f"  {'rag_query':<14} p50 {rag['p50']:>7.2f}ms  p99 {rag['p99']:>7.2f}ms  ({stages})")
+
+
+def main() -> None:
+    defaults = BenchConfig()
+    parser = argparse.ArgumentParser(description="Vector search and retrieval benchmarks.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(defaults.sizes))
+    parser.add_argument("--dimension", type=int, default=defaults.dimension)
+    parser.add_argument("--queries", type=int, default=defaults.queries)
+    parser.add_argument("--top-k", type=int, default=defaults.top_k)
+    parser.add_argument("--rag-queries", type=int, default=defaults.rag_queries)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument(
+        "--output", type=Path, help=f"JSON result path (default: {RESULTS_DIR}/<commit>.json)"
+    )
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    cache.setup("mem://")
+    config = BenchConfig(
+        sizes=tuple(args.sizes),
+        dimension=args.dimension,
+        queries=args.queries,
+        top_k=args.top_k,
+        rag_queries=min(args.rag_queries, args.queries),
+        seed=args.seed,
+    )
+    report = asyncio.run(run_benchmarks(config))
+    _print_report(report)
+
+    output = args.output or RESULTS_DIR / f"retrieval-{report.commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report.to_dict(), indent=2))
+    print(f"\nwrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from piccolo.conf.apps import AppConfig, AppRegistry
-from piccolo.engine.sqlite import SQLiteEngine
 
+from app.core import InstrumentedSQLiteEngine
 from app.models import (
     EmbeddingRecord,
     KnowledgeItem,
@@ -11,7 +11,7 @@ from app.models import (
     Sessions,
 )
 
-DB = SQLiteEngine(path="cognitive.db")
+DB = InstrumentedSQLiteEngine(path="cognitive.db")
 
 APP_CONFIG = AppConfig(
     app_name="cognitive",
@@ -0,0 +1,52 @@
+import pytest
+from cashews import cache
+
+from app.agents import ToolResult
+from app.services.cognitive_agent_service import CognitiveAgentService
+
+
+@pytest.mark.parametrize(
+    ("text", "action"),
+    [
+        ("明天下午3点提醒我开会", "create_reminder"),
+        ("每天晚上8点提醒我吃药", "create_reminder"),
+        ("延迟15分钟", "delay_latest_reminder"),
+        ("顺延2小时提醒我", "delay_latest_reminder"),
+        ("跳过明天的提醒", "skip_next_reminder"),
+        ("暂停提醒到明天早上", "pause_latest_reminder_until"),
+        ("改成工作日提醒", "update_latest_reminder_recurrence"),
+        ("工作日有哪些提醒？", "list_workday_reminders"),
+        ("明天下午3点提醒我开会，然后记一下会议纪要", None),
+        ("5分钟后提醒我，提前2分钟通知", None),
+        ("每天提醒吗？", None),
+        ("今天读完了一本书", None),
+    ],
+)
+def test_fast_route_matches_only_unambiguous_commands(text, action):
+    route = CognitiveAgentService._fast_route(text)
+    assert (route["action"] if route else None) == action
+
+
+class _NoPlannerLLM:
+    async def complete(self, *_args, **_kwargs):
+        raise AssertionError("planner must not be called for a fast-path match")
+
+
+async def test_fast_path_bypasses_planner(monkeypatch):
+    cache.setup("mem://")
+    monkeypatch.setattr("app.services.cognitive_agent_service.settings.agent_trace_enabled", False)
+    service = CognitiveAgentService(llm_service=_NoPlannerLLM())  # type: ignore[arg-type]
+    calls: list[str] = []
+
+    async def skip(_ctx, _payload) -> ToolResult:
+        calls.append("skip")
+        return ToolResult(status="ok", observation="reminder_skipped:#3 喝水@2026-01-02T09:00:00")
+
+    tool = service._tool_registry.get("skip_next_reminder")
+    assert tool is not None
+    tool.handler = skip
+
+    outcome = await service.run("u1", "discord", "跳过下次提醒")
+    assert calls == ["skip"]
+    assert outcome.templated
+    assert outcome.response.startswith("已跳过下一次提醒")
@@ -0,0 +1,17 @@
+from cashews import cache
+
+from benchmarks.bench_agent_load import SCENARIOS, LoadConfig, run_load
+
+
+async def test_load_harness_answers_every_message_offline():
+    cache.setup("mem://")
+    report = await run_load(
+        LoadConfig(messages=20, concurrency=8, users=4, llm_latency=0.0, llm_jitter=0.0)
+    )
+
+    assert (report.answered, report.failed) == (20, 0)
+    assert report.latency_ms["p50"] > 0
+    assert set(report.by_scenario) <= {scenario.name for scenario in SCENARIOS}
+    nodes = {row["name"] for row in report.spans if row["kind"] == "agent_node"}
+    assert {"route", "plan", "act", "judge"} <= nodes
+    assert report.llm_calls["planner"] > 0
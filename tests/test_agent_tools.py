@@ -0,0 +1,386 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from cashews import cache
+
+from app.agents import AgentTool, ToolCachePolicy, ToolContext, ToolRegistry, ToolResult
+from app.enums import PlannerMode
+from app.services.cognitive_agent_service import CognitiveAgentService
+from app.services.index_generation import KNOWLEDGE_GENERATION_KEY, bump_knowledge_generation
+from app.services.llm_service import ChatCompletion
+
+
+async def test_registry_times_out_slow_tools():
+    async def slow(_ctx, _args) -> ToolResult:
+        await asyncio.sleep(1)
+        return ToolResult(status="ok", observation="late")
+
+    registry = ToolRegistry(default_timeout=0.01)
+    registry.register(AgentTool("slow", "", "slow()", {}, slow))
+    ctx = ToolContext(run_id="r", user_id="u", provider="discord", text="", channel_id=None)
+
+    result = await registry.execute("slow", ctx, {})
+    assert result.observation == "tool_timeout"
+
+
+async def test_run_deadline_caps_tool_timeout_and_semaphores_bound_concurrency():
+    running = 0
+    peak = 0
+
+    async def write(_ctx, _args) -> ToolResult:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return ToolResult(status="ok", observation="note_written")
+
+    async def hang(_ctx, _args) -> ToolResult:
+        await asyncio.sleep(10)
+        return ToolResult(status="ok", observation="late")
+
+    registry = ToolRegistry(default_timeout=30)
+    for name in ("write_note", "write_idea"):
+        registry.register(
+            AgentTool(name, "", "", {}, write, concurrency=1, concurrency_group="note_git")
+        )
+    registry.register(AgentTool("hang", "", "", {}, hang))
+    ctx = ToolContext(
+        run_id="r",
+        user_id="u",
+        provider="discord",
+        text="",
+        channel_id=None,
+        deadline=time.monotonic() + 0.2,
+    )
+
+    await asyncio.gather(
+        *(registry.execute(name, ctx, {}) for name in ("write_note", "write_idea") * 3)
+    )
+    assert peak == 1
+
+    # The 30s tool timeout is cut down to what is left of the run.
+    started = time.monotonic()
+    result = await registry.execute("hang", ctx, {})
+    assert result.observation == "run_deadline_exceeded"
+    assert time.monotonic() - started < 1
+    assert (await registry.execute("write_note", ctx, {})).observation == "run_deadline_exceeded"
+
+
+async def test_non_cancellable_tools_finish_and_hold_their_slot():
+    running = 0
+    peak = 0
+    finished: list[str] = []
+
+    async def write(_ctx, args) -> ToolResult:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.1)
+        running -= 1
+        finished.append(args["id"])
+        return ToolResult(status="ok", observation="note_written")
+
+    registry = ToolRegistry(default_timeout=0.05)
+    registry.register(AgentTool("write_note", "", "", {}, write, concurrency=1, cancellable=False))
+    ctx = ToolContext(run_id="r", user_id="u", provider="discord", text="", channel_id=None)
+
+    # Runs past the 50ms timeout instead of being cut off after the note is written.
+    assert (await registry.execute("write_note", ctx, {"id": "a"})).status == "ok"
+
+    # A cancelled caller does not free the slot while its write is still running, and
+    # a queued caller only times out waiting for that slot.
+    first = asyncio.create_task(registry.execute("write_note", ctx, {"id": "b"}))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    queued = await registry.execute("write_note", ctx, {"id": "c"})
+    assert queued.observation == "tool_timeout"
+    await asyncio.sleep(0.15)
+    assert finished == ["a", "b"]
+    assert peak == 1
+
+
+async def test_registry_caches_read_tools_until_a_write_invalidates():
+    cache.setup("mem://")
+    calls: list[dict] = []
+
+    async def list_reminders(_ctx, args) -> ToolResult:
+        calls.append(args)
+        return ToolResult(status="ok", observation=f"reminders:{len(calls)}")
+
+    async def create_reminder(_ctx, _args) -> ToolResult:
+        return ToolResult(status="ok", observation="reminder_created")
+
+    tag = "reminders:{provider}:{user_id}"
+    registry = ToolRegistry()
+    registry.register(
+        AgentTool(
+            "list_reminders",
+            "",
+            "list_reminders(limit)",
+            {},
+            list_reminders,
+            cache=ToolCachePolicy(ttl=60, key_fields=("limit",), tags=(tag,)),
+        )
+    )
+    registry.register(AgentTool("create_reminder", "", "", {}, create_reminder, invalidates=(tag,)))
+    alice = ToolContext(run_id="r1", user_id="alice", provider="discord", text="", channel_id=None)
+    bob = ToolContext(run_id="r2", user_id="bob", provider="discord", text="", channel_id=None)
+
+    first = await registry.execute("list_reminders", alice, {"limit": 5})
+    # Fields outside key_fields do not split the cache.
+    again = await registry.execute("list_reminders", alice, {"limit": 5, "note": "x"})
+    assert (first.observation, again.observation) == ("reminders:1", "reminders:1")
+
+    await registry.execute("list_reminders", bob, {"limit": 5})
+    assert len(calls) == 2
+
+    await registry.execute("create_reminder", alice, {"text": "喝水"})
+    after_write = await registry.execute("list_reminders", alice, {"limit": 5})
+    assert after_write.observation == "reminders:3"
+    # Bob's entry is tagged with his own user id and survives Alice's write.
+    assert (await registry.execute("list_reminders", bob, {"limit": 5})).observation == (
+        "reminders:2"
+    )
+
+
+async def test_registry_cache_follows_external_generation_keys():
+    cache.setup("mem://")
+    calls = 0
+
+    async def search_memory(_ctx, _args) -> ToolResult:
+        nonlocal calls
+        calls += 1
+        return ToolResult(status="ok", observation=f"hits:{calls}")
+
+    registry = ToolRegistry()
+    registry.register(
+        AgentTool(
+            "search_memory",
+            "",
+            "search_memory(query)",
+            {},
+            search_memory,
+            cache=ToolCachePolicy(ttl=60, generation_keys=(KNOWLEDGE_GENERATION_KEY,)),
+        )
+    )
+    ctx = ToolContext(run_id="r1", user_id="alice", provider="discord", text="", channel_id=None)
+
+    assert (await registry.execute("search_memory", ctx, {"query": "周报"})).observation == "hits:1"
+    assert (await registry.execute("search_memory", ctx, {"query": "周报"})).observation == "hits:1"
+    # The indexer bumps the knowledge generation outside the registry.
+    await bump_knowledge_generation()
+    assert (await registry.execute("search_memory", ctx, {"query": "周报"})).observation == "hits:2"
+
+
+class _PlannerLLM:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def complete(self, *_args, **_kwargs) -> ChatCompletion:
+        self.calls += 1
+        if self.calls == 1:
+            content = json.dumps(
+                {
+                    "done": False,
+                    "actions": [
+                        {"action": "search_memory", "action_input": {"query": "周报"}},
+                        {"action": "web_search", "action_input": {"query": "周报"}},
+                        {"action": "web_search", "action_input": {"query": "周报"}},
+                    ],
+                }
+            )
+        else:
+            content = json.dumps({"done": True, "response": "整理好了"})
+        return ChatCompletion(content=content, prompt_tokens=100, completion_tokens=20)
+
+
+async def test_planner_actions_run_concurrently_in_one_step(monkeypatch):
+    cache.setup("mem://")
+    monkeypatch.setattr("app.services.cognitive_agent_service.settings.agent_trace_enabled", False)
+    llm = _PlannerLLM()
+    service = CognitiveAgentService(llm_service=llm)  # type: ignore[arg-type]
+    started: list[str] = []
+    both_started = asyncio.Event()
+
+    def handler(name: str):
+        async def run(_ctx, _args) -> ToolResult:
+            started.append(name)
+            if len(started) == 2:
+                both_started.set()
+            # Deadlocks (and times out) unless the other tool is running at the same time.
+            await asyncio.wait_for(both_started.wait(), timeout=1)
+            return ToolResult(status="ok", observation=f"{name}_result")
+
+        return run
+
+    for name in ("search_memory", "web_search"):
+        tool = service._tool_registry.get(name)
+        assert tool is not None
+        tool.handler = handler(name)
+
+    outcome = await service.run("u1", "discord", "帮我整理下周报思路")
+    assert sorted(started) == ["search_memory", "web_search"]
+    assert llm.calls == 2
+    assert outcome.response == "整理好了"
+
+
+async def test_planner_prefix_is_stable_and_scratchpad_is_clipped(monkeypatch):
+    cache.setup("mem://")
+    monkeypatch.setattr("app.services.cognitive_agent_service.settings.agent_trace_enabled", False)
+    monkeypatch.setattr(
+        "app.services.cognitive_agent_service.settings.agent_scratchpad_step_tokens", 40
+    )
+    llm = _PlannerLLM()
+    prompts: list[list[dict]] = []
+    complete = llm.complete
+
+    async def recording_complete(messages, *args, **kwargs) -> ChatCompletion:
+        prompts.append(messages)
+        return await complete(messages, *args, **kwargs)
+
+    llm.complete = recording_complete  # type: ignore[method-assign]
+    service = CognitiveAgentService(llm_service=llm)  # type: ignore[arg-type]
+
+    async def long_result(_ctx, _args) -> ToolResult:
+        return ToolResult(status="ok", observation="很长的检索结果" * 200)
+
+    for name in ("search_memory", "web_search"):
+        tool = service._tool_registry.get(name)
+        assert tool is not None
+        tool.handler = long_result
+
+    await service.run("u1", "discord", "帮我整理下周报思路")
+    assert len(prompts) == 2
+    assert prompts[0][0] == prompts[1][0]
+    assert prompts[0][0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert len(prompts[1][1]["content"]) < len(prompts[0][1]["content"]) + 400
+
+
+async def test_function_calling_planner_dispatches_tool_calls(monkeypatch):
+    cache.setup("mem://")
+    monkeypatch.setattr("app.services.cognitive_agent_service.settings.agent_trace_enabled", False)
+    monkeypatch.setattr(
+        "app.services.cognitive_agent_service.settings.agent_planner_mode", PlannerMode.TOOLS
+    )
+    requests: list[dict] = []
+
+    class _ToolCallingLLM:
+        async def complete(self, _messages, **kwargs) -> ChatCompletion:
+            requests.append(kwargs)
+            return ChatCompletion(
+                content="",
+                tool_calls=[{"name": "write_note", "arguments": {"content": "买牛奶"}}],
+            )
+
+    service = CognitiveAgentService(llm_service=_ToolCallingLLM())  # type: ignore[arg-type]
+    notes: list[dict] = []
+
+    async def write_note(_ctx, args) -> ToolResult:
+        notes.append(args)
+        return ToolResult(status="ok", observation="note_written")
+
+    tool = service._tool_registry.get("write_note")
+    assert tool is not None
+    tool.handler = write_note
+
+    outcome = await service.run("u1", "discord", "记一下：买牛奶")
+    assert notes == [{"content": "买牛奶"}]
+    assert outcome.response == "已记录。"
+    assert requests[0]["tool_choice"] == "required"
+    names = {spec["function"]["name"] for spec in requests[0]["tools"]}
+    assert {"write_note", "answer"} <= names
+
+
+class _HangingLLM:
+    async def complete(self, *_args, **_kwargs) -> ChatCompletion:
+        await asyncio.sleep(10)
+        raise AssertionError("planner call should have been cancelled")
+
+
+async def test_run_returns_at_the_deadline_when_the_planner_hangs(monkeypatch):
+    cache.setup("mem://")
+    monkeypatch.setattr("app.services.cognitive_agent_service.settings.agent_trace_enabled", False)
+    monkeypatch.setattr("app.services.cognitive_agent_service.settings.agent_run_timeout", 0.2)
+    service = CognitiveAgentService(llm_service=_HangingLLM())  # type: ignore[arg-type]
+
+    started = time.monotonic()
+    outcome = await service.run("u1", "discord", "帮我整理下周报思路")
+    assert time.monotonic() - started < 1
+    assert outcome.response
+
+
+async def test_run_deadline_keeps_the_reminder_a_tool_already_created(monkeypatch):
+    cache.setup("mem://")
+    monkeypatch.setattr("app.services.cognitive_agent_service.settings.agent_trace_enabled", False)
+    monkeypatch.setattr("app.services.cognitive_agent_service.settings.agent_run_timeout", 0.2)
+    monkeypatch.setattr("app.services.cognitive_agent_service.RUN_DEADLINE_GRACE_SECONDS", 0)
+
+    class _ReminderPlanner:
+        async def complete(self, *_args, **_kwargs) -> ChatCompletion:
+            action = {"action": "create_reminder", "action_input": {"text": "明天9点喝水"}}
+            return ChatCompletion(content=json.dumps({"done": False, **action}))
+
+    service = CognitiveAgentService(llm_service=_ReminderPlanner())  # type: ignore[arg-type]
+    release = asyncio.Event()
+
+    async def create_reminder(ctx, _args) -> ToolResult:
+        service._remember_reminder(ctx.state, SimpleNamespace(id=42, content="喝水"))  # type: ignore[arg-type]
+        # The note write outlives the run deadline.
+        await release.wait()
+        return ToolResult(status="ok", observation="reminder_created:#42")
+
+    tool = service._tool_registry.get("create_reminder")
+    assert tool is not None
+    tool.handler = create_reminder
+
+    outcome = await service.run("u1", "discord", "明天9点提醒我喝水")
+    release.set()
+    assert outcome.templated
+    slot = await service._session_store.get("discord:u1")
+    assert slot["last_reminder_id"] == 42
+    assert slot["last_reminder_content"] == "喝水"
+
+
+async def test_write_tools_in_one_step_run_one_at_a_time(monkeypatch):
+    cache.setup("mem://")
+    monkeypatch.setattr("app.services.cognitive_agent_service.settings.agent_trace_enabled", False)
+    service = CognitiveAgentService(llm_service=_PlannerLLM())  # type: ignore[arg-type]
+    events: list[str] = []
+
+    def handler(name: str):
+        async def run(ctx, _args) -> ToolResult:
+            events.append(f"{name}:start:{ctx.state.get('last_reminder_id')}")
+            await asyncio.sleep(0.05)
+            if name == "create_reminder":
+                ctx.state["last_reminder_id"] = 7
+            events.append(f"{name}:end")
+            return ToolResult(status="ok", observation=f"{name}_done")
+
+        return run
+
+    for name in ("create_reminder", "delay_latest_reminder", "search_memory", "web_search"):
+        tool = service._tool_registry.get(name)
+        assert tool is not None
+        tool.handler = handler(name)
+
+    state = {"run_id": "r1", "user_id": "u1", "provider": "discord", "text": ""}
+    calls = [
+        {"action": "search_memory", "action_input": {}},
+        {"action": "web_search", "action_input": {}},
+        {"action": "create_reminder", "action_input": {}},
+        {"action": "delay_latest_reminder", "action_input": {}},
+    ]
+    results = await service._run_calls(state, calls)  # type: ignore[arg-type]
+
+    assert results == [f"{call['action']}_done" for call in calls]
+    # The two reads overlap; each write starts after the previous call finished.
+    assert events[:2] == ["search_memory:start:None", "web_search:start:None"]
+    assert events[4:] == [
+        "create_reminder:start:None",
+        "create_reminder:end",
+        "delay_latest_reminder:start:7",
+        "delay_latest_reminder:end",
+    ]
@@ -0,0 +1,106 @@
+import asyncio
+import gzip
+import json
+import threading
+
+from cashews import cache
+
+from app.agents import ToolResult
+from app.services.agent_replay import AgentReplayer
+from app.services.agent_trace import TraceWriter
+from app.services.cognitive_agent_service import CognitiveAgentService
+from app.services.llm_service import ChatCompletion
+from app.services.trace_store import AgentTraceStore
+
+
+async def test_trace_writer_batches_and_rotates_daily(tmp_path):
+    writer = TraceWriter(tmp_path, buffer_size=64, flush_interval=60, batch_size=64, compress=True)
+    writer.emit({"ts": "2026-01-01T23:59:59+00:00", "type": "run_end", "run_id": "a"})
+    writer.emit({"ts": "2026-01-02T00:00:01+00:00", "type": "run_end", "run_id": "b"})
+    assert not list(tmp_path.iterdir())
+
+    await writer.close()
+    with gzip.open(tmp_path / "2026-01-01.jsonl.gz", "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["run_id"] for line in f] == ["a"]
+    with gzip.open(tmp_path / "2026-01-02.jsonl.gz", "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["run_id"] for line in f] == ["b"]
+
+
+async def test_trace_writer_close_waits_for_an_in_flight_write(tmp_path):
+    writer = TraceWriter(tmp_path, buffer_size=64, flush_interval=60, batch_size=1)
+    writing, release = threading.Event(), threading.Event()
+    write = writer._write
+
+    def slow_write(batch):
+        writing.set()
+        release.wait(5)
+        write(batch)
+
+    writer._write = slow_write  # type: ignore[method-assign]
+    writer.emit({"ts": "2026-01-01T00:00:00+00:00", "type": "run_end", "run_id": "a"})
+    await asyncio.to_thread(writing.wait, 5)
+    writer.emit({"ts": "2026-01-01T00:00:01+00:00", "type": "run_end", "run_id": "b"})
+
+    closing = asyncio.create_task(writer.close())
+    await asyncio.sleep(0.05)
+    assert not closing.done()
+    release.set()
+    await closing
+
+    lines = (tmp_path / "2026-01-01.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["run_id"] for line in lines] == ["a", "b"]
+    assert writer._handle is None
+
+
+async def test_trace_writer_sheds_debug_events_under_load(tmp_path):
+    writer = TraceWriter(tmp_path, buffer_size=10, flush_interval=60, batch_size=100)
+    ts = "2026-01-01T00:00:00+00:00"
+    for i in range(8):
+        writer.emit({"ts": ts, "type": "tool_call", "step": i})
+    writer.emit({"ts": ts, "type": "plan_call", "step": 8})
+    writer.emit({"ts": ts, "type": "run_end", "step": 9})
+    assert writer.dropped == 1
+
+    await writer.close()
+    lines = (tmp_path / "2026-01-01.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["type"] for line in lines][-1] == "run_end"
+    assert len(lines) == 9
+
+
+async def test_trace_index_lists_runs_and_replays_with_recorded_observations(tmp_path, monkeypatch):
+    cache.setup("mem://")
+    monkeypatch.setattr("app.services.cognitive_agent_service.settings.agent_trace_enabled", True)
+    store = AgentTraceStore(tmp_path / "index.db")
+    writer = TraceWriter(tmp_path, flush_interval=60, store=store)
+
+    class _PlannerLLM:
+        async def complete(self, *_args, **_kwargs) -> ChatCompletion:
+            return ChatCompletion(content=json.dumps({"done": False, "action": "write_idea"}))
+
+    llm = _PlannerLLM()
+    service = CognitiveAgentService(llm_service=llm, trace_writer=writer)  # type: ignore[arg-type]
+    written: list[str] = []
+
+    async def write_idea(_ctx, _args) -> ToolResult:
+        written.append("idea")
+        return ToolResult(status="ok", observation="idea_written")
+
+    tool = service._tool_registry.get("write_idea")
+    assert tool is not None
+    tool.handler = write_idea
+
+    await service.run("u1", "discord", "突然想到可以用语音记笔记")
+    await writer.close()
+
+    runs = store.list_runs(user_id="u1", action="write_idea")
+    assert len(runs) == 1
+    assert runs[0]["text"] == "突然想到可以用语音记笔记"
+    assert runs[0]["done"] and runs[0]["latency_ms"] is not None
+    assert store.list_runs(action="web_search") == []
+
+    report = await AgentReplayer(llm, store).replay(runs[0]["run_id"])  # type: ignore[arg-type]
+    assert report is not None
+    assert report.decisions_match
+    assert report.replayed_response == runs[0]["response"]
+    assert written == ["idea"]
+    assert len(store.list_runs()) == 1
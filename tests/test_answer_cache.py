@@ -0,0 +1,60 @@
+from cashews import cache
+
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.index_generation import bump_knowledge_generation, bump_memory_generation
+from app.services.memory.orchestrator import ContextBundle
+
+_BUNDLE = ContextBundle(system_prompt="sys", user_prompt="user", memory_context="")
+
+
+def _answer_cache(monkeypatch, max_entries: int = 8) -> SemanticAnswerCache:
+    cache.setup("mem://")
+    monkeypatch.setattr("app.services.answer_cache.settings.embedding_dimension", 4)
+    monkeypatch.setattr("app.services.answer_cache.settings.answer_cache_max_entries", max_entries)
+    monkeypatch.setattr("app.services.answer_cache.settings.answer_cache_similarity", 0.95)
+    return SemanticAnswerCache()
+
+
+async def test_answer_cache_hits_paraphrase_for_same_user_and_scope(monkeypatch):
+    answers = _answer_cache(monkeypatch)
+    versions = await answers.snapshot("u1")
+    answers.store(
+        "u1", "vector:5:None", "周报怎么写", [1.0, 0.0, 0.0, 0.0], "按模板写", _BUNDLE, versions
+    )
+
+    hit = await answers.lookup("u1", "vector:5:None", [0.99, 0.05, 0.0, 0.0])
+    assert hit is not None and hit.answer == "按模板写"
+    assert await answers.lookup("u2", "vector:5:None", [1.0, 0.0, 0.0, 0.0]) is None
+    assert await answers.lookup("u1", "hybrid:5:None", [1.0, 0.0, 0.0, 0.0]) is None
+    assert await answers.lookup("u1", "vector:5:None", [0.0, 1.0, 0.0, 0.0]) is None
+
+
+async def test_answer_cache_drops_entry_when_knowledge_or_memory_changes(monkeypatch):
+    answers = _answer_cache(monkeypatch)
+    embedding = [0.0, 0.0, 1.0, 0.0]
+    answers.store("u1", "s", "q", embedding, "old", _BUNDLE, await answers.snapshot("u1"))
+    answers.store("u2", "s", "q", embedding, "other", _BUNDLE, await answers.snapshot("u2"))
+
+    # Any knowledge write can change the answer, even to an item it never cited.
+    await bump_knowledge_generation()
+    assert await answers.lookup("u1", "s", embedding) is None
+    assert len(answers) == 1
+
+    answers.store("u1", "s", "q", embedding, "new", _BUNDLE, await answers.snapshot("u1"))
+    await bump_memory_generation("u2")
+    assert (await answers.lookup("u1", "s", embedding)).answer == "new"
+    assert await answers.lookup("u2", "s", embedding) is None
+
+
+async def test_answer_cache_evicts_least_recently_used(monkeypatch):
+    answers = _answer_cache(monkeypatch, max_entries=2)
+    empty = (0, 0)
+    answers.store("u1", "s", "a", [1.0, 0.0, 0.0, 0.0], "A", _BUNDLE, empty)
+    answers.store("u1", "s", "b", [0.0, 1.0, 0.0, 0.0], "B", _BUNDLE, empty)
+    assert (await answers.lookup("u1", "s", [1.0, 0.0, 0.0, 0.0])).answer == "A"
+
+    answers.store("u1", "s", "c", [0.0, 0.0, 1.0, 0.0], "C", _BUNDLE, empty)
+
+    assert await answers.lookup("u1", "s", [0.0, 1.0, 0.0, 0.0]) is None
+    assert (await answers.lookup("u1", "s", [1.0, 0.0, 0.0, 0.0])).answer == "A"
+    assert answers.index.ntotal == 2
@@ -0,0 +1,17 @@
+from cashews import cache
+
+from benchmarks.bench_retrieval import BenchConfig, run_benchmarks
+
+
+async def test_retrieval_benchmark_stores_return_exact_neighbours():
+    cache.setup("mem://")
+    report = await run_benchmarks(
+        BenchConfig(sizes=(2000,), dimension=16, queries=20, top_k=5, rag_queries=5)
+    )
+
+    (result,) = report.results
+    assert result.vector_store.recall_at_k == 1.0
+    assert result.memory_store.recall_at_k == 1.0
+    assert result.vector_store.index_bytes == 2000 * 16 * 4
+    assert result.rag_ms["p50"] > 0
+    assert "retrieve_ms" in result.rag_stages_ms
@@ -62,11 +62,11 @@ async def test_stop_bot_stops_all_channels(monkeypatch):
         "CHANNEL_STOPPERS",
         {"a": stop_a, "b": stop_b},
     )
-    monkeypatch.setattr(
-        bot_runtime,
-        "stop_reminder_checker",
-        lambda: reminder_stopped.__setitem__("value", True),
-    )
+
+    async def stop_reminder_checker():
+        reminder_stopped["value"] = True
+
+    monkeypatch.setattr(bot_runtime, "stop_reminder_checker", stop_reminder_checker)
 
     await bot_runtime.stop_bot()
 
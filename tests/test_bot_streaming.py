@@ -0,0 +1,108 @@
+from app.bot.streaming import STREAMING_SUFFIX, StreamingReply
+
+
+async def test_streaming_reply_throttles_edits_and_reserves_final_edit(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("app.bot.streaming.time.monotonic", lambda: clock[0])
+    edits: list[str] = []
+
+    async def edit(text: str) -> None:
+        edits.append(text)
+
+    reply = StreamingReply(edit, min_interval=1.0, max_edits=3)
+    await reply.push("一")
+    clock[0] += 0.5
+    await reply.push("二")
+    assert edits == []
+
+    for token in ("三", "四", "五"):
+        clock[0] += 1.0
+        await reply.push(token)
+    assert edits == ["一二三" + STREAMING_SUFFIX, "一二三四" + STREAMING_SUFFIX]
+
+    await reply.finish()
+    assert edits[-1] == "一二三四五"
+    assert len(edits) == 3
+
+
+async def test_streaming_reply_clips_to_provider_limit():
+    edits: list[str] = []
+
+    async def edit(text: str) -> None:
+        edits.append(text)
+
+    reply = StreamingReply(edit, min_interval=0.0, max_chars=10)
+    await reply.finish("很长" * 20)
+    assert len(edits[0]) == 10
+    assert edits[0].endswith("…")
+
+
+async def test_feishu_renderer_templates_terminal_replies_and_caches_rewrites():
+    from cashews import cache
+
+    from app.bot.reply_renderer import FeishuReplyRenderer, get_render_stats
+
+    cache.setup("mem://")
+    calls: list[str] = []
+
+    class _LLM:
+        async def chat(self, messages, **_kwargs):
+            calls.append(messages[-1]["content"])
+            return "好的，明早八点提醒你开会。"
+
+    renderer = FeishuReplyRenderer(_LLM())
+    before = get_render_stats()
+
+    templated = await renderer.render(
+        "提醒我开会", "**已为你创建提醒**：\n- 明早 8:00", templated=True
+    )
+    assert templated == "已为你创建提醒：\n• 明早 8:00"
+    assert calls == []
+
+    draft = "明天 08:00 开会"
+    assert await renderer.render("提醒我开会", draft) == "好的，明早八点提醒你开会。"
+    assert await renderer.render("别忘了开会", draft) == "好的，明早八点提醒你开会。"
+    assert len(calls) == 1
+
+    after = get_render_stats()
+    assert after["template"] - before["template"] == 1
+    assert after["llm"] - before["llm"] == 1
+    assert after["cache"] - before["cache"] == 1
+
+
+async def test_stream_reply_falls_back_to_a_plain_reply_when_the_final_edit_fails(monkeypatch):
+    from app.bot.message_service import AGENT_FAILURE_REPLY, BotMessageService, IncomingMessage
+    from app.services.cognitive_agent_service import AgentOutcome
+
+    monkeypatch.setattr("app.bot.message_service.settings.bot_stream_replies", True)
+    monkeypatch.setattr("app.bot.message_service.settings.agent_enabled", True)
+    replies: list[str] = []
+
+    async def reply(text: str) -> None:
+        replies.append(text)
+
+    async def broken_edit(_text: str) -> None:
+        raise RuntimeError("message too old to edit")
+
+    async def open_stream(_placeholder: str) -> StreamingReply:
+        return StreamingReply(broken_edit, min_interval=0.0)
+
+    class _Agent:
+        def __init__(self, outcome: AgentOutcome | Exception) -> None:
+            self.outcome = outcome
+
+        async def run(self, **_kwargs) -> AgentOutcome:
+            if isinstance(self.outcome, Exception):
+                raise self.outcome
+            return self.outcome
+
+    def message() -> IncomingMessage:
+        return IncomingMessage("discord", "u1", "你好", reply, open_stream=open_stream)
+
+    service = BotMessageService(_Agent(AgentOutcome(True, "你好呀")), llm_service=object())  # type: ignore[arg-type]
+    await service.handle(message())
+    assert replies == ["你好呀"]
+
+    service.agent_service = _Agent(RuntimeError("secret connection string"))  # type: ignore[assignment]
+    await service.handle(message())
+    assert replies[-1] == AGENT_FAILURE_REPLY
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 
 from app.services.memory.faiss_store import MemoryFAISSStore
 from app.services.memory.retriever import MemoryHit, MemoryRetriever
+from app.services.token_budget import Snippet, get_token_budgeter
 from app.utils.times import utc_time
 
 
@@ -59,6 +60,28 @@ def test_memory_retriever_build_context():
     assert "记忆摘要" in context
 
 
+def test_token_budgeter_packs_by_score_and_truncates_tail():
+    budgeter = get_token_budgeter()
+    long_text = "提醒事项 " * 200
+    snippets = [
+        Snippet(text="low priority note", score=0.1, source="knowledge"),
+        Snippet(text=long_text, score=0.5, source="knowledge"),
+        Snippet(text="[memory_id=1] 用户喜欢早起", score=0.9, source="memory"),
+    ]
+
+    packed = budgeter.pack(snippets, max_tokens=64)
+    assert [s.source for s in packed] == ["memory", "knowledge"]
+    assert packed[1].text != long_text
+    assert budgeter.count("\n".join(s.text for s in packed)) <= 64
+
+    # A long snippet that no longer fits does not crowd out shorter ones after it.
+    first = Snippet(text="用户每天七点起床，习惯先跑步再吃早餐", score=0.9, source="memory")
+    short = Snippet(text="短笔记", score=0.2, source="knowledge")
+    budget = budgeter.count(first.text) + 1 + budgeter.count(short.text) + 2
+    packed = budgeter.pack([first, Snippet(text=long_text, score=0.5), short], budget)
+    assert packed == [first, short]
+
+
 async def test_memory_retriever_search_scores():
     now = utc_time()
     recent = _MemoryLike(
@@ -94,3 +117,43 @@ async def test_memory_retriever_search_scores():
 
     assert len(hits) == 2
     assert hits[0].memory.id == 1
+
+
+async def test_memory_retriever_grows_overfetch_for_sparse_user():
+    now = utc_time()
+    others = [
+        _MemoryLike(
+            id=i,
+            user_id="someone-else",
+            memory_type="fact",
+            importance=3,
+            summary=f"other-{i}",
+            content=f"other-{i}",
+            updated_at=now,
+        )
+        for i in range(1, 21)
+    ]
+    mine = _MemoryLike(
+        id=21,
+        user_id="u1",
+        memory_type="fact",
+        importance=3,
+        summary="mine",
+        content="mine",
+        updated_at=now,
+    )
+    requested: list[int] = []
+
+    class _FakeStore:
+        def search(self, _query_embedding, top_k=8):
+            requested.append(top_k)
+            rows = [
+                {"memory_id": i, "vector_id": i, "similarity": 1.0 - i / 100} for i in range(1, 22)
+            ]
+            return rows[:top_k]
+
+    retriever = MemoryRetriever(_FakeStore(), _FakeRepo([*others, mine]))
+    hits = await retriever.search(user_id="u1", query_embedding=[0.0], top_k=1)
+
+    assert [hit.memory.id for hit in hits] == [21]
+    assert requested == [3, 6, 12, 24]
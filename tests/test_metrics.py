@@ -0,0 +1,83 @@
+from cashews import cache
+
+from app.agents import ToolResult
+from app.services.cognitive_agent_service import CognitiveAgentService
+from app.services.llm_service import ChatCompletion
+from app.utils.metrics import (
+    Histogram,
+    MetricsRegistry,
+    Span,
+    add_span_collector,
+    remove_span_collector,
+)
+
+
+def test_histogram_reports_percentiles_per_label_set():
+    histogram = Histogram("test_seconds", "", ("name",))
+    for value in range(1, 101):
+        histogram.observe(value / 1000, name="a")
+    histogram.observe(5.0, name="b")
+
+    rows = {row["name"]: row for row in histogram.summary()}
+    assert rows["a"]["count"] == 100
+    assert abs(rows["a"]["p50"] - 0.05) < 0.002
+    assert abs(rows["a"]["p99"] - 0.099) < 0.002
+    assert rows["b"]["p95"] == 5.0
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    latency = registry.histogram("req_seconds", "Request time", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, route="/items/{id:int}")
+    registry.counter("sends_total", "Sends", ("result",)).inc(result='say "hi"')
+    registry.gauge("vectors", "Vectors").set_function(lambda: 42)
+
+    lines = registry.render().splitlines()
+    assert 'req_seconds_bucket{route="/items/{id:int}",le="0.1"} 2' in lines
+    assert 'req_seconds_bucket{route="/items/{id:int}",le="1"} 3' in lines
+    assert 'req_seconds_bucket{route="/items/{id:int}",le="+Inf"} 4' in lines
+    assert 'req_seconds_count{route="/items/{id:int}"} 4' in lines
+    assert 'sends_total{result="say \\"hi\\""} 1' in lines
+    assert "# TYPE vectors gauge" in lines
+    assert "vectors 42" in lines
+
+
+class _StubLLM:
+    async def complete(self, *_args, **_kwargs) -> ChatCompletion:
+        return ChatCompletion(content='{"done": true, "response": "ok"}')
+
+
+class _ListCollector:
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def record(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+async def test_agent_nodes_and_tools_emit_spans(monkeypatch):
+    cache.setup("mem://")
+    monkeypatch.setattr("app.services.cognitive_agent_service.settings.agent_trace_enabled", False)
+    service = CognitiveAgentService(llm_service=_StubLLM())  # type: ignore[arg-type]
+
+    async def skip(_ctx, _args) -> ToolResult:
+        return ToolResult(status="ok", observation="reminder_skipped:#3 喝水@2026-01-02T09:00:00")
+
+    tool = service._tool_registry.get("skip_next_reminder")
+    assert tool is not None
+    tool.handler = skip
+
+    collector = _ListCollector()
+    add_span_collector(collector)
+    try:
+        await service.run("u1", "discord", "跳过下次提醒")
+    finally:
+        remove_span_collector(collector)
+
+    nodes = [s.name for s in collector.spans if s.kind == "agent_node"]
+    assert nodes[:2] == ["route", "act"]
+    tool_spans = [s for s in collector.spans if s.kind == "tool"]
+    assert [(s.name, s.node, s.attributes["status"]) for s in tool_spans] == [
+        ("skip_next_reminder", "act", "ok")
+    ]
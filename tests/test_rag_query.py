@@ -0,0 +1,200 @@
+from types import SimpleNamespace
+
+import pytest
+from cashews import cache
+from dishka import Provider, Scope, make_async_container
+from dishka.integrations.litestar import setup_dishka
+from litestar import Litestar
+from litestar.testing import AsyncTestClient
+
+from app.routes.v1.retrieval import RetrievalController
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.index_generation import bump_memory_generation
+from app.services.memory.embedder import MemoryEmbedder
+from app.services.memory.orchestrator import MemoryOrchestrator
+from app.services.memory.retriever import MemoryRetriever
+from app.services.retrieval_service import RetrievalService
+
+
+class _CountingLLM:
+    def __init__(self) -> None:
+        self.embedding_calls = 0
+        self.chat_calls = 0
+
+    async def get_embedding(self, _text: str) -> list[float]:
+        self.embedding_calls += 1
+        return [1.0, 0.0, 0.0, 0.0]
+
+    async def chat_with_system(self, *_args, **_kwargs) -> str:
+        self.chat_calls += 1
+        return "先写结论，再列数据。"
+
+    async def chat_with_system_stream(self, *_args, **_kwargs):
+        for token in ("先写结论，", "再列数据。"):
+            yield token
+
+
+class _Templates:
+    async def render(self, _name: str, **kwargs):
+        return "sys", kwargs["knowledge_context"]
+
+
+def _service(monkeypatch, llm: _CountingLLM, writes: list | None = None) -> RetrievalService:
+    cache.setup("mem://")
+    monkeypatch.setattr("app.services.memory.embedder.settings.embedding_dimension", 4)
+    item = SimpleNamespace(
+        id=1,
+        uuid="u-1",
+        raw_text="周报模板",
+        structured_text=None,
+        source="note",
+        tags=[],
+        links=[],
+        created_at=None,
+        updated_at=None,
+    )
+
+    async def get_by_ids(ids):
+        return [item] if 1 in ids else []
+
+    async def get_memories(_ids):
+        return []
+
+    async def write(**kwargs):
+        if writes is not None:
+            writes.append(kwargs["content"])
+        if kwargs.get("bump_generation", True):
+            await bump_memory_generation(kwargs["user_id"])
+
+    orchestrator = MemoryOrchestrator(
+        MemoryEmbedder(llm),
+        MemoryRetriever(
+            SimpleNamespace(search=lambda *_a, **_k: []), SimpleNamespace(get_by_ids=get_memories)
+        ),
+        SimpleNamespace(write=write),
+        _Templates(),
+    )
+    return RetrievalService(
+        llm,
+        embedding_service=None,
+        knowledge_service=SimpleNamespace(get_by_ids=get_by_ids),
+        vector_store=SimpleNamespace(search=lambda *_a: [{"item_id": 1, "distance": 0.2}]),
+        prompt_service=None,
+        memory_orchestrator=orchestrator,
+        keyword_index=SimpleNamespace(search=lambda *_a: [{"item_id": 1, "bm25": 3.1}]),
+        answer_cache=SemanticAnswerCache(),
+    )
+
+
+@pytest.mark.parametrize("answer_cache_ttl", [0, 3600])
+@pytest.mark.parametrize("mode", ["vector", "hybrid"])
+async def test_rag_query_embeds_query_once(monkeypatch, mode, answer_cache_ttl):
+    monkeypatch.setattr("app.services.answer_cache.settings.embedding_dimension", 4)
+    monkeypatch.setattr("app.services.answer_cache.settings.answer_cache_ttl", answer_cache_ttl)
+    monkeypatch.setattr("app.services.retrieval_service.settings.rag_context_cache_ttl", 0)
+    llm = _CountingLLM()
+    service = _service(monkeypatch, llm)
+    user_id = f"embed-once-{mode}-{answer_cache_ttl}"
+
+    result = await service.rag_query("周报怎么写", top_k=3, user_id=user_id, mode=mode)
+
+    assert llm.embedding_calls == 1
+    assert [item.id for item in result.knowledge_items] == [1]
+    assert result.answer == "先写结论，再列数据。"
+    assert "total_ms" in result.timings
+
+    await service.rag_query("周报怎么写", top_k=3, user_id=user_id, mode=mode)
+    assert llm.embedding_calls == 2
+    assert llm.chat_calls == (1 if answer_cache_ttl else 2)
+
+
+def _app(service: RetrievalService) -> Litestar:
+    provider = Provider(scope=Scope.APP)
+    provider.provide(lambda: service, provides=RetrievalService)
+    app = Litestar(route_handlers=[RetrievalController])
+    setup_dishka(make_async_container(provider), app)
+    return app
+
+
+async def test_rag_route_embeds_query_once(monkeypatch):
+    monkeypatch.setattr("app.services.answer_cache.settings.embedding_dimension", 4)
+    monkeypatch.setattr("app.services.answer_cache.settings.answer_cache_ttl", 3600)
+    monkeypatch.setattr("app.services.retrieval_service.settings.rag_context_cache_ttl", 0)
+    llm = _CountingLLM()
+    service = _service(monkeypatch, llm)
+
+    async with AsyncTestClient(_app(service)) as client:
+        response = await client.post("/rag", json={"query": "周报怎么写", "user_id": "route-user"})
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["answer"] == "先写结论，再列数据。"
+    assert [source["uuid"] for source in body["sources"]] == ["u-1"]
+    # Answer cache lookup, retrieval and the stored entry all share the one embedding.
+    assert llm.embedding_calls == 1
+
+
+async def test_rag_stream_sends_sources_first_and_writes_back_after_done(monkeypatch):
+    monkeypatch.setattr("app.services.answer_cache.settings.answer_cache_ttl", 0)
+    monkeypatch.setattr("app.services.retrieval_service.settings.rag_context_cache_ttl", 0)
+    writes: list[str] = []
+    service = _service(monkeypatch, _CountingLLM(), writes)
+
+    events = []
+    async for event, payload in service.rag_stream("周报怎么写", top_k=3, user_id="stream-user"):
+        events.append(event)
+        if event == "sources":
+            assert [item.id for item in payload.knowledge_items] == [1]
+        if event == "done":
+            assert payload.answer == "先写结论，再列数据。"
+            assert "first_token_ms" in payload.timings
+            assert writes == []
+
+    assert events == ["sources", "token", "token", "done"]
+    assert writes == ["Q: 周报怎么写\nA: 先写结论，再列数据。"]
+
+
+async def test_repeated_question_reuses_context_despite_write_back(monkeypatch):
+    monkeypatch.setattr("app.services.answer_cache.settings.answer_cache_ttl", 0)
+    monkeypatch.setattr("app.services.retrieval_service.settings.rag_context_cache_ttl", 120)
+    writes: list[str] = []
+    service = _service(monkeypatch, _CountingLLM(), writes)
+    build_context = service.memory_orchestrator.build_context
+    loads = 0
+
+    async def counting_build_context(**kwargs):
+        nonlocal loads
+        loads += 1
+        return await build_context(**kwargs)
+
+    monkeypatch.setattr(service.memory_orchestrator, "build_context", counting_build_context)
+
+    for _ in range(2):
+        result = await service.rag_query("周报怎么写", top_k=3, user_id="repeat-user")
+        assert result.answer == "先写结论，再列数据。"
+
+    assert loads == 1
+    assert len(writes) == 2
+
+
+async def test_rag_stream_route_ends_with_error_event_when_generation_fails(monkeypatch):
+    monkeypatch.setattr("app.services.answer_cache.settings.answer_cache_ttl", 0)
+    monkeypatch.setattr("app.services.retrieval_service.settings.rag_context_cache_ttl", 0)
+
+    class _FailingLLM(_CountingLLM):
+        async def chat_with_system_stream(self, *_args, **_kwargs):
+            yield "先写结论，"
+            raise RuntimeError("upstream connection reset")
+
+    writes: list[str] = []
+    service = _service(monkeypatch, _FailingLLM(), writes)
+
+    async with AsyncTestClient(_app(service)) as client:
+        response = await client.post("/rag/stream", json={"query": "周报怎么写"})
+
+    events = [
+        line[len("event: ") :] for line in response.text.splitlines() if line.startswith("event: ")
+    ]
+    assert events == ["sources", "token", "error"]
+    assert "upstream" not in response.text
+    assert writes == []
@@ -0,0 +1,161 @@
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from app.config import settings
+from app.core import InstrumentedSQLiteEngine
+from app.models import Reminder
+from app.services import reminder_dispatcher
+from app.services.reminder_checker import (
+    ReminderScheduler,
+    start_reminder_checker,
+    stop_reminder_checker,
+)
+from app.services.reminder_service import (
+    ReminderService,
+    add_reminder_listener,
+    remove_reminder_listener,
+)
+
+
+@pytest.fixture
+async def reminder_table(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        Reminder._meta, "_db", InstrumentedSQLiteEngine(path=str(tmp_path / "reminders.db"))
+    )
+    await Reminder.create_table(if_not_exists=True)
+
+
+async def _run_scheduler(
+    monkeypatch: pytest.MonkeyPatch, outcomes: list[bool], send_latency: float = 0.0
+):
+    sent: list[tuple[int, float]] = []
+
+    async def fake_send(reminder: Reminder, is_advance: bool = False) -> bool:
+        await asyncio.sleep(send_latency)
+        sent.append((int(reminder.id), asyncio.get_running_loop().time()))
+        return outcomes.pop(0) if outcomes else True
+
+    monkeypatch.setattr(reminder_dispatcher, "send_reminder", fake_send)
+    scheduler = ReminderScheduler(sync_interval=3600, retry_delay=0.2)
+    add_reminder_listener(scheduler)
+    task = asyncio.create_task(scheduler.run())
+    return scheduler, task, sent
+
+
+async def _stop(scheduler: ReminderScheduler, task: asyncio.Task) -> None:
+    remove_reminder_listener(scheduler)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+async def test_scheduler_fires_new_reminder_at_due_time(reminder_table, monkeypatch):
+    scheduler, task, sent = await _run_scheduler(monkeypatch, [])
+    try:
+        await asyncio.sleep(0.05)
+        created_at = asyncio.get_running_loop().time()
+        reminder = await ReminderService.create_reminder(
+            content="stand up",
+            remind_at=datetime.now() + timedelta(seconds=0.3),
+            user_id="u1",
+            advance_minutes=0,
+        )
+        for _ in range(100):
+            if sent and len(scheduler) == 0:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await _stop(scheduler, task)
+
+    assert [reminder_id for reminder_id, _ in sent] == [reminder.id]
+    assert sent[0][1] - created_at < 1.0
+    row = await Reminder.select().where(Reminder.id == reminder.id).first()
+    assert row["is_sent"] is True
+    assert len(scheduler) == 0
+
+
+async def test_scheduler_retries_failed_send_and_drops_removed(reminder_table, monkeypatch):
+    kept = await ReminderService.create_reminder(
+        content="kept",
+        remind_at=datetime.now() - timedelta(seconds=1),
+        user_id="u1",
+        advance_minutes=0,
+    )
+    dropped = await ReminderService.create_reminder(
+        content="dropped",
+        remind_at=datetime.now() + timedelta(seconds=0.3),
+        user_id="u1",
+        advance_minutes=0,
+    )
+    scheduler, task, sent = await _run_scheduler(monkeypatch, [False])
+    try:
+        await asyncio.sleep(0.05)
+        await ReminderService.mark_as_sent(int(dropped.id))
+        await asyncio.sleep(0.6)
+    finally:
+        await _stop(scheduler, task)
+
+    assert [reminder_id for reminder_id, _ in sent] == [kept.id, kept.id]
+    row = await Reminder.select().where(Reminder.id == kept.id).first()
+    assert row["is_sent"] is True
+
+
+async def test_scheduler_sends_burst_concurrently_per_provider(reminder_table, monkeypatch):
+    monkeypatch.setattr(settings, "reminder_provider_concurrency", 10)
+    due = datetime.now() - timedelta(seconds=1)
+    for index in range(40):
+        await ReminderService.create_reminder(
+            content=f"burst {index}",
+            remind_at=due,
+            user_id=f"u{index}",
+            provider="feishu" if index % 2 else "discord",
+            advance_minutes=0,
+        )
+    started = asyncio.get_running_loop().time()
+    scheduler, task, sent = await _run_scheduler(monkeypatch, [], send_latency=0.2)
+    try:
+        for _ in range(200):
+            if len(sent) == 40:
+                break
+            await asyncio.sleep(0.02)
+        elapsed = asyncio.get_running_loop().time() - started
+    finally:
+        await _stop(scheduler, task)
+
+    # 40 sends of 200ms across two providers with 10 slots each: two waves, not 8s.
+    assert len(sent) == 40
+    assert elapsed < 2.0
+    rows = await Reminder.select(Reminder.is_sent)
+    assert all(row["is_sent"] for row in rows)
+
+
+async def test_stopping_the_checker_flushes_queued_state_writes(reminder_table, monkeypatch):
+    monkeypatch.setattr(settings, "reminder_flush_interval", 60)
+    reminder = await ReminderService.create_reminder(
+        content="flush on stop",
+        remind_at=datetime.now() - timedelta(seconds=1),
+        user_id="u1",
+        advance_minutes=0,
+    )
+    sent: list[int] = []
+
+    async def fake_send(reminder: Reminder, is_advance: bool = False) -> bool:
+        sent.append(int(reminder.id))
+        return True
+
+    monkeypatch.setattr(reminder_dispatcher, "send_reminder", fake_send)
+    start_reminder_checker()
+    for _ in range(100):
+        if sent:
+            break
+        await asyncio.sleep(0.02)
+    row = await Reminder.select().where(Reminder.id == reminder.id).first()
+    # Still batched: the flush interval has not elapsed.
+    assert sent == [reminder.id] and row["is_sent"] is False
+
+    await stop_reminder_checker()
+
+    row = await Reminder.select().where(Reminder.id == reminder.id).first()
+    assert row["is_sent"] is True
@@ -0,0 +1,168 @@
+from types import SimpleNamespace
+
+from app.services.keyword_index import KeywordIndex, tokenize
+from app.services.retrieval_service import RetrievalService
+
+
+def _item(item_id: int, raw_text: str, tags: list[str] | None = None):
+    return SimpleNamespace(id=item_id, raw_text=raw_text, structured_text=None, tags=tags or [])
+
+
+def test_tokenize_splits_cjk_into_bigrams_and_keeps_identifiers():
+    assert tokenize("学习Python笔记 user-026") == ["学习", "python", "笔记", "user-026"]
+
+
+def test_keyword_index_matches_exact_terms_and_chinese(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "app.services.keyword_index.settings.keyword_index_path", str(tmp_path / "kw.db")
+    )
+    index = KeywordIndex()
+    index.upsert_batch(
+        [
+            _item(1, "部署流程需要先跑 make migrate"),
+            _item(2, "ticket ABC-1234 的排查记录", tags=["incident"]),
+            _item(3, "周末读书笔记"),
+        ]
+    )
+
+    assert [row["item_id"] for row in index.search("ABC-1234")] == [2]
+    assert [row["item_id"] for row in index.search("读书")] == [3]
+    assert [row["item_id"] for row in index.search("incident")] == [2]
+
+    index.upsert(_item(3, "已改写的内容"))
+    assert index.search("读书") == []
+    index.close()
+
+
+def test_reciprocal_rank_fusion_prefers_items_ranked_by_both():
+    fused = RetrievalService._reciprocal_rank_fusion([[1, 2, 3], [3, 4, 1]], k=60)
+
+    assert [item_id for item_id, _ in fused[:2]] == [1, 3]
+    assert {item_id for item_id, _ in fused} == {1, 2, 3, 4}
+
+
+async def test_rag_context_cache_reuses_bundle_until_generation_bumps():
+    from cashews import cache
+
+    from app.services.index_generation import bump_memory_generation
+    from app.services.memory.orchestrator import ContextBundle
+
+    cache.setup("mem://")
+    built: list[str] = []
+
+    class _FakeOrchestrator:
+        async def build_context(self, user_id, query, knowledge_items, **_):
+            built.append(query)
+            return ContextBundle(
+                system_prompt="sys", user_prompt=query, memory_context=f"m{len(built)}"
+            )
+
+    service = RetrievalService.__new__(RetrievalService)
+    service.memory_orchestrator = _FakeOrchestrator()
+
+    async def _no_rows(*_args, **_kwargs):
+        return []
+
+    service.search = _no_rows
+    service.knowledge_service = SimpleNamespace(get_by_ids=_no_rows)
+
+    args = ("同一个问题", 5, None, "cache-user", "vector", [0.0], {})
+    first, _ = await service._load_context(*args)
+    second, items = await service._load_context(*args)
+    assert first == second
+    assert items is None
+    assert built == ["同一个问题"]
+
+    await bump_memory_generation("cache-user")
+    third, _ = await service._load_context(*args)
+    assert third.memory_context == "m2"
+
+
+def test_keyword_index_recreates_table_built_with_old_tokenizer(tmp_path, monkeypatch):
+    import sqlite3
+
+    path = tmp_path / "kw.db"
+    monkeypatch.setattr("app.services.keyword_index.settings.keyword_index_path", str(path))
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE VIRTUAL TABLE knowledge_fts USING fts5("
+        "item_id UNINDEXED, raw_text, structured_text, tags, tokenize='unicode61')"
+    )
+    conn.execute("INSERT INTO knowledge_fts VALUES (9, 'abc 1234', '', '')")
+    conn.commit()
+    conn.close()
+
+    index = KeywordIndex()
+    assert index.count() == 0
+    index.upsert_batch([_item(1, "ticket ABC-1234"), _item(2, "abc only")])
+    # Hyphenated identifiers are single tokens now.
+    assert [row["item_id"] for row in index.search("ABC-1234")] == [1]
+    assert [row["item_id"] for row in index.search("abc")] == [2]
+    index.close()
+
+
+async def test_backfill_fills_empty_keyword_index_from_all_items(tmp_path, monkeypatch):
+    from cashews import cache
+
+    cache.setup("mem://")
+    monkeypatch.setattr(
+        "app.services.keyword_index.settings.keyword_index_path", str(tmp_path / "kw.db")
+    )
+    stored = [_item(i, f"note {i} 部署") for i in range(1, 251)]
+
+    async def list_batch(limit=100, offset=0):
+        return stored[offset : offset + limit]
+
+    service = RetrievalService.__new__(RetrievalService)
+    service.keyword_index = KeywordIndex()
+    service.knowledge_service = SimpleNamespace(list_batch=list_batch)
+
+    assert await service.backfill_keyword_index() == 250
+    assert service.keyword_index.count() == 250
+    assert await service.backfill_keyword_index() == 0
+    service.keyword_index.close()
+
+
+async def test_knowledge_item_delete_and_update_reach_keyword_index(tmp_path, monkeypatch):
+    from uuid import uuid4
+
+    from cashews import cache
+
+    from app.services.knowledge_item_service import KnowledgeItemService
+
+    cache.setup("mem://")
+    monkeypatch.setattr(
+        "app.services.keyword_index.settings.keyword_index_path", str(tmp_path / "kw.db")
+    )
+    item = SimpleNamespace(id=7, uuid=uuid4(), raw_text="部署流程", structured_text=None, tags=[])
+
+    class _Repo:
+        async def get_by_uuid(self, _uuid):
+            return item
+
+        async def get_by_id(self, _item_id):
+            return item
+
+        async def update_structured(self, _item_id, structured_text, tags, _links):
+            item.structured_text, item.tags = structured_text, tags
+            return True
+
+        async def delete_by_id(self, _item_id):
+            return True
+
+    index = KeywordIndex()
+    index.upsert(item)
+    service = KnowledgeItemService(_Repo(), index)
+    monkeypatch.setattr(service, "_set_cached", _noop)
+    monkeypatch.setattr(service, "_get_cached", _noop)
+
+    await service.update_structured(item.uuid, "回滚预案", ["ops"], [])
+    assert [row["item_id"] for row in index.search("回滚")] == [7]
+
+    await service.delete(item.uuid)
+    assert index.search("部署") == []
+    index.close()
+
+
+async def _noop(*_args, **_kwargs):
+    return None
@@ -0,0 +1,33 @@
+from cashews import cache
+
+from app.services.session_store import SessionStore
+
+
+async def test_session_slots_are_shared_between_workers(monkeypatch):
+    cache.setup("mem://")
+    clock = [100.0]
+    monkeypatch.setattr("app.services.session_store.time.monotonic", lambda: clock[0])
+    worker_a = SessionStore(ttl=60, local_max_entries=8, local_ttl=5.0)
+    worker_b = SessionStore(ttl=60, local_max_entries=8, local_ttl=5.0)
+
+    assert await worker_b.get("discord:u1") == {}
+    await worker_a.update("discord:u1", {"last_reminder_id": 7})
+    await worker_a.update("discord:u1", {"last_reminder_content": "喝水"})
+    assert await worker_a.get("discord:u1") == {
+        "last_reminder_id": 7,
+        "last_reminder_content": "喝水",
+    }
+
+    # worker_b still serves its local copy until the front-cache entry expires.
+    assert await worker_b.get("discord:u1") == {}
+    clock[0] += 6
+    assert (await worker_b.get("discord:u1"))["last_reminder_id"] == 7
+
+
+async def test_session_front_cache_is_bounded():
+    cache.setup("mem://")
+    store = SessionStore(ttl=60, local_max_entries=2, local_ttl=60)
+    for user in ("a", "b", "c"):
+        await store.update(f"feishu:{user}", {"last_reminder_id": 1})
+    assert list(store._local) == ["feishu:b", "feishu:c"]
+    assert await store.get("feishu:a") == {"last_reminder_id": 1}
@@ -0,0 +1,47 @@
+from cashews import cache
+
+from app.agents import ToolContext
+from app.services.cognitive_agent_service import CognitiveAgentService
+from app.services.web_search import SearchHit, StaticSearchProvider, WebSearchService
+
+
+async def test_repeated_queries_are_served_from_the_local_cache():
+    provider = StaticSearchProvider({"量子计算": [SearchHit("量子计算", "利用量子力学进行计算")]})
+    service = WebSearchService(provider, ttl=60, max_entries=8)
+
+    first = await service.search("量子计算")
+    # Case and whitespace differences resolve to the same entry.
+    again = await service.search("  量子计算 ")
+    assert first == again == [SearchHit("量子计算", "利用量子力学进行计算")]
+    assert provider.calls == 1
+
+    await service.search("量子计算", limit=1)
+    assert provider.calls == 2
+
+
+async def test_web_search_tool_results_are_shared_across_users(monkeypatch):
+    cache.setup("mem://")
+    monkeypatch.setattr("app.services.cognitive_agent_service.settings.agent_trace_enabled", False)
+    monkeypatch.setattr(
+        "app.services.cognitive_agent_service.settings.agent_tool_cache_enabled", False
+    )
+    provider = StaticSearchProvider({"量子计算": [SearchHit("量子计算", "利用量子力学进行计算")]})
+    service = CognitiveAgentService(web_search=WebSearchService(provider, ttl=60))
+
+    for user_id, channel_id in (("u1", None), ("u2", 42)):
+        ctx = ToolContext(
+            run_id="r1", user_id=user_id, provider="discord", text="", channel_id=channel_id
+        )
+        result = await service._tool_registry.execute("web_search", ctx, {"query": "量子计算"})
+        assert result.observation == "[web]量子计算: 利用量子力学进行计算"
+    assert provider.calls == 1
+
+
+async def test_web_search_tool_uses_the_injected_provider(monkeypatch):
+    cache.setup("mem://")
+    monkeypatch.setattr("app.services.cognitive_agent_service.settings.agent_trace_enabled", False)
+    provider = StaticSearchProvider({"Python": [SearchHit("Python", "一种编程语言")]})
+    service = CognitiveAgentService(web_search=WebSearchService(provider))
+
+    assert await service._tool_web_search({}, {"query": "Python"}) == "[web]Python: 一种编程语言"
+    assert await service._tool_web_search({}, {"query": "无结果"}) == "web_search_no_result"